@@ -0,0 +1,60 @@
+"""Benchmark of the holidays' iCalendar feed over HTTP"""
+
+from time import perf_counter
+from typing import Dict
+
+from aiohttp import ClientSession, web
+
+from benchmarks.stubs import get_holidays_rows
+from benchmarks.timing import measure_async
+from calendar_feed import CalendarFeed, create_calendar_app
+from holidays_index import HolidayIndex
+
+HOLIDAYS_COUNTS = (1_000, 10_000)
+
+
+async def run(is_quick: bool = False) -> Dict[str, dict]:
+    """Measure rendering of the feed and requests with and without the
+    ETag (polling clients)"""
+
+    results = {}
+    counts = HOLIDAYS_COUNTS[:-1] if is_quick else HOLIDAYS_COUNTS
+
+    for count in counts:
+        index = HolidayIndex()
+        index.build(get_holidays_rows(count), version=1)
+        feed = CalendarFeed(index, "Benchmark")
+
+        started_at = perf_counter()
+        body, etag = await feed.get()
+        results[f"render[{count}]"] = {
+            "value": (perf_counter() - started_at) * 1_000,
+            "unit": "ms",
+            "size_bytes": len(body),
+        }
+
+        runner = web.AppRunner(create_calendar_app(feed))
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", 0).start()
+        host, port = runner.addresses[0][:2]
+        url = f"http://{host}:{port}/holidays.ics"
+
+        try:
+            async with ClientSession() as session:
+
+                async def get_feed(headers: dict) -> None:
+                    async with session.get(url, headers=headers) as response:
+                        await response.read()
+
+                results[f"request[{count}]"] = await measure_async(
+                    get_feed, {}
+                )
+                results[f"request_not_modified[{count}]"] = (
+                    await measure_async(get_feed, {"If-None-Match": etag})
+                )
+        finally:
+            await runner.cleanup()
+
+        results[f"request[{count}]"]["renders"] = feed.renders
+
+    return results
@@ -0,0 +1,81 @@
+"""Benchmark of handlers' latency through the dispatcher"""
+
+from datetime import datetime
+from itertools import count
+from time import perf_counter
+from typing import Dict
+
+from aiogram import Bot
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.types import Chat, Message, Update, User
+
+import holidays_index
+import services
+from benchmarks.stubs import FakeDBPool, FakeSession
+from benchmarks.timing import get_latency_stats
+from bot import dp
+from constants.constants import WINTER_MONTHS
+from holidays_index import HOLIDAY_INDEX
+from states import MonthStates
+
+BOT_ID = 42
+TEXTS = (
+    "/start",
+    "/help",
+    "/all_holidays",
+    "/this_month_holidays",
+    WINTER_MONTHS[0],
+)
+HOLIDAYS_COUNT = 100
+
+_update_ids = count(1)
+_chat_ids = count(1)
+
+
+def _get_update(chat_id: int, text: str) -> Update:
+    """Return update with the message from the user"""
+
+    update_id = next(_update_ids)
+
+    return Update(
+        update_id=update_id,
+        message=Message(
+            message_id=update_id,
+            date=datetime.now(),
+            chat=Chat(id=chat_id, type="private"),
+            from_user=User(id=chat_id, is_bot=False, first_name="Bench"),
+            text=text,
+        ),
+    )
+
+
+async def run(is_quick: bool = False) -> Dict[str, dict]:
+    """Measure latency of every command with fake Telegram and DB"""
+
+    db_pool = FakeDBPool(holidays_count=HOLIDAYS_COUNT)
+    services.DB_POOL = holidays_index.DB_POOL = db_pool
+    HOLIDAY_INDEX.build(db_pool.holidays, version=1)
+
+    bot = Bot(f"{BOT_ID}:BENCHMARK", session=FakeSession())
+    updates_count = 100 if is_quick else 1_000
+    results = {}
+
+    for text in TEXTS:
+        latencies = []
+
+        for _ in range(updates_count):
+            # Every update is from a new chat to avoid per chat rate limit
+            chat_id = next(_chat_ids)
+            await dp.storage.set_state(
+                StorageKey(bot_id=BOT_ID, chat_id=chat_id, user_id=chat_id),
+                MonthStates.choosing_month,
+            )
+            update = _get_update(chat_id, text)
+
+            started_at = perf_counter()
+            await dp.feed_update(bot, update)
+            latencies.append(perf_counter() - started_at)
+
+        results[f"feed_update[{text}]"] = get_latency_stats(latencies)
+
+    return results
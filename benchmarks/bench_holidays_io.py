@@ -0,0 +1,41 @@
+"""Benchmark of import and export of holidays"""
+
+from io import StringIO
+from time import perf_counter
+from typing import Dict
+
+from benchmarks.stubs import FakeDBPool
+from holidays_io import FORMATS, export_holidays, import_holidays
+
+HOLIDAYS_COUNTS = (10_000, 100_000)
+
+
+async def run(is_quick: bool = False) -> Dict[str, dict]:
+    """Measure time of import of exported holidays (DB is a stub, so only
+    parsing and batching are measured)"""
+
+    results = {}
+    counts = HOLIDAYS_COUNTS[:-1] if is_quick else HOLIDAYS_COUNTS
+
+    for count in counts:
+        pool = FakeDBPool(holidays_count=count)
+
+        for file_format in FORMATS:
+            file = StringIO(newline="")
+
+            started_at = perf_counter()
+            await export_holidays(pool, file, file_format)
+            export_time = perf_counter() - started_at
+
+            file.seek(0)
+            started_at = perf_counter()
+            report = await import_holidays(pool, file, file_format)
+
+            results[f"import_{file_format}[{count}]"] = {
+                "value": perf_counter() - started_at,
+                "unit": "s",
+                "imported": report.imported,
+                "export_s": export_time,
+            }
+
+    return results
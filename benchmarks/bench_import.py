@@ -0,0 +1,86 @@
+"""Benchmark of importing modules of the bot.
+
+Every module is imported by a new interpreter without the bot's settings
+(no TOKEN and DB settings in the environment). Files opened on import
+(except Python modules) and network calls are counted by an audit hook, so
+the result shows that the import does no I/O.
+
+"""
+
+import sys
+from json import loads
+from os import environ, path
+from subprocess import run as run_process
+from typing import Dict
+
+MODULES = ("utils", "services", "bot")
+
+_SECRETS = ("TOKEN", "DB_HOST", "DB_USER", "DB_PASSWORD", "DB_NAME")
+
+_IMPORT_CODE = """
+import sys
+from json import dumps
+from time import perf_counter
+
+CODE_SUFFIXES = (".py", ".pyc", ".so", ".pth", ".typed")
+NETWORK_EVENTS = ("socket.connect", "socket.getaddrinfo")
+files = []
+network_calls = []
+
+
+def audit(event, args):
+    if event == "open" and isinstance(args[0], str):
+        if not args[0].endswith(CODE_SUFFIXES) and "__pycache__" not in args[0]:
+            files.append(args[0])
+    elif event in NETWORK_EVENTS:
+        network_calls.append(event)
+
+
+sys.addaudithook(audit)
+started_at = perf_counter()
+__import__(sys.argv[1])
+import_time = perf_counter() - started_at
+
+print(
+    dumps(
+        {
+            "import_time": import_time,
+            "files": files,
+            "network_calls": len(network_calls),
+            "imports_aiogram": "aiogram" in sys.modules,
+        }
+    )
+)
+"""
+
+
+async def run(is_quick: bool = False) -> Dict[str, dict]:
+    """Measure time and I/O of importing every module"""
+
+    root = path.dirname(path.dirname(path.abspath(__file__)))
+    env = {
+        name: value for name, value in environ.items() if name not in _SECRETS
+    }
+    env["PYTHONPATH"] = root
+    results = {}
+
+    for module in MODULES:
+        process = run_process(
+            [sys.executable, "-c", _IMPORT_CODE, module],
+            cwd=root,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        result = loads(process.stdout.splitlines()[-1])
+
+        results[module] = {
+            "value": result["import_time"] * 1_000,
+            "unit": "ms",
+            "opened_files": len(result["files"]),
+            "network_calls": result["network_calls"],
+            "imports_aiogram": result["imports_aiogram"],
+        }
+
+    return results
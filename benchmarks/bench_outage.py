@@ -0,0 +1,61 @@
+"""Benchmark of DB queries while DB is down"""
+
+from time import perf_counter, sleep
+from typing import Dict
+
+from mysql.connector import Error
+
+from benchmarks.timing import measure_async
+from circuit_breaker import CircuitBreaker
+from constants.queries import HOLIDAYS_VERSION_QUERY
+from db import DBPool
+
+# DB doesn't answer, queries wait for this timeout (seconds)
+QUERY_TIMEOUT = 0.2
+FAILURE_THRESHOLD = 5
+
+
+def _connect_to_hanging_db() -> None:
+    """Connect to DB that doesn't answer"""
+
+    sleep(QUERY_TIMEOUT * 2)
+
+
+async def _query(pool: DBPool) -> None:
+    try:
+        await pool.fetch_one(HOLIDAYS_VERSION_QUERY)
+    except Error:
+        pass
+
+
+async def run(is_quick: bool = False) -> Dict[str, dict]:
+    """Measure latency of queries until the circuit opens and while it is
+    open"""
+
+    results = {}
+
+    for name, breaker in (
+        ("without_breaker", None),
+        ("with_breaker", CircuitBreaker(FAILURE_THRESHOLD, reset_timeout=60)),
+    ):
+        pool = DBPool({}, size=FAILURE_THRESHOLD, query_timeout=QUERY_TIMEOUT)
+        pool.breaker = breaker
+        pool._connect = _connect_to_hanging_db
+
+        started_at = perf_counter()
+
+        for _ in range(FAILURE_THRESHOLD):
+            await _query(pool)
+
+        first_failures_time = perf_counter() - started_at
+
+        # Without the breaker every query waits for the timeout
+        result = await measure_async(
+            _query, pool, min_time=QUERY_TIMEOUT if breaker is None else 0.5
+        )
+        result["first_failures_s"] = first_failures_time
+        results[f"query_during_outage[{name}]"] = result
+
+        pool.close()
+
+    return results
@@ -0,0 +1,30 @@
+"""Benchmark of formatting holidays"""
+
+from typing import Dict
+
+from benchmarks.stubs import get_holidays_rows
+from benchmarks.timing import measure_async
+from custom_types import HolidayRecord
+from utils import get_formatted_holidays
+
+HOLIDAYS_COUNTS = (10, 100, 1_000, 10_000)
+
+
+async def run(is_quick: bool = False) -> Dict[str, dict]:
+    """Measure get_formatted_holidays for lists and notifications"""
+
+    results = {}
+    counts = HOLIDAYS_COUNTS[:-1] if is_quick else HOLIDAYS_COUNTS
+
+    for count in counts:
+        holidays = [HolidayRecord(*row) for row in get_holidays_rows(count)]
+
+        for mode, is_notification in (("list", False), ("notification", True)):
+            result = await measure_async(
+                get_formatted_holidays, holidays, is_notification
+            )
+            result["holidays_per_second"] = result["per_second"] * count
+
+            results[f"get_formatted_holidays[{mode}-{count}]"] = result
+
+    return results
@@ -0,0 +1,78 @@
+"""Benchmark of loading daily jobs on startup and turning the wheel"""
+
+from datetime import datetime, timedelta, timezone
+from time import perf_counter
+from tracemalloc import get_traced_memory, start, stop
+from typing import Dict
+
+import jobs
+import services
+from benchmarks.stubs import FakeDBPool
+from timing_wheel import SLOTS_COUNT, TimingWheel
+
+SUBSCRIBERS_COUNTS = (1_000, 100_000, 1_000_000)
+
+
+async def _load_daily_jobs(subscribers_count: int) -> int:
+    """Load daily jobs of the subscribers from fake DB"""
+
+    jobs.NOTIFICATION_WHEEL = TimingWheel()
+    services.DB_POOL = FakeDBPool(notifications_count=subscribers_count)
+
+    return await jobs.load_daily_jobs()
+
+
+def _turn_wheel_for_day() -> int:
+    """Turn the loaded wheel every minute of a day, return due chats"""
+
+    now = datetime.now(timezone.utc).replace(second=0, microsecond=0)
+    due_count = 0
+
+    for minute in range(1, SLOTS_COUNT + 1):
+        due_chats = jobs.NOTIFICATION_WHEEL.turn(
+            now + timedelta(minutes=minute)
+        )
+        due_count += sum(len(chat_ids) for chat_ids in due_chats.values())
+
+    return due_count
+
+
+async def run(is_quick: bool = False) -> Dict[str, dict]:
+    """Measure time and memory of loading daily jobs and time of turning
+    the wheel for a day"""
+
+    results = {}
+    counts = SUBSCRIBERS_COUNTS[:-1] if is_quick else SUBSCRIBERS_COUNTS
+
+    for count in counts:
+        started_at = perf_counter()
+        loaded_count = await _load_daily_jobs(count)
+        elapsed = perf_counter() - started_at
+
+        start()
+
+        try:
+            await _load_daily_jobs(count)
+            _, peak_memory = get_traced_memory()
+        finally:
+            stop()
+
+        results[f"load_daily_jobs[{count}]"] = {
+            "value": elapsed,
+            "unit": "s",
+            "loaded": loaded_count,
+            "peak_memory_mib": peak_memory / 2**20,
+        }
+
+        jobs.NOTIFICATION_WHEEL.turn()
+
+        started_at = perf_counter()
+        due_count = _turn_wheel_for_day()
+
+        results[f"turn_wheel_for_day[{count}]"] = {
+            "value": perf_counter() - started_at,
+            "unit": "s",
+            "due": due_count,
+        }
+
+    return results
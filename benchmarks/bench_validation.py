@@ -0,0 +1,37 @@
+"""Benchmark of small helpers that are called for every message"""
+
+from typing import Dict
+
+from benchmarks.timing import measure_async
+from utils import _get_age_suffix, is_daily_notification_time_correct
+
+TIMES = ("9:00", "23:59", "24:00", "12:60", "test")
+AGES = (1, 11, 22, 35, "42", -1, "test")
+
+
+async def _check_times() -> None:
+    for time_ in TIMES:
+        await is_daily_notification_time_correct(time_)
+
+
+async def _get_age_suffixes() -> None:
+    for age in AGES:
+        await _get_age_suffix(age)
+
+
+async def run(is_quick: bool = False) -> Dict[str, dict]:
+    """Measure cost of one call of every helper"""
+
+    results = {}
+
+    for name, func, calls in (
+        ("is_daily_notification_time_correct", _check_times, len(TIMES)),
+        ("_get_age_suffix", _get_age_suffixes, len(AGES)),
+    ):
+        result = await measure_async(func)
+        result["value"] /= calls
+        result["per_second"] *= calls
+
+        results[name] = result
+
+    return results
@@ -0,0 +1,172 @@
+"""Run benchmarks and compare results with the baseline.
+
+Telegram and DB are replaced with stubs, so benchmarks work offline:
+
+    python -m benchmarks.run --quick
+    python -m benchmarks.run --only rendering,handlers
+    python -m benchmarks.run --compare benchmarks/results/baseline.json
+
+"""
+
+import asyncio
+from argparse import ArgumentParser
+from datetime import datetime
+from json import dump, load
+from os import environ, makedirs, path
+from platform import platform, python_version
+from sys import exit as sys_exit
+from typing import Dict
+
+# Benchmarks don't connect to Telegram and DB, so settings can be fake.
+# Rate limits are disabled to measure the bot's own code.
+for name, value in (
+    ("TOKEN", "42:BENCHMARK"),
+    ("DB_HOST", "localhost"),
+    ("DB_USER", "benchmark"),
+    ("DB_PASSWORD", "benchmark"),
+    ("DB_NAME", "benchmark"),
+):
+    environ.setdefault(name, value)
+
+environ["SEND_RATE_LIMIT"] = "1000000000"
+environ["SEND_PER_CHAT_RATE_LIMIT"] = "1000000000"
+
+BENCHMARKS = (
+    "validation",
+    "rendering",
+    "scheduler",
+    "handlers",
+    "holidays_io",
+    "calendar_feed",
+    "import",
+    "outage",
+)
+RESULTS_DIR = path.join(path.dirname(__file__), "results")
+
+# Result is a regression if it is slower than baseline by this ratio
+REGRESSION_THRESHOLD = 0.2
+
+
+async def run_benchmarks(names, is_quick: bool) -> Dict[str, dict]:
+    """Run the benchmarks and return all results"""
+
+    # Imported after the settings are changed
+    from benchmarks import (
+        bench_calendar_feed,
+        bench_handlers,
+        bench_holidays_io,
+        bench_import,
+        bench_outage,
+        bench_rendering,
+        bench_scheduler,
+        bench_validation,
+    )
+
+    modules = {
+        "validation": bench_validation,
+        "rendering": bench_rendering,
+        "scheduler": bench_scheduler,
+        "handlers": bench_handlers,
+        "holidays_io": bench_holidays_io,
+        "calendar_feed": bench_calendar_feed,
+        "import": bench_import,
+        "outage": bench_outage,
+    }
+    results = {}
+
+    for name in names:
+        print(f"Running «{name}» benchmark...")
+
+        for result_name, result in (await modules[name].run(is_quick)).items():
+            results[f"{name}.{result_name}"] = result
+            print(f"  {result_name}: {result['value']:.3f} {result['unit']}")
+
+    return results
+
+
+def compare_results(
+    results: Dict[str, dict], baseline: Dict[str, dict], threshold: float
+) -> int:
+    """Print comparison with the baseline, return number of regressions"""
+
+    regressions = 0
+
+    print("\nComparison with the baseline:")
+
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+
+        ratio = result["value"] / baseline[name]["value"]
+        is_regression = ratio > 1 + threshold
+        regressions += is_regression
+
+        print(
+            f"  {name}: {ratio:.2f}x"
+            + ("  <-- REGRESSION" if is_regression else "")
+        )
+
+    return regressions
+
+
+def main() -> None:
+    """Parse arguments, run benchmarks and save results"""
+
+    parser = ArgumentParser(description="Benchmarks of the bot")
+    parser.add_argument(
+        "--only",
+        default=",".join(BENCHMARKS),
+        help="Comma-separated benchmarks: " + ", ".join(BENCHMARKS),
+    )
+    parser.add_argument(
+        "--quick", action="store_true", help="Skip the largest sizes"
+    )
+    parser.add_argument(
+        "--output",
+        default=path.join(RESULTS_DIR, "latest.json"),
+        help="File to save results to",
+    )
+    parser.add_argument("--compare", help="Baseline file to compare with")
+    parser.add_argument(
+        "--threshold", type=float, default=REGRESSION_THRESHOLD
+    )
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.only.split(",") if name.strip()]
+    unknown_names = set(names) - set(BENCHMARKS)
+
+    if unknown_names:
+        parser.error(f"Unknown benchmarks: {', '.join(unknown_names)}")
+
+    results = asyncio.run(run_benchmarks(names, args.quick))
+
+    makedirs(path.dirname(path.abspath(args.output)), exist_ok=True)
+
+    with open(args.output, "w", encoding="utf-8") as file:
+        dump(
+            {
+                "meta": {
+                    "created_at": datetime.now().isoformat(),
+                    "python": python_version(),
+                    "platform": platform(),
+                    "quick": args.quick,
+                },
+                "results": results,
+            },
+            file,
+            ensure_ascii=False,
+            indent=2,
+        )
+
+    print(f"\nResults are saved to {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            baseline = load(file)["results"]
+
+        if compare_results(results, baseline, args.threshold):
+            sys_exit(1)
+
+
+if __name__ == "__main__":
+    main()
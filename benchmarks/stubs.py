@@ -0,0 +1,139 @@
+"""Stubs of Telegram and DB for offline benchmarks"""
+
+from contextlib import asynccontextmanager
+from datetime import date, datetime, timedelta
+from typing import Any, AsyncIterator, List, Optional, Sequence
+
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import SendMessage, SendPhoto
+from aiogram.types import Chat, Message
+
+HOLIDAYS_TITLES = ("День рождения", "Годовщина свадьбы", "Новый год")
+
+
+class FakeSession(BaseSession):
+    """Session that answers to every request without network"""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.requests_count = 0
+
+    async def make_request(self, bot, method, timeout=None) -> Any:
+        self.requests_count += 1
+
+        if isinstance(method, (SendMessage, SendPhoto)):
+            return Message(
+                message_id=self.requests_count,
+                date=datetime.now(),
+                chat=Chat(id=method.chat_id, type="private"),
+                text=getattr(method, "text", None),
+            )
+
+        return True
+
+    async def stream_content(self, *args, **kwargs):
+        yield b""
+
+    async def close(self) -> None:
+        pass
+
+
+class FakeDBPool:
+    """DB pool with generated holidays and daily notifications"""
+
+    def __init__(self, holidays_count: int = 0, notifications_count: int = 0):
+        self.holidays = get_holidays_rows(holidays_count)
+        self._holidays_by_id: List[tuple] = []
+        self.notifications_count = notifications_count
+        self.queries_count = 0
+
+    async def fetch_all(
+        self, query: str, params: Optional[Sequence] = None
+    ) -> List[tuple]:
+        self.queries_count += 1
+
+        if "daily_notifications" in query:
+            return self._get_notifications_page(*params)
+
+        if "WHERE id >" in query:
+            # Ids are numbers of rows from 1
+            last_id, page_size = params
+            if len(self._holidays_by_id) != len(self.holidays):
+                self._holidays_by_id = sorted(
+                    self.holidays, key=lambda row: row[4]
+                )
+
+            return self._holidays_by_id[last_id : last_id + page_size]
+
+        return list(self.holidays)
+
+    async def fetch_one(
+        self, query: str, params: Optional[Sequence] = None
+    ) -> Optional[tuple]:
+        self.queries_count += 1
+
+        if "CHECKSUM" in query:
+            return ("holidays", len(self.holidays))
+
+        return (0,)
+
+    async def execute(
+        self, query: str, params: Optional[Sequence] = None
+    ) -> int:
+        self.queries_count += 1
+
+        return 1
+
+    async def execute_many(self, query: str, params_seq: Sequence) -> int:
+        self.queries_count += 1
+
+        return len(params_seq)
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator["FakeDBPool"]:
+        yield self
+
+    def close(self) -> None:
+        pass
+
+    def _get_notifications_page(
+        self, last_chat_id: str, page_size: int
+    ) -> List[tuple]:
+        """Return page of notifications after the chat id"""
+
+        start = int(last_chat_id) + 1 if last_chat_id else 0
+        end = min(start + page_size, self.notifications_count)
+
+        return [
+            (
+                f"{number:010d}",
+                timedelta(minutes=number % 1_440),
+                "7,1" if number % 2 else "",
+                "Asia/Yekaterinburg" if number % 3 else "",
+            )
+            for number in range(start, end)
+        ]
+
+
+def get_holidays_rows(count: int) -> List[tuple]:
+    """Return holidays rows sorted by month, day and id (as DB does)"""
+
+    rows = []
+
+    for number in range(count):
+        holiday_date = date(1950 + number % 70, 1, 1) + timedelta(
+            days=number % 365
+        )
+        is_birthday = number % 2
+
+        rows.append(
+            (
+                holiday_date,
+                f"{HOLIDAYS_TITLES[number % 3]} №{number}",
+                is_birthday,
+                None if is_birthday else "Всех",
+                number + 1,
+            )
+        )
+
+    return sorted(rows, key=lambda row: (row[0].month, row[0].day, row[4]))
@@ -0,0 +1,55 @@
+"""Helpers to measure time of benchmarks"""
+
+from statistics import quantiles
+from time import perf_counter
+from typing import Any, Awaitable, Callable, Dict, List
+
+# Min time of measuring one function (more calls - less noise)
+MIN_MEASURE_TIME = 0.5
+
+
+async def measure_async(
+    func: Callable[..., Awaitable[Any]],
+    *args,
+    min_time: float = MIN_MEASURE_TIME,
+) -> Dict[str, float]:
+    """Call the coroutine function until min time passes.
+
+    Return time per call in microseconds and calls per second.
+
+    """
+
+    calls = 0
+    batch = 1
+    started_at = perf_counter()
+
+    while (elapsed := perf_counter() - started_at) < min_time:
+        for _ in range(batch):
+            await func(*args)
+
+        calls += batch
+        batch *= 2
+
+    elapsed = perf_counter() - started_at
+
+    return {
+        "value": elapsed / calls * 1_000_000,
+        "unit": "us/call",
+        "calls": calls,
+        "per_second": calls / elapsed,
+    }
+
+
+def get_latency_stats(latencies: List[float]) -> Dict[str, float]:
+    """Return mean, median and 95th percentile of latencies (in ms)"""
+
+    latencies_ms = [latency * 1_000 for latency in latencies]
+    percentiles = quantiles(latencies_ms, n=100)
+
+    return {
+        "value": sum(latencies_ms) / len(latencies_ms),
+        "unit": "ms",
+        "p50": percentiles[49],
+        "p95": percentiles[94],
+        "count": len(latencies_ms),
+    }
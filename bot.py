@@ -1,41 +1,111 @@
 """Main file with bot logic"""
 
 import asyncio
-from logging import INFO, basicConfig, getLogger
+from datetime import date
+from logging import basicConfig, getLogger
+from typing import Tuple
 
 from aiogram import Dispatcher, F
-from aiogram.filters import Command, CommandStart
+from aiogram.filters import Command, CommandObject, CommandStart
 from aiogram.fsm.context import FSMContext
-from aiogram.types import CallbackQuery, FSInputFile, Message
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
-
-from constants.constants import ALL_MONTHS, BOT, BOT_COMMANDS, MONTHS_NUMBERS
-from constants.queries import (
-    ALL_HOLIDAYS_SQL_QUERY,
-    NEXT_MONTH_HOLIDAYS_SQL_QUERY,
-    SPECIFIED_MONTH_HOLIDAYS_SQL_QUERY,
-    THIS_MONTH_HOLIDAYS_SQL_QUERY,
+from aiogram.types import CallbackQuery, Message
+from mysql.connector import Error
+
+from calendar_feed import start_calendar_server
+from constants.constants import (
+    ADMIN_IDS,
+    ALL_MONTHS,
+    BOT_COMMANDS,
+    BOT_MODE,
+    CALENDAR_FEED_HOST,
+    CALENDAR_FEED_PATH,
+    CALENDAR_FEED_PORT,
+    DEFAULT_TIME_ZONE,
+    FSM_STORAGE_MAX_SIZE,
+    FSM_STORAGE_PATH,
+    FSM_STORAGE_TTL,
+    HOLIDAYS_PAGE_CALLBACK,
+    LOGGING_SETTINGS,
+    METRICS_HOST,
+    METRICS_PORT,
+    MONTHS_NUMBERS,
+    NOTIFICATION_WORKERS,
+    PROFILED_UPDATES_COUNT,
+    REMINDER_MAX_COUNT,
+    REMINDER_MAX_DAYS,
+    UPCOMING_HOLIDAYS_COUNT,
+    UPCOMING_HOLIDAYS_MAX_COUNT,
+)
+from db import DB_POOL
+from holidays_io import CSV_COLUMNS, CSV_FORMAT, FORMATS
+from jobs import (
+    add_daily_job,
+    remove_daily_job,
+    run_scheduler,
+    set_daily_job_time_zone,
+    set_reminder_days,
 )
-from jobs import add_daily_job, run_scheduler
 from keyboards import get_months_keyboard, get_yes_no_inline_keyboard
+from media import answer_photo
+from metrics import start_metrics_server
+from middlewares import MetricsMiddleware
+from migrations import apply_migrations
+from resources import RESOURCES
+from sender import SEND_QUEUE, send, send_message
 from services import (
     add_new_daily_notification_to_db,
     change_daily_notification_time_in_db,
+    change_reminder_days_in_db,
+    change_time_zone_in_db,
     delete_daily_notification_from_db,
+    edit_holidays_page,
+    get_reminder_days_from_db,
+    get_time_zone_from_db,
+    import_holidays_from_document,
     is_daily_notification_exists,
-    send_sql_query_result_to_user,
+    send_holidays_export,
+    send_holidays_page,
+    send_holidays_to_user,
+    send_month_choosing_instruction,
+    send_upcoming_holidays,
 )
 from states import MonthStates, NotificationStates
+from storage import BoundedStorage
+from tracing import TRACE_EXPORTER, UPDATE_PROFILER, TracingMiddleware
 from utils import (
     get_bot_commands_to_display,
     is_daily_notification_time_correct,
-    send_month_choosing_instruction,
+    is_time_zone_correct,
+    parse_reminder_days,
+)
+from webhook import run_webhook
+from workers import NotificationShards
+
+dp = Dispatcher(
+    storage=BoundedStorage(
+        FSM_STORAGE_MAX_SIZE, FSM_STORAGE_TTL, FSM_STORAGE_PATH
+    )
 )
+dp.message.middleware(MetricsMiddleware())
+dp.callback_query.middleware(MetricsMiddleware())
 
-dp = Dispatcher()
 logger = getLogger(__name__)
 
-scheduler = AsyncIOScheduler()
+
+async def notify_admins_about_profile(profile_path: str) -> None:
+    """Tell admins where the profile of updates is saved"""
+
+    for admin_id in ADMIN_IDS:
+        await send_message(
+            RESOURCES.bot, admin_id, f"Профиль сохранен: {profile_path}"
+        )
+
+
+dp.update.outer_middleware(TracingMiddleware(notify_admins_about_profile))
+
+notification_shards = (
+    NotificationShards(NOTIFICATION_WORKERS) if NOTIFICATION_WORKERS else None
+)
 
 BOT_COMMANDS_TO_DISPLAY = get_bot_commands_to_display(BOT_COMMANDS)
 
@@ -55,9 +125,10 @@ async def start_handler(message: Message, state: FSMContext) -> None:
         "Вот команды, которые ты можешь использовать:\n"
     ) + BOT_COMMANDS_TO_DISPLAY
 
-    await message.answer_photo(
-        FSInputFile("photos/cat.jpg"),
-        greeting_text,
+    await answer_photo(
+        message,
+        "photos/cat.jpg",
+        caption=greeting_text,
         reply_markup=get_months_keyboard(),
     )
     await send_month_choosing_instruction(message)
@@ -67,7 +138,7 @@ async def start_handler(message: Message, state: FSMContext) -> None:
 async def help_handler(message: Message) -> None:
     """Handler for /help command - show all commands for the user"""
 
-    await message.answer(BOT_COMMANDS_TO_DISPLAY)
+    await send(message.answer(BOT_COMMANDS_TO_DISPLAY))
     await send_month_choosing_instruction(message)
 
 
@@ -78,11 +149,11 @@ async def help_handler(message: Message) -> None:
 async def all_holidays_handler(message: Message) -> None:
     """Handler for /all_holidays command.
 
-    Show all family's holidays and birthdays.
+    Show all family's holidays and birthdays page by page.
 
     """
 
-    await send_sql_query_result_to_user(message, ALL_HOLIDAYS_SQL_QUERY)
+    await send_holidays_page(message)
 
 
 @dp.message(Command("this_month_holidays"))
@@ -93,7 +164,7 @@ async def this_month_holidays_handler(message: Message) -> None:
 
     """
 
-    await send_sql_query_result_to_user(message, THIS_MONTH_HOLIDAYS_SQL_QUERY)
+    await send_holidays_to_user(message, date.today().month)
 
 
 @dp.message(Command("next_month_holidays"))
@@ -104,7 +175,34 @@ async def next_month_holidays_handler(message: Message) -> None:
 
     """
 
-    await send_sql_query_result_to_user(message, NEXT_MONTH_HOLIDAYS_SQL_QUERY)
+    await send_holidays_to_user(message, date.today().month % 12 + 1)
+
+
+@dp.message(Command("upcoming"))
+async def upcoming_holidays_handler(
+    message: Message, command: CommandObject
+) -> None:
+    """Handler for /upcoming [N] command.
+
+    Show the next N family's holidays and birthdays from today.
+
+    """
+
+    count = UPCOMING_HOLIDAYS_COUNT
+
+    if command.args is not None:
+        count = int(command.args) if command.args.strip().isdigit() else 0
+
+    if not 1 <= count <= UPCOMING_HOLIDAYS_MAX_COUNT:
+        await send(
+            message.answer(
+                f"Укажите число от 1 до {UPCOMING_HOLIDAYS_MAX_COUNT}.\n"
+                "Пример - <b>/upcoming 5</b>"
+            )
+        )
+        return
+
+    await send_upcoming_holidays(message, count)
 
 
 # Notifications commands handlers
@@ -119,13 +217,15 @@ async def add_notification_handler(message: Message) -> None:
     """
 
     if await is_daily_notification_exists(message):
-        await message.answer("Вы уже добавили уведомление")
+        await send(message.answer("Вы уже добавили уведомление"))
     else:
-        await message.answer(
-            "Вы точно хотите добавить ежедневное уведомление о праздниках?",
-            reply_markup=get_yes_no_inline_keyboard(
-                yes_btn_name="btn_add_notification"
-            ),
+        await send(
+            message.answer(
+                "Вы точно хотите добавить ежедневное уведомление о праздниках?",
+                reply_markup=get_yes_no_inline_keyboard(
+                    yes_btn_name="btn_add_notification"
+                ),
+            )
         )
 
 
@@ -140,14 +240,18 @@ async def change_notification_handler(
     """
 
     if await is_daily_notification_exists(message):
-        await message.answer(
-            "Напишите новое время для уведомления.\nПример - <b>12:30</b>"
+        await send(
+            message.answer(
+                "Напишите новое время для уведомления.\nПример - <b>12:30</b>"
+            )
         )
         await state.set_state(NotificationStates.awaiting_new_time)
     else:
-        await message.answer(
-            "У вас не подключена отправка уведомления."
-            "Вы можете подключить ее с помощью команды /add_notification",
+        await send(
+            message.answer(
+                "У вас не подключена отправка уведомления."
+                "Вы можете подключить ее с помощью команды /add_notification",
+            )
         )
 
 
@@ -160,14 +264,202 @@ async def delete_notification_handler(message: Message) -> None:
     """
 
     if await is_daily_notification_exists(message):
-        await message.answer(
-            "Вы точно хотите удалить уведомление?",
-            reply_markup=get_yes_no_inline_keyboard(
-                yes_btn_name="btn_delete_notification"
-            ),
+        await send(
+            message.answer(
+                "Вы точно хотите удалить уведомление?",
+                reply_markup=get_yes_no_inline_keyboard(
+                    yes_btn_name="btn_delete_notification"
+                ),
+            )
         )
     else:
-        await message.answer("У вас нет уведомления")
+        await send(message.answer("У вас нет уведомления"))
+
+
+@dp.message(Command("timezone"))
+async def time_zone_handler(message: Message, command: CommandObject) -> None:
+    """Handler for /timezone [time zone] command.
+
+    Set time zone of the user's daily notification (IANA name).
+
+    """
+
+    if not await is_daily_notification_exists(message):
+        await send(
+            message.answer(
+                "У вас не подключена отправка уведомления. "
+                "Вы можете подключить ее с помощью команды /add_notification"
+            )
+        )
+        return
+
+    if command.args is None:
+        try:
+            time_zone = await get_time_zone_from_db(message)
+        except Error as error:
+            logger.error(error)
+            time_zone = DEFAULT_TIME_ZONE
+
+        await send(
+            message.answer(
+                f"Часовой пояс уведомления: {time_zone}\n"
+                "Пример - <b>/timezone Europe/Moscow</b>"
+            )
+        )
+        return
+
+    time_zone = command.args.strip()
+
+    if not is_time_zone_correct(time_zone):
+        await send(
+            message.answer(
+                "Укажите часовой пояс в формате «Регион/Город».\n"
+                "Пример - <b>/timezone Asia/Yekaterinburg</b>"
+            )
+        )
+        return
+
+    # The notification is moved only if the time zone is saved, otherwise
+    # it would be moved back on restart
+    if await change_time_zone_in_db(message, time_zone):
+        await set_time_zone_job(str(message.chat.id), time_zone)
+
+
+@dp.message(Command("reminders"))
+async def reminders_handler(message: Message, command: CommandObject) -> None:
+    """Handler for /reminders [days] command.
+
+    Set days before holidays to remind the user (with the daily
+    notification), «off» turns reminders off.
+
+    """
+
+    if not await is_daily_notification_exists(message):
+        await send(
+            message.answer(
+                "Напоминания приходят вместе с ежедневным уведомлением. "
+                "Подключите его с помощью команды /add_notification"
+            )
+        )
+        return
+
+    if command.args is None:
+        try:
+            days = await get_reminder_days_from_db(message)
+        except (Error, ValueError) as error:
+            logger.error(error)
+            days = ()
+
+        days_text = ", ".join(str(item) for item in days) or "нет"
+        await send(
+            message.answer(
+                f"Напоминания за столько дней: {days_text}\n"
+                "Пример - <b>/reminders 7 3 1</b>, "
+                "отключить - <b>/reminders off</b>"
+            )
+        )
+        return
+
+    try:
+        days = (
+            ()
+            if command.args.strip().lower() in ("off", "0")
+            else parse_reminder_days(command.args)
+        )
+    except ValueError:
+        days = None
+
+    if days is None or len(days) > REMINDER_MAX_COUNT:
+        await send(
+            message.answer(
+                f"Укажите до {REMINDER_MAX_COUNT} чисел "
+                f"от 1 до {REMINDER_MAX_DAYS}.\n"
+                "Пример - <b>/reminders 7 3 1</b>"
+            )
+        )
+        return
+
+    if await change_reminder_days_in_db(message, days):
+        await set_reminder_days_job(str(message.chat.id), days)
+
+
+# Admin commands handlers
+
+
+@dp.message(Command("import"), F.from_user.id.in_(ADMIN_IDS))
+async def import_handler(message: Message) -> None:
+    """Handler for /import command with a file (only for admins).
+
+    Import holidays from CSV or iCalendar file, duplicates (the same title
+    and date) are updated.
+
+    """
+
+    if message.document is None:
+        await send(
+            message.answer(
+                "Отправьте файл CSV или iCalendar (.ics) с подписью "
+                "<b>/import</b>.\nКолонки CSV: "
+                f"{', '.join(CSV_COLUMNS)} (дата - ГГГГ-ММ-ДД)"
+            )
+        )
+        return
+
+    await import_holidays_from_document(RESOURCES.bot, message)
+
+
+@dp.message(Command("export"), F.from_user.id.in_(ADMIN_IDS))
+async def export_handler(message: Message, command: CommandObject) -> None:
+    """Handler for /export [csv|ics] command (only for admins).
+
+    Send all holidays as CSV or iCalendar file.
+
+    """
+
+    file_format = (command.args or CSV_FORMAT).strip().lower()
+
+    if file_format not in FORMATS:
+        await send(
+            message.answer(
+                f"Укажите формат: {', '.join(FORMATS)}.\n"
+                "Пример - <b>/export ics</b>"
+            )
+        )
+        return
+
+    await send_holidays_export(message, file_format)
+
+
+@dp.message(Command("profile"), F.from_user.id.in_(ADMIN_IDS))
+async def profile_handler(message: Message, command: CommandObject) -> None:
+    """Handler for /profile [N] command (only for admins).
+
+    Profile the next N updates with cProfile and save the profile to disk.
+
+    """
+
+    updates_count = PROFILED_UPDATES_COUNT
+
+    if command.args is not None:
+        updates_count = (
+            int(command.args) if command.args.strip().isdigit() else 0
+        )
+
+    if updates_count < 1:
+        await send(message.answer("Пример - <b>/profile 100</b>"))
+        return
+
+    if not UPDATE_PROFILER.start(updates_count):
+        await send(
+            message.answer(
+                "Профилирование уже идет, дождись сохранения профиля"
+            )
+        )
+        return
+
+    await send(
+        message.answer(f"Профилирую следующие обновления: {updates_count}")
+    )
 
 
 # States handlers
@@ -181,11 +473,7 @@ async def specified_month_handler(message: Message):
 
     """
 
-    month = MONTHS_NUMBERS[message.text]
-
-    await send_sql_query_result_to_user(
-        message, SPECIFIED_MONTH_HOLIDAYS_SQL_QUERY.format(month=month)
-    )
+    await send_holidays_to_user(message, MONTHS_NUMBERS[message.text])
 
 
 @dp.message(NotificationStates.awaiting_new_time)
@@ -200,16 +488,17 @@ async def daily_notification_time_handler(message: Message, state: FSMContext):
     chat_id = str(message.chat.id)
 
     if await is_daily_notification_time_correct(new_time):
-        await change_daily_notification_time_in_db(BOT, new_time, chat_id)
+        await change_daily_notification_time_in_db(
+            RESOURCES.bot, new_time, chat_id
+        )
 
         new_time = [int(item) for item in new_time.split(":")]
 
-        scheduler.remove_job(chat_id)
-        await add_daily_job(scheduler, chat_id, new_time)
+        await add_daily_notification_job(chat_id, new_time)
 
         await state.clear()
     else:
-        await message.answer("Формат некорректный")
+        await send(message.answer("Формат некорректный"))
 
 
 # Buttons handlers
@@ -229,7 +518,20 @@ async def process_callback_btn_add_notification(
 
     await add_new_daily_notification_to_db(message)
     # TODO: Добавить возможность выбора времени
-    await add_daily_job(scheduler, str(message.chat.id), [9, 0])
+    await add_daily_notification_job(str(message.chat.id), [9, 0])
+
+
+@dp.callback_query(F.data.startswith(f"{HOLIDAYS_PAGE_CALLBACK}:"))
+async def process_callback_btn_holidays_page(
+    callback_query: CallbackQuery,
+) -> None:
+    """Handler for «◀» and «▶» buttons of /all_holidays.
+
+    Show the previous or the next page in the same message.
+
+    """
+
+    await edit_holidays_page(callback_query)
 
 
 @dp.callback_query(F.data == "btn_delete_notification")
@@ -245,29 +547,104 @@ async def process_callback_btn_delete_notification(
     message = callback_query.message
 
     await delete_daily_notification_from_db(message)
-    scheduler.remove_job(str(message.chat.id))
+    await remove_daily_notification_job(str(message.chat.id))
+
+
+async def add_daily_notification_job(
+    chat_id: str, time_: Tuple[int, int]
+) -> None:
+    """Add daily job for the chat (in worker if there are workers)"""
+
+    if notification_shards is None:
+        await add_daily_job(chat_id, time_)
+    else:
+        notification_shards.add_daily_job(chat_id, time_)
+
+
+async def remove_daily_notification_job(chat_id: str) -> None:
+    """Remove daily job of the chat (in worker if there are workers)"""
+
+    if notification_shards is None:
+        await remove_daily_job(chat_id)
+    else:
+        notification_shards.remove_daily_job(chat_id)
+
+
+async def set_time_zone_job(chat_id: str, time_zone: str) -> None:
+    """Move daily job of the chat to the time zone (in worker if there are
+    workers)"""
+
+    if notification_shards is None:
+        await set_daily_job_time_zone(chat_id, time_zone)
+    else:
+        notification_shards.set_time_zone(chat_id, time_zone)
+
+
+async def set_reminder_days_job(chat_id: str, days: Tuple[int, ...]) -> None:
+    """Set days of reminders of the chat (in worker if there are workers)"""
+
+    if notification_shards is None:
+        set_reminder_days(chat_id, days)
+    else:
+        notification_shards.set_reminder_days(chat_id, days)
 
 
 async def main() -> None:
     """Main function that runs the bot"""
 
+    metrics_runner = None
+    calendar_runner = None
+
     try:
-        asyncio.create_task(run_scheduler(scheduler))
-        await BOT.set_my_commands(BOT_COMMANDS)
-        await dp.start_polling(BOT)
+        await RESOURCES.startup()
+
+        try:
+            await apply_migrations(DB_POOL)
+        except Error as error:
+            # Queries of the bot need the migrated schema
+            logger.critical("Migrations failed, the bot is stopped: %s", error)
+            return
+
+        if METRICS_PORT:
+            metrics_runner = await start_metrics_server(
+                METRICS_HOST, METRICS_PORT
+            )
+
+        if CALENDAR_FEED_PORT:
+            calendar_runner = await start_calendar_server(
+                CALENDAR_FEED_HOST, CALENDAR_FEED_PORT, CALENDAR_FEED_PATH
+            )
+
+        if notification_shards is None:
+            asyncio.create_task(run_scheduler(RESOURCES.scheduler))
+        else:
+            notification_shards.start()
+            asyncio.create_task(run_scheduler(RESOURCES.scheduler, shard=None))
+
+        await RESOURCES.bot.set_my_commands(BOT_COMMANDS)
+
+        if BOT_MODE == "webhook":
+            await run_webhook(dp, RESOURCES.bot)
+        else:
+            await dp.start_polling(RESOURCES.bot)
     except Exception as error:
         logger.error(error)
+    finally:
+        if notification_shards is not None:
+            notification_shards.stop()
+
+        if metrics_runner is not None:
+            await metrics_runner.cleanup()
+
+        if calendar_runner is not None:
+            await calendar_runner.cleanup()
+
+        await SEND_QUEUE.stop()
+        await dp.storage.close()
+        await RESOURCES.shutdown()
+        TRACE_EXPORTER.close()
 
 
 if __name__ == "__main__":
-    # TODO: в .ini, разные уровни логирования
-    basicConfig(
-        level=INFO,
-        filename="logs.log",
-        filemode="a",
-        format=(
-            "\n%(asctime)s.%(msecs)d - %(levelname)s (%(name)s)\n%(message)s"
-        ),
-        datefmt="%F %T",
-    )
+    basicConfig(**LOGGING_SETTINGS)
     asyncio.run(main())
@@ -0,0 +1,153 @@
+"""iCalendar feed of the holidays for calendar apps.
+
+The feed is served over HTTP, so it can be subscribed to by URL. It is
+rendered from the holidays index once per version of the holidays and
+kept in memory. Responses have a strong ETag (hash of the feed), so
+clients that poll the feed get «304 Not Modified» without the body until
+the holidays are changed.
+
+"""
+
+from datetime import datetime, timezone
+from hashlib import sha256
+from logging import getLogger
+from typing import Optional, Tuple
+
+from aiohttp import web
+from mysql.connector import Error
+
+from constants.constants import CALENDAR_FEED_NAME
+from holidays_index import HOLIDAY_INDEX, HolidayIndex
+from ics_format import (
+    CALENDAR_FOOTER,
+    CALENDAR_HEADER,
+    escape_text,
+    fold_line,
+    get_event_lines,
+)
+
+logger = getLogger(__name__)
+
+CONTENT_TYPE = "text/calendar"
+
+# DTSTAMP of all events, so the feed (and its ETag) depends only on the
+# holidays
+_FEED_TIMESTAMP = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+class CalendarFeed:
+    """Rendered feed of the index's holidays and its ETag"""
+
+    def __init__(self, index: HolidayIndex, name: str = "") -> None:
+        self.index = index
+        self.name = name
+        self.renders = 0
+
+        self._body = b""
+        self._etag = ""
+        self._version = None
+        self._is_rendered = False
+
+    async def get(self) -> Tuple[bytes, str]:
+        """Return the feed and its ETag (rendered again only if the
+        holidays are changed)"""
+
+        if (
+            not self._is_rendered
+            or not self.index.is_loaded
+            or self.index.version != self._version
+        ):
+            holidays = await self.index.get_all()
+            version = self.index.version
+            lines = list(CALENDAR_HEADER)
+
+            if self.name:
+                lines.append(f"X-WR-CALNAME:{escape_text(self.name)}")
+
+            for holiday in holidays:
+                lines.extend(
+                    get_event_lines(
+                        holiday,
+                        f"holiday-{holiday.holiday_id}",
+                        _FEED_TIMESTAMP,
+                    )
+                )
+
+            lines.extend(CALENDAR_FOOTER)
+
+            self._body = "".join(fold_line(line) for line in lines).encode()
+            self._etag = f'"{sha256(self._body).hexdigest()[:32]}"'
+            self._version = version
+            self._is_rendered = True
+            self.renders += 1
+
+            logger.info(
+                "Calendar feed rendered: %s holidays (version %s)",
+                len(holidays),
+                version,
+            )
+
+        return self._body, self._etag
+
+
+def is_etag_matched(if_none_match: Optional[str], etag: str) -> bool:
+    """Check «If-None-Match» header against the ETag (weak comparison,
+    as RFC 9110 requires for this header)"""
+
+    if not if_none_match:
+        return False
+
+    if if_none_match.strip() == "*":
+        return True
+
+    return any(
+        item.strip().removeprefix("W/") == etag
+        for item in if_none_match.split(",")
+    )
+
+
+def create_calendar_app(
+    feed: CalendarFeed, path: str = "/holidays.ics"
+) -> web.Application:
+    """Return application that serves the feed (GET and HEAD)"""
+
+    async def handle(request: web.Request) -> web.Response:
+        try:
+            body, etag = await feed.get()
+        except Error as error:
+            logger.error(error)
+            raise web.HTTPServiceUnavailable() from error
+
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+        if is_etag_matched(request.headers.get("If-None-Match"), etag):
+            return web.Response(status=304, headers=headers)
+
+        return web.Response(
+            body=body,
+            content_type=CONTENT_TYPE,
+            charset="utf-8",
+            headers=headers,
+        )
+
+    app = web.Application()
+    app.router.add_get(path, handle)
+
+    return app
+
+
+async def start_calendar_server(
+    host: str, port: int, path: str
+) -> web.AppRunner:
+    """Start HTTP server with the holidays' feed and return its runner"""
+
+    runner = web.AppRunner(create_calendar_app(CALENDAR_FEED, path))
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+
+    logger.info("Calendar feed on %s:%s%s", host, port, path)
+
+    return runner
+
+
+CALENDAR_FEED = CalendarFeed(HOLIDAY_INDEX, CALENDAR_FEED_NAME)
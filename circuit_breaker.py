@@ -0,0 +1,116 @@
+"""Circuit breaker of DB queries.
+
+When DB is down, every query would wait for the connector's timeout. After
+«failure_threshold» failures in a row the breaker opens and queries fail
+at once with CircuitOpenError (a MySQL error, so handlers that catch
+«mysql.connector.Error» handle it as before). After «reset_timeout»
+seconds the breaker is half-open: one query is let through as a probe,
+its success closes the breaker and its failure opens it again. A probe
+that hasn't finished in «reset_timeout» seconds (e.g. it was cancelled) is
+replaced by the next query.
+
+"""
+
+from logging import getLogger
+from time import monotonic
+from typing import Callable, Optional
+
+from mysql.connector.errors import OperationalError
+
+logger = getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(OperationalError):
+    """Query isn't executed, as DB is unavailable"""
+
+
+class CircuitBreaker:
+    """State of DB availability by results of the last queries"""
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30,
+        clock: Callable[[], float] = monotonic,
+    ) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._is_probing = False
+        self._probe_started_at = 0.0
+
+        self.rejections = 0
+
+    @property
+    def state(self) -> str:
+        """«closed», «open» or «half_open» (the reset timeout has passed)"""
+
+        if (
+            self._state == OPEN
+            and self._clock() - self._opened_at >= self.reset_timeout
+        ):
+            return HALF_OPEN
+
+        return self._state
+
+    def before_call(self) -> None:
+        """Check that the query can be executed.
+
+        Raise CircuitOpenError if the breaker is open, or if it is half-open
+        and another query is the probe.
+
+        """
+
+        state = self.state
+
+        if state == CLOSED:
+            return
+
+        if state == HALF_OPEN and (
+            not self._is_probing
+            or self._clock() - self._probe_started_at >= self.reset_timeout
+        ):
+            self._is_probing = True
+            self._probe_started_at = self._clock()
+            logger.info("DB circuit is half-open, probing")
+            return
+
+        self.rejections += 1
+
+        raise CircuitOpenError(msg="DB is unavailable (circuit is open)")
+
+    def record_success(self) -> None:
+        """Close the breaker after a successful query"""
+
+        if self._state != CLOSED:
+            logger.warning("DB circuit is closed")
+
+        self._state = CLOSED
+        self._failures = 0
+        self._is_probing = False
+
+    def record_failure(self, error: Optional[Exception] = None) -> None:
+        """Count the failure, open the breaker after too many of them or if
+        the probe has failed"""
+
+        self._failures += 1
+
+        if self._is_probing or self._failures >= self.failure_threshold:
+            if self._state != OPEN or self._is_probing:
+                logger.error(
+                    "DB circuit is open for %s seconds: %s",
+                    self.reset_timeout,
+                    error,
+                )
+
+            self._state = OPEN
+            self._opened_at = self._clock()
+            self._is_probing = False
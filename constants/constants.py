@@ -1,14 +1,45 @@
 """Constants of the project"""
 
-from aiogram import Bot
-from aiogram.client.default import DefaultBotProperties
-from aiogram.enums import ParseMode
+from logging import INFO
+from typing import Dict
+
 from decouple import config
-from mysql.connector import connect
 
-TOKEN = config("TOKEN")
 
-BOT = Bot(TOKEN, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
+def get_token() -> str:
+    """Return token of the bot (read on startup, so modules can be imported
+    without it)"""
+
+    return config("TOKEN")
+
+
+def get_db_settings() -> Dict[str, str]:
+    """Return settings of DB connection (read on startup, so modules can be
+    imported without them)"""
+
+    return {
+        "host": config("DB_HOST"),
+        "user": config("DB_USER"),
+        "password": config("DB_PASSWORD"),
+        "database": config("DB_NAME"),
+    }
+
+
+# URL of Telegram Bot API server (can be changed to a local server)
+TELEGRAM_API_URL = config("TELEGRAM_API_URL", default="")
+
+# How to get updates from Telegram - «polling» or «webhook»
+BOT_MODE = config("BOT_MODE", default="polling")
+
+# Public URL of the server for webhook (without path) and the secret token
+# of Telegram's requests (random on every start if it is empty)
+WEBHOOK_BASE_URL = config("WEBHOOK_BASE_URL", default="")
+WEBHOOK_PATH = config("WEBHOOK_PATH", default="/webhook")
+WEBHOOK_SECRET = config("WEBHOOK_SECRET", default="") or None
+
+# Address of the local HTTP server for webhook
+WEBHOOK_HOST = config("WEBHOOK_HOST", default="127.0.0.1")
+WEBHOOK_PORT = config("WEBHOOK_PORT", default=8080, cast=int)
 
 BOT_COMMANDS = [
     {
@@ -25,6 +56,7 @@ BOT_COMMANDS = [
         "command": "next_month_holidays",
         "description": "Праздники в следующем месяце",
     },
+    {"command": "upcoming", "description": "Ближайшие праздники"},
     {
         "command": "add_notification",
         "description": "Добавить ежедневное оповещение о праздниках",
@@ -37,13 +69,185 @@ BOT_COMMANDS = [
         "command": "delete_notification",
         "description": "Удалить ежедневное оповещение о праздниках",
     },
+    {
+        "command": "timezone",
+        "description": "Часовой пояс уведомления (например, Europe/Moscow)",
+    },
+    {
+        "command": "reminders",
+        "description": "Напоминать о праздниках заранее (например, 7 3 1)",
+    },
 ]
 
-DB_CONNECT = connect(
-    host=config("DB_HOST"),
-    user=config("DB_USER"),
-    password=config("DB_PASSWORD"),
-    database=config("DB_NAME"),
+# Max number of simultaneously opened connections to DB
+DB_POOL_SIZE = config("DB_POOL_SIZE", default=5, cast=int)
+
+# Max seconds to wait for a single query before giving up
+DB_QUERY_TIMEOUT = config("DB_QUERY_TIMEOUT", default=10, cast=float)
+
+# DB queries fail at once after this number of failures in a row, until
+# a probe query succeeds (it is let through after this number of seconds)
+DB_CIRCUIT_FAILURE_THRESHOLD = config(
+    "DB_CIRCUIT_FAILURE_THRESHOLD", default=5, cast=int
+)
+DB_CIRCUIT_RESET_TIMEOUT = config(
+    "DB_CIRCUIT_RESET_TIMEOUT", default=30, cast=float
+)
+
+# How often (in seconds) to check if holidays in DB were changed
+HOLIDAYS_INDEX_REFRESH_INTERVAL = config(
+    "HOLIDAYS_INDEX_REFRESH_INTERVAL", default=300, cast=int
+)
+
+# Max number of FSM entries (users' states) kept in memory
+FSM_STORAGE_MAX_SIZE = config("FSM_STORAGE_MAX_SIZE", default=10_000, cast=int)
+
+# FSM entries not used for this number of seconds are removed (30 days)
+FSM_STORAGE_TTL = config("FSM_STORAGE_TTL", default=2_592_000, cast=int)
+
+# Path to SQLite file to keep FSM entries after restart (empty - memory only)
+FSM_STORAGE_PATH = config("FSM_STORAGE_PATH", default="") or None
+
+# Max number of holidays on one page of /all_holidays
+HOLIDAYS_PAGE_SIZE = config("HOLIDAYS_PAGE_SIZE", default=10, cast=int)
+
+# Number of holidays shown by /upcoming command without argument (and max)
+UPCOMING_HOLIDAYS_COUNT = config(
+    "UPCOMING_HOLIDAYS_COUNT", default=5, cast=int
+)
+UPCOMING_HOLIDAYS_MAX_COUNT = config(
+    "UPCOMING_HOLIDAYS_MAX_COUNT", default=50, cast=int
+)
+
+# Max number of days before holidays for reminders and number of reminders
+REMINDER_MAX_DAYS = config("REMINDER_MAX_DAYS", default=60, cast=int)
+REMINDER_MAX_COUNT = config("REMINDER_MAX_COUNT", default=5, cast=int)
+
+# Max number of rendered messages with holidays kept in memory
+RENDER_CACHE_SIZE = config("RENDER_CACHE_SIZE", default=64, cast=int)
+
+# Number of daily notifications loaded from DB at once on startup
+DAILY_NOTIFICATIONS_PAGE_SIZE = config(
+    "DAILY_NOTIFICATIONS_PAGE_SIZE", default=10_000, cast=int
+)
+
+# Time zone of daily notifications if the user hasn't chosen one (IANA)
+DEFAULT_TIME_ZONE = config("DEFAULT_TIME_ZONE", default="Europe/Moscow")
+
+# Rows in one INSERT of imported holidays, holidays in one query of export
+# and number of wrong rows of imported file shown to the admin
+HOLIDAYS_IMPORT_BATCH_SIZE = config(
+    "HOLIDAYS_IMPORT_BATCH_SIZE", default=1_000, cast=int
+)
+HOLIDAYS_EXPORT_PAGE_SIZE = config(
+    "HOLIDAYS_EXPORT_PAGE_SIZE", default=1_000, cast=int
+)
+HOLIDAYS_IMPORT_MAX_SHOWN_ERRORS = config(
+    "HOLIDAYS_IMPORT_MAX_SHOWN_ERRORS", default=20, cast=int
+)
+
+# Rows in one INSERT of the delivery log and days to keep the log
+DELIVERY_LOG_BATCH_SIZE = config(
+    "DELIVERY_LOG_BATCH_SIZE", default=1_000, cast=int
+)
+DELIVERY_LOG_KEEP_DAYS = config("DELIVERY_LOG_KEEP_DAYS", default=30, cast=int)
+
+# Notifications left pending for longer than this number of seconds (their
+# process has stopped while sending them) are sent again. It must be longer
+# than sending of DELIVERY_LOG_BATCH_SIZE notifications.
+DELIVERY_SEND_TIMEOUT = config("DELIVERY_SEND_TIMEOUT", default=900, cast=int)
+
+# Notifications missed while the bot was down are sent on startup if they
+# were missed not earlier than this number of hours ago
+NOTIFICATIONS_CATCH_UP_HOURS = config(
+    "NOTIFICATIONS_CATCH_UP_HOURS", default=6, cast=int
+)
+
+# Number of processes that send daily notifications (0 - in bot's process)
+NOTIFICATION_WORKERS = config("NOTIFICATION_WORKERS", default=0, cast=int)
+
+# Max number of notifications sent at the same time
+NOTIFICATIONS_CONCURRENCY = config(
+    "NOTIFICATIONS_CONCURRENCY", default=20, cast=int
+)
+
+# Max number of requests to Telegram per second (for all chats). With
+# notification workers it is shared equally by them and the bot's process.
+SEND_RATE_LIMIT = config("SEND_RATE_LIMIT", default=25, cast=float)
+
+# Max number of requests to Telegram per second for one chat
+SEND_PER_CHAT_RATE_LIMIT = config(
+    "SEND_PER_CHAT_RATE_LIMIT", default=1, cast=float
+)
+
+# Number of requests that can be sent to one chat without waiting
+SEND_PER_CHAT_BURST = config("SEND_PER_CHAT_BURST", default=3, cast=int)
+
+# Number of workers that send requests to Telegram
+SEND_WORKERS = config("SEND_WORKERS", default=8, cast=int)
+
+# Max number of retries after «Too Many Requests» error
+SEND_MAX_RETRIES = config("SEND_MAX_RETRIES", default=3, cast=int)
+
+# Address of HTTP server with metrics (port 0 - the server is disabled).
+# Notification workers use next ports (METRICS_PORT + 1 + worker's number).
+METRICS_HOST = config("METRICS_HOST", default="127.0.0.1")
+METRICS_PORT = config("METRICS_PORT", default=9100, cast=int)
+
+# HTTP server with iCalendar feed of the holidays (0 - no server). Put a
+# secret to the path, as everyone who knows the URL can read the feed.
+CALENDAR_FEED_HOST = config("CALENDAR_FEED_HOST", default="127.0.0.1")
+CALENDAR_FEED_PORT = config("CALENDAR_FEED_PORT", default=0, cast=int)
+CALENDAR_FEED_PATH = config("CALENDAR_FEED_PATH", default="/holidays.ics")
+CALENDAR_FEED_NAME = config("CALENDAR_FEED_NAME", default="Семейные праздники")
+
+# Path to JSON file with Telegram's file_ids of uploaded photos
+MEDIA_CACHE_PATH = (
+    config("MEDIA_CACHE_PATH", default="media_cache.json") or None
+)
+
+# Path to JSON lines file with traces of updates (empty - not saved)
+TRACES_PATH = config("TRACES_PATH", default="") or None
+
+# Updates handled longer than this number of seconds are logged with spans
+TRACES_SLOW_THRESHOLD = config("TRACES_SLOW_THRESHOLD", default=1, cast=float)
+
+# Directory for cProfile files made by /profile command
+PROFILES_DIR = config("PROFILES_DIR", default="profiles")
+
+# Number of updates profiled by /profile command without argument
+PROFILED_UPDATES_COUNT = config(
+    "PROFILED_UPDATES_COUNT", default=100, cast=int
+)
+
+# Telegram ids of users that can use admin commands (comma separated)
+ADMIN_IDS = config(
+    "ADMIN_IDS",
+    default="",
+    cast=lambda value: [int(item) for item in value.split(",") if item],
+)
+
+# TODO: в .ini, разные уровни логирования
+LOGGING_SETTINGS = {
+    "level": INFO,
+    "filename": "logs.log",
+    "filemode": "a",
+    "format": (
+        "\n%(asctime)s.%(msecs)d - %(levelname)s (%(name)s)\n%(message)s"
+    ),
+    "datefmt": "%F %T",
+}
+
+# Max length of message's text in Telegram
+MESSAGE_MAX_LENGTH = 4096
+
+# Prefix of callback data of «◀» and «▶» buttons of /all_holidays
+HOLIDAYS_PAGE_CALLBACK = "holidays_page"
+
+# Shown above holidays if they can't be checked in DB (DB is unavailable)
+STALE_HOLIDAYS_NOTE = (
+    "⚠️ <i>Не получилось проверить праздники в базе, список может быть "
+    "неактуальным</i>\n\n"
 )
 
 ERROR_MESSAGE = (
@@ -56,6 +260,22 @@ SPRING_MONTHS = ["Март 🌷", "Апрель 🌷", "Май 🌷"]
 SUMMER_MONTHS = ["Июнь ☀️", "Июль ☀️", "Август ☀️"]
 AUTUMN_MONTHS = ["Сентябрь ☔", "Октябрь ☔", "Ноябрь ☔"]
 
+# Names of months in genitive case (for dates like «8 марта»)
+MONTHS_GENITIVE = (
+    "января",
+    "февраля",
+    "марта",
+    "апреля",
+    "мая",
+    "июня",
+    "июля",
+    "августа",
+    "сентября",
+    "октября",
+    "ноября",
+    "декабря",
+)
+
 MONTHS_NUMBERS = {
     WINTER_MONTHS[0]: 12,
     WINTER_MONTHS[1]: 1,
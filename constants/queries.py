@@ -1,55 +1,152 @@
-"""Queries to DB"""
+"""Queries to DB.
+
+All queries are parameterized (values are passed separately with «%s»
+placeholders), so every query is prepared once per connection and then
+executed with new values.
+
+"""
 
 _DAILY_NOTIFICATIONS_TABLE = "daily_notifications"
+_DELIVERIES_TABLE = "notification_deliveries"
 
-HOLIDAYS_SQL_QUERY = """
-SELECT date_of_holiday, title, is_birthday, whom_to_congratulate
-FROM holidays
-{where_condition}
-ORDER BY MONTH(date_of_holiday), DAY(date_of_holiday);
+# holiday_month and holiday_day are generated columns (see migrations.py),
+# the index (with primary key in it) gives holidays in order without sorting
+ALL_HOLIDAYS_SQL_QUERY = """
+SELECT date_of_holiday, title, is_birthday, whom_to_congratulate, id
+FROM holidays FORCE INDEX FOR ORDER BY (idx_holidays_month_day)
+ORDER BY holiday_month, holiday_day, id
 """
 
-ALL_HOLIDAYS_SQL_QUERY = HOLIDAYS_SQL_QUERY.format(where_condition="")
+HOLIDAYS_VERSION_QUERY = "CHECKSUM TABLE holidays"
 
-THIS_MONTH_HOLIDAYS_SQL_QUERY = HOLIDAYS_SQL_QUERY.format(
-    where_condition="WHERE MONTH(date_of_holiday) = MONTH(CURRENT_DATE())"
+# Params - chat_id
+IS_EXISTS_DAILY_NOTIFICATIONS_QUERY = (
+    f"SELECT EXISTS(SELECT * FROM {_DAILY_NOTIFICATIONS_TABLE} "
+    "WHERE chat_id=%s)"
 )
 
-NEXT_MONTH_HOLIDAYS_SQL_QUERY = HOLIDAYS_SQL_QUERY.format(
-    where_condition="WHERE MONTH(date_of_holiday) = MONTH(CURRENT_DATE()"
-    " + INTERVAL 1 MONTH)"
+# Keyset pagination by chat_id (params - last chat_id and page size)
+GET_DAILY_NOTIFICATIONS_PAGE_QUERY = (
+    "SELECT chat_id, notification_time, reminder_days, time_zone "
+    f"FROM {_DAILY_NOTIFICATIONS_TABLE} "
+    "WHERE chat_id > %s ORDER BY chat_id LIMIT %s"
 )
 
-SPECIFIED_MONTH_HOLIDAYS_SQL_QUERY = HOLIDAYS_SQL_QUERY.format(
-    where_condition="WHERE MONTH(date_of_holiday) = {month}"
+# Params - chat_id
+GET_REMINDER_DAYS_QUERY = (
+    f"SELECT reminder_days FROM {_DAILY_NOTIFICATIONS_TABLE} "
+    "WHERE chat_id=%s"
 )
 
-TODAYS_HOLIDAYS_SQL_QUERY = HOLIDAYS_SQL_QUERY.format(
-    where_condition=(
-        "WHERE DAY(date_of_holiday) = DAY(CURRENT_DATE()) "
-        "AND MONTH(date_of_holiday) = MONTH(CURRENT_DATE())"
-    )
+# Params - days before holidays (comma separated) and chat_id
+CHANGE_REMINDER_DAYS_QUERY = (
+    f"UPDATE {_DAILY_NOTIFICATIONS_TABLE} SET reminder_days=%s "
+    "WHERE chat_id=%s"
 )
 
-IS_EXISTS_DAILY_NOTIFICATIONS_QUERY = (
-    f"SELECT EXISTS(SELECT * FROM {_DAILY_NOTIFICATIONS_TABLE} "
-    "WHERE chat_id='{chat_id}')"
+# Params - chat_id
+GET_TIME_ZONE_QUERY = (
+    f"SELECT time_zone FROM {_DAILY_NOTIFICATIONS_TABLE} WHERE chat_id=%s"
 )
 
-GET_DAILY_NOTIFICATIONS_QUERY = (
-    f"SELECT chat_id, notification_time FROM {_DAILY_NOTIFICATIONS_TABLE}"
+# Params - IANA time zone and chat_id
+CHANGE_TIME_ZONE_QUERY = (
+    f"UPDATE {_DAILY_NOTIFICATIONS_TABLE} SET time_zone=%s WHERE chat_id=%s"
 )
 
+# Params - chat_id
 ADD_DAILY_NOTIFICATIONS_QUERY = (
-    f"INSERT IGNORE INTO {_DAILY_NOTIFICATIONS_TABLE}(chat_id) "
-    "VALUES('{chat_id}')"
+    f"INSERT IGNORE INTO {_DAILY_NOTIFICATIONS_TABLE}(chat_id) VALUES(%s)"
 )
 
+# Params - chat_id
 DELETE_DAILY_NOTIFICATIONS_QUERY = (
-    f"DELETE FROM {_DAILY_NOTIFICATIONS_TABLE} " "WHERE chat_id='{chat_id}'"
+    f"DELETE FROM {_DAILY_NOTIFICATIONS_TABLE} WHERE chat_id=%s"
 )
 
+# Params - new time and chat_id
 CHANGE_DAILY_NOTIFICATION_TIME_QUERY = (
-    f"UPDATE {_DAILY_NOTIFICATIONS_TABLE} SET "
-    "notification_time='{new_time}' WHERE chat_id='{chat_id}'"
+    f"UPDATE {_DAILY_NOTIFICATIONS_TABLE} SET notification_time=%s "
+    "WHERE chat_id=%s"
+)
+
+# Deliveries are claimed before sending: rows that already exist (the chat
+# has got the date's notification) keep their batch id, so the chats
+# claimed by the batch are selected by it. Executed for batches of rows.
+# Params - chat_id, date, due UTC minute and batch id
+CLAIM_DELIVERIES_QUERY = (
+    f"INSERT INTO {_DELIVERIES_TABLE}"
+    "(chat_id, delivery_date, due_minute, status, batch_id) "
+    "VALUES(%s, %s, %s, 'pending', %s) "
+    "ON DUPLICATE KEY UPDATE chat_id=chat_id"
+)
+
+# Params - batch id
+GET_CLAIMED_DELIVERIES_QUERY = (
+    f"SELECT chat_id FROM {_DELIVERIES_TABLE} WHERE batch_id=%s"
+)
+
+# Failed deliveries and deliveries left pending (created_at is the time of
+# the last claim) by a stopped process.
+# Params - the first date and seconds of the send timeout
+GET_UNFINISHED_DELIVERIES_QUERY = (
+    f"SELECT chat_id, delivery_date, status FROM {_DELIVERIES_TABLE} "
+    "WHERE delivery_date >= %s AND (status='failed' OR "
+    "(status='pending' AND created_at < NOW() - INTERVAL %s SECOND))"
+)
+
+# Claims unfinished deliveries again: the status is checked, so deliveries
+# that have been sent or claimed again by another process are kept.
+# Executed for batches of rows.
+# Params - batch id, chat_id, date and seconds of the send timeout
+RECLAIM_DELIVERIES_QUERY = (
+    f"UPDATE {_DELIVERIES_TABLE} "
+    "SET status='pending', batch_id=%s, created_at=CURRENT_TIMESTAMP "
+    "WHERE chat_id=%s AND delivery_date=%s AND (status='failed' OR "
+    "(status='pending' AND created_at < NOW() - INTERVAL %s SECOND))"
+)
+
+# Executed for batches of rows. Params - status, chat_id and date
+CHANGE_DELIVERY_STATUS_QUERY = (
+    f"UPDATE {_DELIVERIES_TABLE} SET status=%s "
+    "WHERE chat_id=%s AND delivery_date=%s"
+)
+
+# Params - status and batch id
+FINISH_DELIVERIES_QUERY = (
+    f"UPDATE {_DELIVERIES_TABLE} SET status=%s "
+    "WHERE batch_id=%s AND status='pending'"
+)
+
+# Params - the first date to keep
+DELETE_OLD_DELIVERIES_QUERY = (
+    f"DELETE FROM {_DELIVERIES_TABLE} WHERE delivery_date < %s"
+)
+
+# Params - shard (number/count)
+GET_WATERMARK_QUERY = (
+    "SELECT turned_minute FROM notification_watermarks WHERE shard=%s"
+)
+
+# Params - shard (number/count) and the last turned UTC minute
+SAVE_WATERMARK_QUERY = (
+    "INSERT INTO notification_watermarks(shard, turned_minute) "
+    "VALUES(%s, %s) ON DUPLICATE KEY UPDATE turned_minute=%s"
+)
+
+# Holidays are unique by title and date (see migrations.py), imported
+# duplicates update the existing holidays. Executed for batches of rows.
+# Params - date, title, is birthday and whom to congratulate
+UPSERT_HOLIDAYS_QUERY = (
+    "INSERT INTO holidays"
+    "(date_of_holiday, title, is_birthday, whom_to_congratulate) "
+    "VALUES(%s, %s, %s, %s) "
+    "ON DUPLICATE KEY UPDATE is_birthday=VALUES(is_birthday), "
+    "whom_to_congratulate=VALUES(whom_to_congratulate)"
+)
+
+# Keyset pagination by id (params - last id and page size)
+GET_HOLIDAYS_PAGE_QUERY = (
+    "SELECT date_of_holiday, title, is_birthday, whom_to_congratulate, id "
+    "FROM holidays WHERE id > %s ORDER BY id LIMIT %s"
 )
@@ -1,6 +1,81 @@
 """Custom types for type hints"""
 
 from datetime import date
-from typing import Tuple
+from typing import Iterator, List, NamedTuple, Optional, Tuple
 
 TypeHoliday = Tuple[date, str, int, str]
+
+# Position of the holiday in the sorted holidays - (month, day, id)
+TypePageKey = Tuple[int, int, int]
+
+
+class HolidayRecord:
+    """Holiday from DB.
+
+    Unpacks the same way as TypeHoliday (without id):
+
+    >>> holiday_date, title, is_birthday, whom_to_congratulate = record
+
+    """
+
+    __slots__ = (
+        "date_of_holiday",
+        "title",
+        "is_birthday",
+        "whom_to_congratulate",
+        "holiday_id",
+    )
+
+    def __init__(
+        self,
+        date_of_holiday: date,
+        title: str,
+        is_birthday: int,
+        whom_to_congratulate: str,
+        holiday_id: Optional[int] = None,
+    ) -> None:
+        self.date_of_holiday = date_of_holiday
+        self.title = title
+        self.is_birthday = is_birthday
+        self.whom_to_congratulate = whom_to_congratulate
+        self.holiday_id = holiday_id
+
+    def __iter__(self) -> Iterator:
+        return iter(self.as_tuple())
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, HolidayRecord):
+            return NotImplemented
+
+        return self.as_tuple() == other.as_tuple()
+
+    def __repr__(self) -> str:
+        return f"HolidayRecord{self.as_tuple()!r}"
+
+    def as_tuple(self) -> TypeHoliday:
+        """Return the holiday as TypeHoliday"""
+
+        return (
+            self.date_of_holiday,
+            self.title,
+            self.is_birthday,
+            self.whom_to_congratulate,
+        )
+
+
+class HolidaysPage(NamedTuple):
+    """Holidays of one page with their keys for keyset pagination"""
+
+    holidays: List[HolidayRecord]
+    keys: List[TypePageKey]
+    has_previous: bool
+    has_next: bool
+
+
+class DeliveryReport(NamedTuple):
+    """How many chats got the daily notification"""
+
+    delivered: int
+    skipped: int
+    failed: int
+    failed_chat_ids: Tuple[str, ...] = ()
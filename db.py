@@ -0,0 +1,514 @@
+"""Asynchronous access to DB.
+
+Queries are executed by a bounded thread pool, so the event loop is never
+blocked by the synchronous MySQL connector.
+
+Queries from constants/queries.py are prepared once per connection (every
+connection keeps a prepared cursor for every query) and then executed with
+new values only. Batches of rows are executed by ordinary cursors, so the
+connector sends a multi-row INSERT instead of a query per row.
+
+Connections work in autocommit mode, queries that must be applied together
+are executed in «DBPool.transaction()».
+
+Queries fail fast while DB is unavailable (see circuit_breaker.py).
+
+Nothing is connected on import: the pool reads DB settings when it is
+started (see resources.py) and opens connections on first use.
+
+"""
+
+from asyncio import Semaphore
+from asyncio import TimeoutError as AsyncTimeoutError
+from asyncio import get_running_loop, shield, wait_for
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from logging import getLogger
+from time import perf_counter
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence
+
+from mysql.connector import connect
+from mysql.connector.errors import InterfaceError, OperationalError
+
+from circuit_breaker import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    CircuitOpenError,
+)
+from constants import queries
+from constants.constants import (
+    DB_CIRCUIT_FAILURE_THRESHOLD,
+    DB_CIRCUIT_RESET_TIMEOUT,
+    DB_POOL_SIZE,
+    DB_QUERY_TIMEOUT,
+    get_db_settings,
+)
+from metrics import DB_QUERY_DURATION, DB_QUERY_ERRORS, Gauge
+from tracing import span
+
+logger = getLogger(__name__)
+
+_FETCH_ALL = "all"
+_FETCH_ONE = "one"
+_FETCH_NONE = "none"
+_EXECUTE_MANY = "many"
+
+# Registry of queries that are prepared - query -> name (for metrics)
+_QUERIES_NAMES = {
+    query: name
+    for name, query in vars(queries).items()
+    if name.endswith("_QUERY") and isinstance(query, str)
+}
+
+# Errors that mean DB is unavailable (other errors are DB's answers)
+_UNAVAILABLE_ERRORS = (InterfaceError, OperationalError)
+
+
+class _PooledConnection:
+    """Slot of the pool that keeps one (lazily opened) connection and its
+    prepared cursors"""
+
+    __slots__ = ("connection", "cursors")
+
+    def __init__(self) -> None:
+        self.connection = None
+        # Query -> cursor with the prepared query
+        self.cursors: Dict[str, Any] = {}
+
+
+class Transaction:
+    """Queries of one transaction with one connection (see
+    «DBPool.transaction»)"""
+
+    __slots__ = ("_pool", "_pooled_connection")
+
+    def __init__(
+        self, pool: "DBPool", pooled_connection: _PooledConnection
+    ) -> None:
+        self._pool = pool
+        self._pooled_connection = pooled_connection
+
+    async def execute(
+        self, query: str, params: Optional[Sequence] = None
+    ) -> int:
+        """Execute the query and return number of affected rows"""
+
+        return await self._pool._run_in_transaction(
+            self._pooled_connection, query, params, _FETCH_NONE
+        )
+
+    async def execute_many(
+        self, query: str, params_seq: Sequence[Sequence]
+    ) -> int:
+        """Execute the query for every params and return number of affected
+        rows"""
+
+        if not params_seq:
+            return 0
+
+        return await self._pool._run_in_transaction(
+            self._pooled_connection, query, params_seq, _EXECUTE_MANY
+        )
+
+
+class DBPool:
+    """Pool of DB connections with async interface.
+
+    Every query takes a free connection, runs in the pool's executor and
+    gives the connection back. Connections are opened on first use and
+    reopened if the server has closed them. Without settings the pool
+    reads them from the environment when it is started.
+
+    """
+
+    def __init__(
+        self,
+        settings: Optional[Dict[str, Any]] = None,
+        size: int = 5,
+        query_timeout: float = 10,
+        breaker: Optional[CircuitBreaker] = None,
+    ) -> None:
+        self._settings = settings
+        self._size = size
+        self._query_timeout = query_timeout
+        self.breaker = breaker
+
+        self._free_connections = [_PooledConnection() for _ in range(size)]
+        self._pooled_connections = list(self._free_connections)
+        self._semaphore = None
+        self._executor = None
+
+        # Query name -> number of executions
+        self.executions: Dict[str, int] = {}
+
+    async def fetch_all(
+        self, query: str, params: Optional[Sequence] = None
+    ) -> List[tuple]:
+        """Execute the query and return all rows"""
+
+        return await self._execute(query, params, _FETCH_ALL)
+
+    async def fetch_one(
+        self, query: str, params: Optional[Sequence] = None
+    ) -> Optional[tuple]:
+        """Execute the query and return the first row"""
+
+        return await self._execute(query, params, _FETCH_ONE)
+
+    async def execute(
+        self, query: str, params: Optional[Sequence] = None
+    ) -> int:
+        """Execute the query and return number of affected rows"""
+
+        return await self._execute(query, params, _FETCH_NONE)
+
+    async def execute_many(
+        self, query: str, params_seq: Sequence[Sequence]
+    ) -> int:
+        """Execute the query for every params (one multi-row INSERT for
+        «INSERT ... VALUES») and return number of affected rows"""
+
+        if not params_seq:
+            return 0
+
+        return await self._execute(query, params_seq, _EXECUTE_MANY)
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[Transaction]:
+        """Take a free connection for queries of one transaction.
+
+        The transaction is committed if the block succeeds and rolled back
+        otherwise. Queries of the transaction have no timeout (only waiting
+        for the connection has).
+
+        """
+
+        self.start()
+        self._check_breaker("transaction")
+
+        await self._acquire("transaction")
+        pooled_connection = self._free_connections.pop()
+        loop = get_running_loop()
+
+        try:
+            try:
+                await loop.run_in_executor(
+                    self._executor, self._begin_in_thread, pooled_connection
+                )
+            except Exception as error:
+                self._record_result(error)
+                raise
+
+            try:
+                yield Transaction(self, pooled_connection)
+            except BaseException as error:
+                # A failed rollback (e.g. the connection is lost) must not
+                # hide the error of the block
+                try:
+                    await loop.run_in_executor(
+                        self._executor, pooled_connection.connection.rollback
+                    )
+                except Exception as rollback_error:
+                    logger.warning("Rollback failed: %s", rollback_error)
+
+                raise error
+
+            await loop.run_in_executor(
+                self._executor, pooled_connection.connection.commit
+            )
+        finally:
+            self._free_connections.append(pooled_connection)
+            self._semaphore.release()
+
+    def start(self) -> None:
+        """Read settings, create the semaphore and the executor (called on
+        first use if the pool isn't started)"""
+
+        if self._settings is None:
+            self._settings = get_db_settings()
+
+        if self._semaphore is None:
+            self._semaphore = Semaphore(self._size)
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self._size, thread_name_prefix="db"
+            )
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return number of executions of every query and number of
+        prepared statements in all connections"""
+
+        return {
+            "executions": dict(self.executions),
+            "prepared_statements": sum(
+                len(pooled_connection.cursors)
+                for pooled_connection in self._pooled_connections
+            ),
+        }
+
+    def close(self) -> None:
+        """Close all opened connections"""
+
+        for pooled_connection in self._free_connections:
+            pooled_connection.cursors.clear()
+
+            if pooled_connection.connection is not None:
+                pooled_connection.connection.close()
+                pooled_connection.connection = None
+
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    async def _execute(
+        self, query: str, params: Optional[Sequence], fetch: str
+    ) -> Any:
+        """Run the query in the executor with a free connection"""
+
+        self.start()
+
+        query_name = _QUERIES_NAMES.get(query, "other")
+        self._check_breaker(query_name)
+
+        await self._acquire(query_name)
+        pooled_connection = self._free_connections.pop()
+
+        future = get_running_loop().run_in_executor(
+            self._executor,
+            self._execute_in_thread,
+            pooled_connection,
+            query,
+            params,
+            fetch,
+        )
+
+        self.executions[query_name] = self.executions.get(query_name, 0) + 1
+        started_at = perf_counter()
+
+        try:
+            with span("db.query", query=query_name):
+                result = await wait_for(shield(future), self._query_timeout)
+        except AsyncTimeoutError:
+            DB_QUERY_ERRORS.inc(query_name, "timeout")
+            error = OperationalError(
+                msg=f"Query timed out after {self._query_timeout} seconds"
+            )
+            self._record_result(error)
+            raise error from None
+        except Exception as error:
+            DB_QUERY_ERRORS.inc(query_name, type(error).__name__)
+            self._record_result(error)
+            raise
+        finally:
+            DB_QUERY_DURATION.observe(perf_counter() - started_at, query_name)
+
+            # The connection is busy until the thread finishes the query
+            if future.done():
+                self._release(pooled_connection, future)
+            else:
+                future.add_done_callback(
+                    lambda done_future: self._release(
+                        pooled_connection, done_future
+                    )
+                )
+
+        self._record_result()
+
+        return result
+
+    async def _run_in_transaction(
+        self,
+        pooled_connection: _PooledConnection,
+        query: str,
+        params: Optional[Sequence],
+        fetch: str,
+    ) -> Any:
+        """Run the query in the executor with the transaction's connection
+        (without reconnecting - the transaction is lost with it)"""
+
+        query_name = _QUERIES_NAMES.get(query, "other")
+        self.executions[query_name] = self.executions.get(query_name, 0) + 1
+        started_at = perf_counter()
+
+        try:
+            with span("db.query", query=query_name):
+                result = await get_running_loop().run_in_executor(
+                    self._executor,
+                    self._run_query,
+                    pooled_connection,
+                    query,
+                    params,
+                    fetch,
+                )
+        except Exception as error:
+            DB_QUERY_ERRORS.inc(query_name, type(error).__name__)
+            self._record_result(error)
+            raise
+        finally:
+            DB_QUERY_DURATION.observe(perf_counter() - started_at, query_name)
+
+        self._record_result()
+
+        return result
+
+    async def _acquire(self, query_name: str) -> None:
+        """Wait for a free connection (not longer than the query timeout)"""
+
+        try:
+            await wait_for(self._semaphore.acquire(), self._query_timeout)
+        except AsyncTimeoutError:
+            DB_QUERY_ERRORS.inc(query_name, "acquire_timeout")
+            raise OperationalError(
+                msg=(
+                    "No free DB connection after "
+                    f"{self._query_timeout} seconds"
+                )
+            ) from None
+
+    def _check_breaker(self, query_name: str) -> None:
+        """Raise CircuitOpenError at once if DB is unavailable"""
+
+        if self.breaker is None:
+            return
+
+        try:
+            self.breaker.before_call()
+        except CircuitOpenError:
+            DB_QUERY_ERRORS.inc(query_name, "circuit_open")
+            raise
+
+    def _record_result(self, error: Optional[Exception] = None) -> None:
+        """Tell the breaker if DB has answered"""
+
+        if self.breaker is None:
+            return
+
+        if isinstance(error, _UNAVAILABLE_ERRORS):
+            self.breaker.record_failure(error)
+        else:
+            self.breaker.record_success()
+
+    def _begin_in_thread(self, pooled_connection: _PooledConnection) -> None:
+        """Start a transaction, reconnect if the connection is lost"""
+
+        if pooled_connection.connection is None:
+            pooled_connection.connection = self._connect()
+        elif not pooled_connection.connection.is_connected():
+            pooled_connection.connection.reconnect(attempts=3, delay=1)
+            pooled_connection.cursors.clear()
+
+        pooled_connection.connection.start_transaction()
+
+    def _release(self, pooled_connection: _PooledConnection, future) -> None:
+        """Give the connection back to the pool"""
+
+        if not future.cancelled():
+            # Mark the exception as retrieved for abandoned (timed out) calls
+            future.exception()
+
+        self._free_connections.append(pooled_connection)
+        self._semaphore.release()
+
+    def _execute_in_thread(
+        self,
+        pooled_connection: _PooledConnection,
+        query: str,
+        params: Optional[Sequence],
+        fetch: str,
+    ) -> Any:
+        """Execute the query, reconnect once if the connection is lost"""
+
+        if pooled_connection.connection is None:
+            pooled_connection.connection = self._connect()
+
+        connection = pooled_connection.connection
+
+        try:
+            return self._run_query(pooled_connection, query, params, fetch)
+        except (InterfaceError, OperationalError) as error:
+            if connection.is_connected():
+                raise
+
+            logger.warning("Lost connection to DB, reconnecting: %s", error)
+            connection.reconnect(attempts=3, delay=1)
+            # Prepared statements are lost with the old session
+            pooled_connection.cursors.clear()
+
+            return self._run_query(pooled_connection, query, params, fetch)
+
+    def _connect(self):
+        """Open a new connection to DB"""
+
+        # Autocommit keeps pooled connections from reading stale snapshots
+        return connect(**self._settings, autocommit=True)
+
+    @staticmethod
+    def _run_query(
+        pooled_connection: _PooledConnection,
+        query: str,
+        params: Optional[Sequence],
+        fetch: str,
+    ) -> Any:
+        """Execute the query with the connection and fetch the result.
+
+        Queries from the registry are executed by their prepared cursors,
+        other queries and batches - by a new ordinary cursor.
+
+        """
+
+        is_prepared = query in _QUERIES_NAMES and fetch != _EXECUTE_MANY
+
+        if is_prepared:
+            cursor = pooled_connection.cursors.get(query)
+
+            if cursor is None:
+                cursor = pooled_connection.connection.cursor(prepared=True)
+                pooled_connection.cursors[query] = cursor
+        else:
+            cursor = pooled_connection.connection.cursor()
+
+        try:
+            if fetch == _EXECUTE_MANY:
+                cursor.executemany(query, params)
+                return cursor.rowcount
+
+            # The cursor prepares the query only if it has not done it yet
+            cursor.execute(query, params)
+
+            if fetch == _FETCH_ALL:
+                return cursor.fetchall()
+            if fetch == _FETCH_ONE:
+                row = cursor.fetchone()
+                cursor.fetchall()
+                return row
+
+            return cursor.rowcount
+        except Exception:
+            # The statement may be broken, prepare it again next time
+            if is_prepared:
+                pooled_connection.cursors.pop(query, None)
+
+            raise
+        finally:
+            if not is_prepared:
+                cursor.close()
+
+
+DB_POOL = DBPool(
+    size=DB_POOL_SIZE,
+    query_timeout=DB_QUERY_TIMEOUT,
+    breaker=CircuitBreaker(
+        DB_CIRCUIT_FAILURE_THRESHOLD, DB_CIRCUIT_RESET_TIMEOUT
+    ),
+)
+
+_CIRCUIT_STATES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+DB_CIRCUIT_STATE = Gauge(
+    "bot_db_circuit_state",
+    "State of DB circuit breaker (0 - closed, 1 - half-open, 2 - open)",
+    lambda: _CIRCUIT_STATES[DB_POOL.breaker.state],
+)
@@ -0,0 +1,212 @@
+"""Log of daily notifications deliveries.
+
+Notifications are claimed in the log before sending: rows (chat id and the
+chat's local date) are inserted in batches, and a chat that already has a
+row for the date isn't sent the notification again. So no chat gets the
+same date's notification twice - after a restart or after moving the
+notification to a later time.
+
+Notifications are claimed and sent in small batches. If the bot stops
+while sending a batch, its notifications stay «pending». Such
+notifications (after the send timeout) and failed ones are claimed again
+and sent (see «jobs.resend_unfinished_deliveries»): the claim checks the
+status, so only one process sends them.
+
+The last turned minute of the notifications wheel (the watermark) is saved
+for every shard after every turn, so on startup the notifications missed
+since the watermark are sent.
+
+"""
+
+from datetime import date
+from logging import getLogger
+from random import getrandbits
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+from constants.constants import DELIVERY_LOG_BATCH_SIZE, DELIVERY_SEND_TIMEOUT
+from constants.queries import (
+    CHANGE_DELIVERY_STATUS_QUERY,
+    CLAIM_DELIVERIES_QUERY,
+    DELETE_OLD_DELIVERIES_QUERY,
+    FINISH_DELIVERIES_QUERY,
+    GET_CLAIMED_DELIVERIES_QUERY,
+    GET_UNFINISHED_DELIVERIES_QUERY,
+    GET_WATERMARK_QUERY,
+    RECLAIM_DELIVERIES_QUERY,
+    SAVE_WATERMARK_QUERY,
+)
+from custom_types import DeliveryReport
+from db import DB_POOL, DBPool
+
+logger = getLogger(__name__)
+
+PENDING_STATUS = "pending"
+SENT_STATUS = "sent"
+SKIPPED_STATUS = "skipped"
+FAILED_STATUS = "failed"
+
+
+class DeliveryBatch(NamedTuple):
+    """Chats whose notifications for the date are claimed together"""
+
+    batch_id: int
+    delivery_date: date
+    chat_ids: List[str]
+
+
+class DeliveryLog:
+    """Deliveries of daily notifications and watermarks of shards in DB"""
+
+    def __init__(
+        self,
+        pool: DBPool,
+        batch_size: int,
+        send_timeout: int = DELIVERY_SEND_TIMEOUT,
+    ) -> None:
+        self.batch_size = batch_size
+        self.send_timeout = send_timeout
+
+        self._pool = pool
+
+    async def claim(
+        self, chat_ids: Iterable[str], delivery_date: date, due_minute: int
+    ) -> DeliveryBatch:
+        """Claim notifications of the chats for their local date.
+
+        Return batch with the chats that haven't got the date's
+        notification yet.
+
+        """
+
+        chat_ids = [str(chat_id) for chat_id in chat_ids]
+        batch_id = getrandbits(63)
+        rows = [
+            (chat_id, delivery_date, due_minute, batch_id)
+            for chat_id in chat_ids
+        ]
+
+        for start in range(0, len(rows), self.batch_size):
+            await self._pool.execute_many(
+                CLAIM_DELIVERIES_QUERY, rows[start : start + self.batch_size]
+            )
+
+        batch = await self._get_batch(batch_id, delivery_date, chat_ids)
+
+        if len(batch.chat_ids) < len(chat_ids):
+            logger.warning(
+                "Notifications for %s were already sent to %s chats",
+                delivery_date,
+                len(chat_ids) - len(batch.chat_ids),
+            )
+
+        return batch
+
+    async def get_unfinished(
+        self, first_date: date
+    ) -> List[Tuple[str, date, str]]:
+        """Return chat ids, dates and statuses of failed deliveries and of
+        deliveries left pending for longer than the send timeout (since the
+        first date)"""
+
+        return [
+            (str(chat_id), delivery_date, status)
+            for chat_id, delivery_date, status in await self._pool.fetch_all(
+                GET_UNFINISHED_DELIVERIES_QUERY,
+                (first_date, self.send_timeout),
+            )
+        ]
+
+    async def reclaim(
+        self, chat_ids: Iterable[str], delivery_date: date
+    ) -> DeliveryBatch:
+        """Claim unfinished deliveries of the chats for the date again.
+
+        Return batch with the chats whose deliveries are still unfinished
+        (the rest have been sent or claimed by another process meanwhile).
+
+        """
+
+        chat_ids = [str(chat_id) for chat_id in chat_ids]
+        batch_id = getrandbits(63)
+        rows = [
+            (batch_id, chat_id, delivery_date, self.send_timeout)
+            for chat_id in chat_ids
+        ]
+
+        for start in range(0, len(rows), self.batch_size):
+            await self._pool.execute_many(
+                RECLAIM_DELIVERIES_QUERY,
+                rows[start : start + self.batch_size],
+            )
+
+        return await self._get_batch(batch_id, delivery_date, chat_ids)
+
+    async def finish(
+        self, batch: DeliveryBatch, report: DeliveryReport
+    ) -> None:
+        """Save statuses of the batch's deliveries from the report"""
+
+        rows = [
+            (FAILED_STATUS, chat_id, batch.delivery_date)
+            for chat_id in report.failed_chat_ids
+        ]
+
+        for start in range(0, len(rows), self.batch_size):
+            await self._pool.execute_many(
+                CHANGE_DELIVERY_STATUS_QUERY,
+                rows[start : start + self.batch_size],
+            )
+
+        if report.delivered:
+            status = SENT_STATUS
+        elif report.skipped:
+            status = SKIPPED_STATUS
+        else:
+            status = FAILED_STATUS
+
+        await self._pool.execute(
+            FINISH_DELIVERIES_QUERY, (status, batch.batch_id)
+        )
+
+    async def delete_old(self, first_date: date) -> int:
+        """Delete deliveries before the date, return their number"""
+
+        deleted_count = await self._pool.execute(
+            DELETE_OLD_DELIVERIES_QUERY, (first_date,)
+        )
+        logger.info("Old deliveries deleted: %s", deleted_count)
+
+        return deleted_count
+
+    async def get_watermark(self, shard: str) -> Optional[int]:
+        """Return the last turned UTC minute (since epoch) of the shard"""
+
+        row = await self._pool.fetch_one(GET_WATERMARK_QUERY, (shard,))
+
+        return row[0] if row else None
+
+    async def save_watermark(self, shard: str, minute: int) -> None:
+        """Save the last turned UTC minute (since epoch) of the shard"""
+
+        await self._pool.execute(SAVE_WATERMARK_QUERY, (shard, minute, minute))
+
+    async def _get_batch(
+        self, batch_id: int, delivery_date: date, chat_ids: List[str]
+    ) -> DeliveryBatch:
+        """Return batch with the chats claimed by the batch id"""
+
+        claimed_chat_ids = {
+            str(row[0])
+            for row in await self._pool.fetch_all(
+                GET_CLAIMED_DELIVERIES_QUERY, (batch_id,)
+            )
+        }
+
+        return DeliveryBatch(
+            batch_id,
+            delivery_date,
+            [chat_id for chat_id in chat_ids if chat_id in claimed_chat_ids],
+        )
+
+
+DELIVERY_LOG = DeliveryLog(DB_POOL, DELIVERY_LOG_BATCH_SIZE)
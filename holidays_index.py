@@ -0,0 +1,258 @@
+"""In-memory index of the holidays.
+
+The holidays table is small and rarely changed, so it is loaded once and
+kept in memory bucketed by month and by (month, day). The index is reloaded
+only when the table's checksum changes.
+
+If DB is unavailable, the last loaded holidays are still served, and the
+index is marked as possibly stale until the next successful check.
+
+"""
+
+from asyncio import Lock
+from bisect import bisect_left, bisect_right
+from calendar import isleap
+from datetime import date
+from logging import getLogger
+from typing import Dict, List, Optional, Tuple
+
+from mysql.connector import Error
+
+from constants.queries import ALL_HOLIDAYS_SQL_QUERY, HOLIDAYS_VERSION_QUERY
+from custom_types import HolidayRecord, HolidaysPage, TypePageKey
+from db import DB_POOL
+
+logger = getLogger(__name__)
+
+
+class HolidayIndex:
+    """Holidays sorted by month, day and id (as in DB)"""
+
+    def __init__(self) -> None:
+        self.version = None
+
+        self._holidays: List[HolidayRecord] = []
+        # Sorted keys of the holidays for keyset pagination
+        self._keys: List[TypePageKey] = []
+        self._by_month: Dict[int, List[HolidayRecord]] = {}
+        self._by_month_and_day: Dict[Tuple[int, int], List[HolidayRecord]] = {}
+
+        self._is_loaded = False
+        self._is_stale = False
+        self._lock = None
+
+    @property
+    def is_loaded(self) -> bool:
+        """Is the index loaded from DB"""
+
+        return self._is_loaded
+
+    async def get_version(self) -> Optional[int]:
+        """Return version of the loaded holidays (loaded on first use), so
+        messages rendered from them can be cached by it"""
+
+        await self._ensure_loaded()
+
+        return self.version
+
+    async def get_all(self) -> List[HolidayRecord]:
+        """Return all holidays"""
+
+        await self._ensure_loaded()
+
+        return list(self._holidays)
+
+    async def get_month(self, month: int) -> List[HolidayRecord]:
+        """Return holidays in the month"""
+
+        await self._ensure_loaded()
+
+        return list(self._by_month.get(month, ()))
+
+    async def get_day(self, month: int, day: int) -> List[HolidayRecord]:
+        """Return holidays in the day of the month"""
+
+        await self._ensure_loaded()
+
+        return list(self._by_month_and_day.get((month, day), ()))
+
+    async def get_date(self, date_: date) -> List[HolidayRecord]:
+        """Return holidays celebrated on the date.
+
+        Holidays on February 29 are celebrated on February 28 in non-leap
+        years.
+
+        """
+
+        holidays = await self.get_day(date_.month, date_.day)
+
+        if (date_.month, date_.day) == (2, 28) and not isleap(date_.year):
+            holidays.extend(self._by_month_and_day.get((2, 29), ()))
+
+        return holidays
+
+    async def get_page(
+        self,
+        limit: int,
+        after: Optional[TypePageKey] = None,
+        before: Optional[TypePageKey] = None,
+    ) -> HolidaysPage:
+        """Return up to «limit» holidays after the key (or before the key,
+        or from the start)"""
+
+        await self._ensure_loaded()
+
+        if before is not None:
+            end = bisect_left(self._keys, tuple(before))
+            start = max(end - limit, 0)
+        else:
+            start = (
+                bisect_right(self._keys, tuple(after))
+                if after is not None
+                else 0
+            )
+            end = min(start + limit, len(self._holidays))
+
+        return HolidaysPage(
+            holidays=self._holidays[start:end],
+            keys=self._keys[start:end],
+            has_previous=start > 0,
+            has_next=end < len(self._holidays),
+        )
+
+    async def get_upcoming(
+        self, today: date, count: int
+    ) -> List[HolidayRecord]:
+        """Return the next «count» holidays from today (including today).
+
+        Holidays are sorted by (month, day) - by day of a leap year, so the
+        list is a ring: it is bisected from today and continues from the
+        start of the next year. February 29 is between February 28 and
+        March 1, as it is celebrated on February 28 in non-leap years.
+
+        """
+
+        await self._ensure_loaded()
+
+        holidays_count = len(self._holidays)
+        start = bisect_left(self._keys, (today.month, today.day))
+
+        return [
+            self._holidays[(start + offset) % holidays_count]
+            for offset in range(min(count, holidays_count))
+        ]
+
+    @property
+    def is_stale(self) -> bool:
+        """Did the last check of holidays in DB fail (the loaded holidays
+        may be changed already)"""
+
+        return self._is_stale
+
+    async def load(self) -> None:
+        """Load all holidays from DB"""
+
+        async with self._get_lock():
+            await self._load(await self._get_db_version())
+
+    async def refresh(self) -> bool:
+        """Reload holidays if they were changed in DB.
+
+        Return True if the index was reloaded.
+
+        """
+
+        async with self._get_lock():
+            db_version = await self._get_db_version()
+
+            if self._is_loaded and db_version == self.version:
+                return False
+
+            await self._load(db_version)
+
+        return True
+
+    def build(self, rows: List[tuple], version: Optional[int] = None) -> None:
+        """Build the index from rows sorted by month, day and id"""
+
+        holidays = [HolidayRecord(*row) for row in rows]
+        keys = []
+        by_month = {}
+        by_month_and_day = {}
+
+        for position, holiday in enumerate(holidays):
+            holiday_date = holiday.date_of_holiday
+
+            # Rows without id (not from DB) are ordered by position
+            keys.append(
+                (
+                    holiday_date.month,
+                    holiday_date.day,
+                    (
+                        holiday.holiday_id
+                        if holiday.holiday_id is not None
+                        else position
+                    ),
+                )
+            )
+
+            by_month.setdefault(holiday_date.month, []).append(holiday)
+            by_month_and_day.setdefault(
+                (holiday_date.month, holiday_date.day), []
+            ).append(holiday)
+
+        self._holidays = holidays
+        self._keys = keys
+        self._by_month = by_month
+        self._by_month_and_day = by_month_and_day
+        self.version = version
+        self._is_loaded = True
+
+    async def _ensure_loaded(self) -> None:
+        """Load the index on first use"""
+
+        if not self._is_loaded:
+            async with self._get_lock():
+                if not self._is_loaded:
+                    await self._load(await self._get_db_version())
+
+    async def _load(self, version: Optional[int]) -> None:
+        """Fetch all holidays and rebuild the index"""
+
+        try:
+            rows = await DB_POOL.fetch_all(ALL_HOLIDAYS_SQL_QUERY)
+        except Error:
+            self._is_stale = self._is_loaded
+            raise
+
+        self.build(rows, version)
+
+        logger.info(
+            "Holidays index loaded: %s holidays (version %s)",
+            len(self._holidays),
+            version,
+        )
+
+    async def _get_db_version(self) -> Optional[int]:
+        """Return checksum of the holidays table"""
+
+        try:
+            row = await DB_POOL.fetch_one(HOLIDAYS_VERSION_QUERY)
+        except Error:
+            self._is_stale = self._is_loaded
+            raise
+
+        self._is_stale = False
+
+        return row[1] if row else None
+
+    def _get_lock(self) -> Lock:
+        """Return lock for loading (created inside the running loop)"""
+
+        if self._lock is None:
+            self._lock = Lock()
+
+        return self._lock
+
+
+HOLIDAY_INDEX = HolidayIndex()
@@ -0,0 +1,372 @@
+"""Import and export of holidays in CSV and iCalendar formats.
+
+    python holidays_io.py import holidays.csv
+    python holidays_io.py export holidays.ics
+
+Files are read and written as streams: imported rows are inserted in
+batches (one multi-row INSERT per batch) in one transaction, exported
+holidays are read from DB page by page. Holidays are unique by title and
+date, so imported duplicates update the existing holidays. Wrong rows are
+skipped and reported with their line numbers.
+
+CSV has a header and columns «date» (YYYY-MM-DD), «title», «is_birthday»
+(0 or 1) and «whom_to_congratulate». iCalendar events are described in
+ics_format.py.
+
+"""
+
+import asyncio
+from argparse import ArgumentParser
+from csv import DictReader
+from csv import Error as CSVError
+from csv import writer
+from datetime import date, datetime, timezone
+from html import escape
+from logging import basicConfig, getLogger
+from os import path
+from sys import exit as sys_exit
+from typing import (
+    AsyncIterator,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    TextIO,
+    Union,
+)
+
+from constants.constants import (
+    HOLIDAYS_EXPORT_PAGE_SIZE,
+    HOLIDAYS_IMPORT_BATCH_SIZE,
+    HOLIDAYS_IMPORT_MAX_SHOWN_ERRORS,
+    LOGGING_SETTINGS,
+)
+from constants.queries import GET_HOLIDAYS_PAGE_QUERY, UPSERT_HOLIDAYS_QUERY
+from custom_types import HolidayRecord, TypeHoliday
+from db import DB_POOL, DBPool
+from ics_format import (
+    BIRTHDAY_CATEGORY,
+    CALENDAR_FOOTER,
+    CALENDAR_HEADER,
+    fold_line,
+    get_event_lines,
+    iter_events,
+    parse_date,
+    unescape_text,
+)
+
+logger = getLogger(__name__)
+
+CSV_FORMAT = "csv"
+ICS_FORMAT = "ics"
+FORMATS = (CSV_FORMAT, ICS_FORMAT)
+
+CSV_COLUMNS = ("date", "title", "is_birthday", "whom_to_congratulate")
+
+_MAX_TITLE_LENGTH = 255
+
+
+class RowError(NamedTuple):
+    """Wrong row of imported file"""
+
+    line: int
+    message: str
+
+
+class ImportReport(NamedTuple):
+    """Result of import: number of imported rows and wrong rows (only the
+    first ones are kept)"""
+
+    imported: int
+    errors_count: int
+    errors: List[RowError]
+
+
+def get_file_format(file_name: str) -> str:
+    """Return format of the file by its extension.
+
+    Raise ValueError if the format isn't supported.
+
+    """
+
+    file_format = path.splitext(file_name)[1].lstrip(".").lower()
+
+    if file_format == "ical":
+        file_format = ICS_FORMAT
+
+    if file_format not in FORMATS:
+        raise ValueError(f"Only {', '.join(FORMATS)} files are supported")
+
+    return file_format
+
+
+def iter_holidays(
+    lines: Iterable[str], file_format: str
+) -> Iterator[Union[TypeHoliday, RowError]]:
+    """Yield holidays (or errors) of the file's lines"""
+
+    if file_format == CSV_FORMAT:
+        return iter_csv_holidays(lines)
+
+    return iter_ics_holidays(lines)
+
+
+def iter_csv_holidays(
+    lines: Iterable[str],
+) -> Iterator[Union[TypeHoliday, RowError]]:
+    """Yield holidays (or errors) of CSV lines"""
+
+    reader = DictReader(lines)
+
+    try:
+        missing_columns = set(CSV_COLUMNS[:2]) - set(reader.fieldnames or ())
+    except CSVError as error:
+        yield RowError(1, str(error))
+        return
+
+    if missing_columns:
+        yield RowError(1, f"No columns: {', '.join(sorted(missing_columns))}")
+        return
+
+    while True:
+        try:
+            row = next(reader)
+        except StopIteration:
+            return
+        except CSVError as error:
+            yield RowError(reader.line_num, str(error))
+            continue
+
+        try:
+            yield _get_holiday(
+                date.fromisoformat((row["date"] or "").strip()),
+                row["title"],
+                row.get("is_birthday"),
+                row.get("whom_to_congratulate"),
+            )
+        except ValueError as error:
+            yield RowError(reader.line_num, str(error))
+
+
+def iter_ics_holidays(
+    lines: Iterable[str],
+) -> Iterator[Union[TypeHoliday, RowError]]:
+    """Yield holidays (or errors) of iCalendar events"""
+
+    for line, event in iter_events(lines):
+        try:
+            if "DTSTART" not in event:
+                raise ValueError("No DTSTART")
+
+            categories = unescape_text(event.get("CATEGORIES", ({}, ""))[1])
+
+            yield _get_holiday(
+                parse_date(event["DTSTART"][1]),
+                unescape_text(event.get("SUMMARY", ({}, ""))[1]),
+                BIRTHDAY_CATEGORY
+                in (item.strip().upper() for item in categories.split(",")),
+                unescape_text(event.get("DESCRIPTION", ({}, ""))[1]),
+            )
+        except ValueError as error:
+            yield RowError(line, str(error))
+
+
+def _get_holiday(
+    holiday_date: date,
+    title: str,
+    is_birthday: Union[str, bool, None],
+    whom_to_congratulate: str,
+) -> TypeHoliday:
+    """Return checked holiday.
+
+    Raise ValueError if the holiday is wrong.
+
+    """
+
+    title = (title or "").strip()
+
+    if not title:
+        raise ValueError("Empty title")
+
+    if len(title) > _MAX_TITLE_LENGTH:
+        raise ValueError(f"Title is longer than {_MAX_TITLE_LENGTH}")
+
+    if isinstance(is_birthday, str) or is_birthday is None:
+        is_birthday_text = (is_birthday or "0").strip().lower()
+
+        if is_birthday_text not in ("0", "1", "false", "true"):
+            raise ValueError(f"Wrong is_birthday: {is_birthday}")
+
+        is_birthday = is_birthday_text in ("1", "true")
+
+    return (
+        holiday_date,
+        title,
+        int(is_birthday),
+        (whom_to_congratulate or "").strip() or None,
+    )
+
+
+async def import_holidays(
+    pool: DBPool,
+    lines: Iterable[str],
+    file_format: str,
+    batch_size: int = HOLIDAYS_IMPORT_BATCH_SIZE,
+) -> ImportReport:
+    """Upsert holidays of the file's lines in one transaction"""
+
+    imported = 0
+    errors = []
+    errors_count = 0
+    batch = []
+
+    async with pool.transaction() as transaction:
+        for item in iter_holidays(lines, file_format):
+            if isinstance(item, RowError):
+                errors_count += 1
+
+                if len(errors) < HOLIDAYS_IMPORT_MAX_SHOWN_ERRORS:
+                    errors.append(item)
+
+                continue
+
+            batch.append(item)
+
+            if len(batch) >= batch_size:
+                await transaction.execute_many(UPSERT_HOLIDAYS_QUERY, batch)
+                imported += len(batch)
+                batch = []
+
+        await transaction.execute_many(UPSERT_HOLIDAYS_QUERY, batch)
+        imported += len(batch)
+
+    logger.info(
+        "Holidays imported: %s, wrong rows: %s", imported, errors_count
+    )
+
+    return ImportReport(imported, errors_count, errors)
+
+
+async def iter_holidays_from_db(
+    pool: DBPool, page_size: int = HOLIDAYS_EXPORT_PAGE_SIZE
+) -> AsyncIterator[List[HolidayRecord]]:
+    """Yield holidays from DB page by page (by id)"""
+
+    last_id = 0
+
+    while True:
+        rows = await pool.fetch_all(
+            GET_HOLIDAYS_PAGE_QUERY, (last_id, page_size)
+        )
+
+        if rows:
+            yield [HolidayRecord(*row) for row in rows]
+            last_id = rows[-1][4]
+
+        if len(rows) < page_size:
+            return
+
+
+async def export_holidays(
+    pool: DBPool,
+    file: TextIO,
+    file_format: str,
+    page_size: int = HOLIDAYS_EXPORT_PAGE_SIZE,
+) -> int:
+    """Write all holidays from DB to the file, return their number.
+
+    CSV files must be opened with «newline=''».
+
+    """
+
+    exported = 0
+
+    if file_format == CSV_FORMAT:
+        csv_writer = writer(file)
+        csv_writer.writerow(CSV_COLUMNS)
+    else:
+        timestamp = datetime.now(timezone.utc)
+        file.writelines(fold_line(line) for line in CALENDAR_HEADER)
+
+    async for holidays in iter_holidays_from_db(pool, page_size):
+        if file_format == CSV_FORMAT:
+            csv_writer.writerows(
+                (
+                    holiday.date_of_holiday.isoformat(),
+                    holiday.title,
+                    int(holiday.is_birthday),
+                    holiday.whom_to_congratulate or "",
+                )
+                for holiday in holidays
+            )
+        else:
+            file.writelines(
+                fold_line(line)
+                for holiday in holidays
+                for line in get_event_lines(
+                    holiday, f"holiday-{holiday.holiday_id}", timestamp
+                )
+            )
+
+        exported += len(holidays)
+
+    if file_format == ICS_FORMAT:
+        file.writelines(fold_line(line) for line in CALENDAR_FOOTER)
+
+    return exported
+
+
+def get_import_report_text(report: ImportReport) -> str:
+    """Return the import's result for the admin"""
+
+    lines = [
+        f"Импортировано праздников: {report.imported}",
+        f"Строк с ошибками: {report.errors_count}",
+    ]
+    lines.extend(
+        f"Строка {error.line}: {escape(error.message, quote=False)}"
+        for error in report.errors
+    )
+
+    if report.errors_count > len(report.errors):
+        lines.append("...")
+
+    return "\n".join(lines)
+
+
+async def main() -> int:
+    """Import or export holidays, return exit code"""
+
+    parser = ArgumentParser(description="Import and export of holidays")
+    parser.add_argument("command", choices=("import", "export"))
+    parser.add_argument("file", help="CSV or iCalendar (.ics) file")
+    args = parser.parse_args()
+
+    try:
+        file_format = get_file_format(args.file)
+    except ValueError as error:
+        print(error)
+        return 2
+
+    try:
+        if args.command == "import":
+            with open(args.file, encoding="utf-8-sig", newline="") as file:
+                report = await import_holidays(DB_POOL, file, file_format)
+
+            print(get_import_report_text(report))
+
+            return 1 if report.errors_count else 0
+
+        with open(args.file, "w", encoding="utf-8", newline="") as file:
+            exported = await export_holidays(DB_POOL, file, file_format)
+
+        print(f"Exported holidays: {exported}")
+
+        return 0
+    finally:
+        DB_POOL.close()
+
+
+if __name__ == "__main__":
+    basicConfig(**LOGGING_SETTINGS)
+    sys_exit(asyncio.run(main()))
@@ -0,0 +1,183 @@
+"""iCalendar (RFC 5545) lines of holidays.
+
+Every holiday is a yearly all-day event: birthdays are in the BIRTHDAY
+category and whom to congratulate is the event's description. Holidays on
+February 29 are on the last day of February, like in the bot.
+
+"""
+
+from datetime import date, datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from custom_types import TypeHoliday
+
+CALENDAR_HEADER = (
+    "BEGIN:VCALENDAR",
+    "VERSION:2.0",
+    "PRODID:-//FamilyHolidaysBot//Holidays//RU",
+    "CALSCALE:GREGORIAN",
+)
+CALENDAR_FOOTER = ("END:VCALENDAR",)
+
+BIRTHDAY_CATEGORY = "BIRTHDAY"
+
+_UID_DOMAIN = "family-holidays-bot"
+
+# Lines are folded after this number of octets (without CRLF)
+_MAX_LINE_OCTETS = 75
+
+_ESCAPED = (("\\", "\\\\"), (";", "\\;"), (",", "\\,"), ("\n", "\\n"))
+
+
+def get_event_lines(
+    holiday: TypeHoliday, uid: str, timestamp: datetime
+) -> List[str]:
+    """Return lines of the holiday's event (not folded)"""
+
+    holiday_date, title, is_birthday, whom_to_congratulate = holiday
+
+    if (holiday_date.month, holiday_date.day) == (2, 29):
+        rule = "RRULE:FREQ=YEARLY;BYMONTH=2;BYMONTHDAY=-1"
+    else:
+        rule = "RRULE:FREQ=YEARLY"
+
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:{uid}@{_UID_DOMAIN}",
+        f"DTSTAMP:{timestamp:%Y%m%dT%H%M%SZ}",
+        f"DTSTART;VALUE=DATE:{holiday_date:%Y%m%d}",
+        rule,
+        f"SUMMARY:{escape_text(title)}",
+    ]
+
+    if whom_to_congratulate:
+        lines.append(f"DESCRIPTION:{escape_text(whom_to_congratulate)}")
+
+    if is_birthday:
+        lines.append(f"CATEGORIES:{BIRTHDAY_CATEGORY}")
+
+    lines.append("END:VEVENT")
+
+    return lines
+
+
+def fold_line(line: str) -> str:
+    """Return the line with CRLF, folded by 75 octets (not inside
+    characters)"""
+
+    if len(line.encode()) <= _MAX_LINE_OCTETS:
+        return line + "\r\n"
+
+    parts = []
+    part_start = 0
+    part_octets = 0
+    # The first line has 75 octets, continuations - a space and 74 octets
+    limit = _MAX_LINE_OCTETS
+
+    for index, char in enumerate(line):
+        char_octets = len(char.encode())
+
+        if part_octets + char_octets > limit:
+            parts.append(line[part_start:index])
+            part_start = index
+            part_octets = 0
+            limit = _MAX_LINE_OCTETS - 1
+
+        part_octets += char_octets
+
+    parts.append(line[part_start:])
+
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def escape_text(text: str) -> str:
+    """Return text escaped for a TEXT value"""
+
+    for char, escaped in _ESCAPED:
+        text = text.replace(char, escaped)
+
+    return text
+
+
+def unescape_text(text: str) -> str:
+    """Return text of an escaped TEXT value"""
+
+    chars = []
+    is_escaped = False
+
+    for char in text:
+        if is_escaped:
+            chars.append("\n" if char in "nN" else char)
+            is_escaped = False
+        elif char == "\\":
+            is_escaped = True
+        else:
+            chars.append(char)
+
+    return "".join(chars)
+
+
+def iter_unfolded_lines(lines: Iterable[str]) -> Iterator[Tuple[int, str]]:
+    """Yield number of the first line and the unfolded content line"""
+
+    current: Optional[str] = None
+    current_number = 0
+
+    for number, line in enumerate(lines, start=1):
+        line = line.rstrip("\r\n")
+
+        if line[:1] in (" ", "\t") and current is not None:
+            current += line[1:]
+            continue
+
+        if current:
+            yield current_number, current
+
+        current = line
+        current_number = number
+
+    if current:
+        yield current_number, current
+
+
+def iter_events(
+    lines: Iterable[str],
+) -> Iterator[Tuple[int, Dict[str, Tuple[Dict[str, str], str]]]]:
+    """Yield line number and properties of every VEVENT.
+
+    Properties are «name -> (parameters, value)», values aren't unescaped.
+
+    """
+
+    event: Optional[Dict[str, Tuple[Dict[str, str], str]]] = None
+    event_line = 0
+
+    for number, line in iter_unfolded_lines(lines):
+        name_and_params, _, value = line.partition(":")
+        name, *params = name_and_params.split(";")
+        name = name.upper()
+
+        if name == "BEGIN" and value.upper() == "VEVENT":
+            event = {}
+            event_line = number
+        elif name == "END" and value.upper() == "VEVENT":
+            if event is not None:
+                yield event_line, event
+
+            event = None
+        elif event is not None:
+            event[name] = (
+                {
+                    key.upper(): param_value
+                    for key, _, param_value in (
+                        param.partition("=") for param in params
+                    )
+                },
+                value,
+            )
+
+
+def parse_date(value: str) -> date:
+    """Return date of DATE or DATE-TIME value (e.g. 19900115)"""
+
+    return datetime.strptime(value[:8], "%Y%m%d").date()
@@ -1,49 +1,422 @@
 """Scheduler's jobs"""
 
 from asyncio import CancelledError, sleep
+from datetime import date, datetime, timedelta, timezone
+from functools import partial
 from logging import getLogger
-from typing import Tuple
+from time import perf_counter
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from zoneinfo import ZoneInfo
 
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from mysql.connector import Error
 
-from constants.constants import BOT
-from services import get_daily_notifications_from_db, send_today_holidays
+from constants.constants import (
+    DAILY_NOTIFICATIONS_PAGE_SIZE,
+    DEFAULT_TIME_ZONE,
+    DELIVERY_LOG_KEEP_DAYS,
+    HOLIDAYS_INDEX_REFRESH_INTERVAL,
+    NOTIFICATIONS_CATCH_UP_HOURS,
+)
+from custom_types import DeliveryReport
+from delivery_log import DELIVERY_LOG, PENDING_STATUS, DeliveryBatch
+from holidays_index import HOLIDAY_INDEX
+from metrics import SCHEDULER_LAG
+from reminders import REMINDER_PLANNER
+from resources import RESOURCES
+from services import (
+    iter_daily_notifications_from_db,
+    send_reminders,
+    send_today_holidays,
+)
+from timing_wheel import TimingWheel
+from utils import get_shard
 
 logger = getLogger(__name__)
 
+# Chats by UTC minute of their next daily notification
+NOTIFICATION_WHEEL = TimingWheel()
+
 
 async def add_daily_job(
-    scheduler: AsyncIOScheduler, chat_id: str, time_: Tuple[int, int]
+    chat_id: str,
+    time_: Tuple[int, int],
+    time_zone: Optional[str] = None,
+    now: Optional[datetime] = None,
 ) -> None:
-    """Add daily job for scheduler"""
+    """Add the chat's daily notification (move if it is added).
 
-    chat_id = str(chat_id)
-    hour, minute = time_
+    If the time zone is None, the chat's current time zone is kept. The
+    next notification is the first one after «now».
 
-    scheduler.add_job(
-        send_today_holidays,
-        "cron",
-        args=[BOT, chat_id],
-        hour=hour,
-        minute=minute,
-        id=chat_id,
+    """
+
+    if time_zone is None:
+        current = NOTIFICATION_WHEEL.get(chat_id)
+        time_zone = current[1] if current is not None else DEFAULT_TIME_ZONE
+
+    NOTIFICATION_WHEEL.add(chat_id, tuple(time_), time_zone, now)
+
+
+async def set_daily_job_time_zone(chat_id: str, time_zone: str) -> None:
+    """Move the chat's daily notification to the time zone"""
+
+    current = NOTIFICATION_WHEEL.get(chat_id)
+
+    if current is not None:
+        NOTIFICATION_WHEEL.add(chat_id, current[0], time_zone)
+
+
+async def remove_daily_job(chat_id: str) -> None:
+    """Remove the chat's daily notification and its reminders"""
+
+    REMINDER_PLANNER.remove_chat(chat_id)
+    NOTIFICATION_WHEEL.remove(chat_id)
+
+
+def set_reminder_days(chat_id: str, days: Tuple[int, ...]) -> None:
+    """Set days before holidays to remind the chat (empty - never)"""
+
+    REMINDER_PLANNER.set_days(chat_id, days)
+
+
+async def send_daily_notifications(shard_name: str) -> None:
+    """Send holidays and reminders to chats whose notification time has
+    come (holidays of the chat's local date) and save the watermark"""
+
+    now = datetime.now(timezone.utc)
+
+    for due_minute, chats_by_date in NOTIFICATION_WHEEL.turn_slots(
+        now
+    ).items():
+        # Lag of every slot is measured from its planned minute, so slots
+        # caught up after a late turn have the whole delay
+        SCHEDULER_LAG.observe(now.timestamp() - due_minute * 60)
+        due_time = datetime.fromtimestamp(due_minute * 60, timezone.utc)
+
+        for today, chat_ids in chats_by_date.items():
+            holidays_report, reminders_report = await _send_notifications(
+                partial(
+                    DELIVERY_LOG.claim,
+                    delivery_date=today,
+                    due_minute=due_minute,
+                ),
+                chat_ids,
+                today,
+            )
+            _log_reports(
+                f"{today} {due_time:%H:%M} UTC",
+                holidays_report,
+                reminders_report,
+            )
+
+    try:
+        await DELIVERY_LOG.save_watermark(
+            shard_name, NOTIFICATION_WHEEL.last_minute
+        )
+    except Error as error:
+        logger.error(error)
+
+
+async def resend_unfinished_deliveries() -> None:
+    """Send again today's notifications of the shard's chats that have
+    failed or have been left pending by a stopped process.
+
+    Reminders are sent again only with pending notifications, as they are
+    sent after holidays.
+
+    """
+
+    now = datetime.now(timezone.utc)
+
+    try:
+        deliveries = await DELIVERY_LOG.get_unfinished(
+            now.date() - timedelta(days=1)
+        )
+    except Error as error:
+        logger.error(error)
+        return
+
+    chats_by_date: Dict[date, List[str]] = {}
+    pending_chat_ids = set()
+
+    for chat_id, delivery_date, status in deliveries:
+        current = NOTIFICATION_WHEEL.get(chat_id)
+
+        # Chats of other shards or without notifications are skipped, as
+        # well as dates that are over for the chats
+        if (
+            current is None
+            or now.astimezone(ZoneInfo(current[1])).date() != delivery_date
+        ):
+            continue
+
+        chats_by_date.setdefault(delivery_date, []).append(chat_id)
+
+        if status == PENDING_STATUS:
+            pending_chat_ids.add(chat_id)
+
+    for today, chat_ids in chats_by_date.items():
+        holidays_report, reminders_report = await _send_notifications(
+            partial(DELIVERY_LOG.reclaim, delivery_date=today),
+            chat_ids,
+            today,
+            pending_chat_ids,
+        )
+        _log_reports(
+            f"{today} (sent again)", holidays_report, reminders_report
+        )
+
+
+async def _send_notifications(
+    claim: Callable[[List[str]], Awaitable[DeliveryBatch]],
+    chat_ids: List[str],
+    today: date,
+    reminded_chat_ids: Optional[Set[str]] = None,
+) -> Tuple[DeliveryReport, DeliveryReport]:
+    """Claim and send holidays and reminders of the date batch by batch
+    (all claimed chats are reminded by default). Return reports of
+    holidays and reminders.
+
+    Every batch is finished in the log when it is sent, so a restart leaves
+    pending only the batch that was being sent.
+
+    """
+
+    holidays_report = reminders_report = DeliveryReport(0, 0, 0)
+
+    for start in range(0, len(chat_ids), DELIVERY_LOG.batch_size):
+        batch_chat_ids = chat_ids[start : start + DELIVERY_LOG.batch_size]
+
+        try:
+            batch = await claim(batch_chat_ids)
+        except Error as error:
+            # Without the log the chats could get the notification twice
+            logger.error(
+                "Notifications for %s to %s chats aren't sent: %s",
+                today,
+                len(batch_chat_ids),
+                error,
+            )
+            continue
+
+        report = await send_today_holidays(
+            RESOURCES.bot, batch.chat_ids, today
+        )
+        holidays_report = _add_reports(holidays_report, report)
+
+        reminders_report = _add_reports(
+            reminders_report,
+            await send_reminders(
+                RESOURCES.bot,
+                [
+                    chat_id
+                    for chat_id in batch.chat_ids
+                    if reminded_chat_ids is None
+                    or chat_id in reminded_chat_ids
+                ],
+                today,
+            ),
+        )
+
+        try:
+            await DELIVERY_LOG.finish(batch, report)
+        except Error as error:
+            logger.error(error)
+
+    return holidays_report, reminders_report
+
+
+def _add_reports(
+    first: DeliveryReport, second: DeliveryReport
+) -> DeliveryReport:
+    """Return report with counts of both reports"""
+
+    return DeliveryReport(
+        delivered=first.delivered + second.delivered,
+        skipped=first.skipped + second.skipped,
+        failed=first.failed + second.failed,
+        failed_chat_ids=first.failed_chat_ids + second.failed_chat_ids,
+    )
+
+
+def _log_reports(
+    slot: str,
+    holidays_report: DeliveryReport,
+    reminders_report: DeliveryReport,
+) -> None:
+    """Log counts of sent holidays and reminders of the slot"""
+
+    logger.info(
+        "Daily notifications %s - delivered: %s, skipped: %s, failed: %s",
+        slot,
+        holidays_report.delivered,
+        holidays_report.skipped,
+        holidays_report.failed,
     )
 
+    if reminders_report.delivered or reminders_report.failed:
+        logger.info(
+            "Reminders %s - delivered: %s, failed: %s",
+            slot,
+            reminders_report.delivered,
+            reminders_report.failed,
+        )
+
+
+async def refresh_holidays_index() -> None:
+    """Reload holidays if they were changed in DB (while DB is unavailable
+    the loaded holidays are used and marked as stale)"""
+
+    try:
+        await HOLIDAY_INDEX.refresh()
+    except Error as error:
+        logger.error("Holidays index isn't refreshed: %s", error)
 
-async def run_scheduler(scheduler) -> None:
-    """Run scheduler with jobs"""
 
-    daily_notifications = await get_daily_notifications_from_db()
+async def delete_old_deliveries() -> None:
+    """Delete deliveries older than DELIVERY_LOG_KEEP_DAYS from the log"""
 
-    if daily_notifications:
-        for chat_id, time_ in daily_notifications.items():
-            await add_daily_job(scheduler, chat_id, time_)
+    try:
+        await DELIVERY_LOG.delete_old(
+            date.today() - timedelta(days=DELIVERY_LOG_KEEP_DAYS)
+        )
+    except Error as error:
+        logger.error(error)
+
+
+async def get_catch_up_start(shard_name: str) -> datetime:
+    """Return time since which missed notifications of the shard are sent
+    (the watermark, but not earlier than NOTIFICATIONS_CATCH_UP_HOURS ago)"""
+
+    now = datetime.now(timezone.utc)
+
+    try:
+        watermark = await DELIVERY_LOG.get_watermark(shard_name)
+    except Error as error:
+        logger.error(error)
+        watermark = None
+
+    if watermark is None:
+        return now
+
+    return max(
+        datetime.fromtimestamp(watermark * 60, timezone.utc),
+        now - timedelta(hours=NOTIFICATIONS_CATCH_UP_HOURS),
+    )
+
+
+async def run_scheduler(
+    scheduler, shard: Optional[Tuple[int, int]] = (0, 1)
+) -> None:
+    """Run scheduler with jobs.
+
+    Daily jobs are added only for chats of the shard (shard's number and
+    number of shards). If the shard is None, daily jobs aren't added.
+
+    """
 
     scheduler.start()
 
+    try:
+        await HOLIDAY_INDEX.load()
+    except Error as error:
+        logger.error(error)
+
+    scheduler.add_job(
+        refresh_holidays_index,
+        "interval",
+        seconds=HOLIDAYS_INDEX_REFRESH_INTERVAL,
+        id="refresh_holidays_index",
+    )
+
+    if shard is not None:
+        shard_name = f"{shard[0]}/{shard[1]}"
+        since = await get_catch_up_start(shard_name)
+
+        if since < datetime.now(timezone.utc) - timedelta(minutes=1):
+            logger.info("Missed notifications since %s are sent", since)
+
+        # Chats are added as at the watermark, so the first turn finds
+        # notifications missed since it
+        await load_daily_jobs(*shard, since=since)
+        NOTIFICATION_WHEEL.set_last_turn(since)
+        await REMINDER_PLANNER.plan()
+        await resend_unfinished_deliveries()
+
+        # The wheel is turned every minute, minutes skipped while the
+        # previous turn is sending are turned by the next one
+        scheduler.add_job(
+            send_daily_notifications,
+            "cron",
+            args=[shard_name],
+            second=0,
+            id="send_daily_notifications",
+        )
+        # Notifications left pending at startup are sent when they are
+        # older than the send timeout
+        scheduler.add_job(
+            resend_unfinished_deliveries,
+            "interval",
+            seconds=DELIVERY_LOG.send_timeout,
+            id="resend_unfinished_deliveries",
+        )
+        scheduler.add_job(
+            delete_old_deliveries,
+            "cron",
+            hour=3,
+            minute=30,
+            id="delete_old_deliveries",
+        )
+
+        scheduler.add_job(
+            REMINDER_PLANNER.plan,
+            "cron",
+            hour=0,
+            minute=0,
+            id="plan_reminders",
+        )
+
     try:
         while True:
             await sleep(60)
     except (CancelledError, KeyboardInterrupt):
         logger.info("Scheduler stopped")
         scheduler.shutdown()
+
+
+async def load_daily_jobs(
+    shard: int = 0, shards_count: int = 1, since: Optional[datetime] = None
+) -> int:
+    """Add all daily notifications from DB to the notifications wheel.
+
+    Notifications are loaded page by page, so the notifications that are
+    already added work while the rest are loading. The next notifications
+    are the first ones after «since» (now by default).
+
+    """
+
+    started_at = perf_counter()
+    loaded_count = 0
+
+    async for notifications in iter_daily_notifications_from_db(
+        DAILY_NOTIFICATIONS_PAGE_SIZE
+    ):
+        for chat_id, time_, reminder_days, time_zone in notifications:
+            if shards_count == 1 or get_shard(chat_id, shards_count) == shard:
+                await add_daily_job(chat_id, time_, time_zone, since)
+                REMINDER_PLANNER.set_days(chat_id, reminder_days)
+                loaded_count += 1
+
+        logger.info(
+            "Daily notifications loaded: %s (%.2f s)",
+            loaded_count,
+            perf_counter() - started_at,
+        )
+
+    logger.info(
+        "All daily notifications loaded: %s in %.2f s",
+        loaded_count,
+        perf_counter() - started_at,
+    )
+
+    return loaded_count
@@ -1,5 +1,7 @@
 """All keyboards"""
 
+from typing import Optional
+
 from aiogram.types import (
     InlineKeyboardButton,
     InlineKeyboardMarkup,
@@ -41,3 +43,26 @@ def get_yes_no_inline_keyboard(
             ]
         ]
     )
+
+
+def get_pages_inline_keyboard(
+    previous_btn_name: Optional[str], next_btn_name: Optional[str]
+) -> Optional[InlineKeyboardMarkup]:
+    """Return inline keyboard with «◀» and «▶» buttons (only existing)"""
+
+    buttons = []
+
+    if previous_btn_name is not None:
+        buttons.append(
+            InlineKeyboardButton(text="◀", callback_data=previous_btn_name)
+        )
+
+    if next_btn_name is not None:
+        buttons.append(
+            InlineKeyboardButton(text="▶", callback_data=next_btn_name)
+        )
+
+    if not buttons:
+        return None
+
+    return InlineKeyboardMarkup(inline_keyboard=[buttons])
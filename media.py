@@ -0,0 +1,181 @@
+"""Cache of photos uploaded to Telegram.
+
+Every photo is uploaded once. Telegram's file_id of the uploaded photo is
+saved to the JSON file by hash of the file's content, and the photo is sent
+by file_id after that. A changed photo has a new hash, so it is uploaded
+again.
+
+"""
+
+from hashlib import sha256
+from json import dump, load
+from logging import getLogger
+from os import replace, stat
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.methods import SendPhoto
+from aiogram.methods.base import TelegramMethod
+from aiogram.types import FSInputFile, InputFile, Message
+
+from constants.constants import MEDIA_CACHE_PATH
+from sender import BULK_PRIORITY, INTERACTIVE_PRIORITY, send
+
+logger = getLogger(__name__)
+
+
+class MediaCache:
+    """Telegram's file_ids of uploaded files by hash of content"""
+
+    def __init__(self, path: Optional[str]) -> None:
+        self.path = path
+
+        self._file_ids: Optional[Dict[str, str]] = None
+        # File path -> (modification time, size, hash of content)
+        self._hashes: Dict[str, Tuple[int, int, str]] = {}
+
+    def get(self, file_path: str) -> Union[str, InputFile]:
+        """Return file_id of the file if it was uploaded, else the file"""
+
+        file_id = self._get_file_ids().get(self._get_hash(file_path))
+
+        return file_id if file_id is not None else FSInputFile(file_path)
+
+    def remember(self, file_path: str, message: Message) -> None:
+        """Save file_id of the photo from the sent message"""
+
+        if not message.photo:
+            return
+
+        file_hash = self._get_hash(file_path)
+        file_id = message.photo[-1].file_id
+        file_ids = self._get_file_ids()
+
+        if file_ids.get(file_hash) == file_id:
+            return
+
+        file_ids[file_hash] = file_id
+        self._save()
+
+    def forget(self, file_path: str) -> None:
+        """Remove file_id of the file (it will be uploaded again)"""
+
+        if self._get_file_ids().pop(self._get_hash(file_path), None):
+            self._save()
+
+    def _get_hash(self, file_path: str) -> str:
+        """Return hash of the file's content (read only if file changed)"""
+
+        file_stat = stat(file_path)
+        cached = self._hashes.get(file_path)
+
+        if cached is not None and cached[:2] == (
+            file_stat.st_mtime_ns,
+            file_stat.st_size,
+        ):
+            return cached[2]
+
+        with open(file_path, "rb") as file:
+            file_hash = sha256(file.read()).hexdigest()
+
+        self._hashes[file_path] = (
+            file_stat.st_mtime_ns,
+            file_stat.st_size,
+            file_hash,
+        )
+
+        return file_hash
+
+    def _get_file_ids(self) -> Dict[str, str]:
+        """Return saved file_ids (load them on first use)"""
+
+        if self._file_ids is None:
+            self._file_ids = {}
+
+            if self.path is not None:
+                try:
+                    with open(self.path, encoding="utf-8") as file:
+                        self._file_ids = load(file)
+                except FileNotFoundError:
+                    pass
+                except (OSError, ValueError) as error:
+                    logger.error(error)
+
+        return self._file_ids
+
+    def _save(self) -> None:
+        """Save file_ids to the file"""
+
+        if self.path is None:
+            return
+
+        temp_path = f"{self.path}.tmp"
+
+        try:
+            with open(temp_path, "w", encoding="utf-8") as file:
+                dump(self._file_ids, file)
+
+            replace(temp_path, self.path)
+        except OSError as error:
+            logger.error(error)
+
+
+MEDIA_CACHE = MediaCache(MEDIA_CACHE_PATH)
+
+
+async def answer_photo(
+    message: Message,
+    file_path: str,
+    priority: int = INTERACTIVE_PRIORITY,
+    **kwargs,
+) -> Any:
+    """Answer the message with the photo from the file"""
+
+    return await _send_cached_photo(
+        file_path,
+        lambda photo: message.answer_photo(photo, **kwargs),
+        priority,
+    )
+
+
+async def send_photo(
+    bot,
+    chat_id: Any,
+    file_path: str,
+    priority: int = BULK_PRIORITY,
+    **kwargs,
+) -> Any:
+    """Send the photo from the file to the chat"""
+
+    return await _send_cached_photo(
+        file_path,
+        lambda photo: SendPhoto(chat_id=chat_id, photo=photo, **kwargs).as_(
+            bot
+        ),
+        priority,
+    )
+
+
+async def _send_cached_photo(
+    file_path: str,
+    make_method: Callable[[Union[str, InputFile]], TelegramMethod],
+    priority: int,
+) -> Any:
+    """Send the photo by file_id or upload it and remember its file_id"""
+
+    photo = MEDIA_CACHE.get(file_path)
+
+    try:
+        message = await send(make_method(photo), priority)
+    except TelegramBadRequest as error:
+        if not isinstance(photo, str):
+            raise
+
+        # The file_id is not valid anymore (e.g. for another bot)
+        logger.warning("Cached photo %s is rejected: %s", file_path, error)
+        MEDIA_CACHE.forget(file_path)
+        message = await send(make_method(FSInputFile(file_path)), priority)
+
+    MEDIA_CACHE.remember(file_path, message)
+
+    return message
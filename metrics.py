@@ -0,0 +1,264 @@
+"""Metrics of the bot in Prometheus text format.
+
+Metrics are served by a small HTTP server on METRICS_HOST:METRICS_PORT
+(«/metrics» path).
+
+"""
+
+from bisect import bisect_left
+from logging import getLogger
+from typing import Callable, Dict, List, Sequence, Tuple
+
+from aiohttp import web
+
+logger = getLogger(__name__)
+
+DEFAULT_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+    30,
+    60,
+)
+
+_REGISTRY: List["_Metric"] = []
+
+
+class _Metric:
+    """Base class of metrics with labels"""
+
+    type_ = ""
+
+    def __init__(
+        self, name: str, description: str, label_names: Sequence[str] = ()
+    ) -> None:
+        self.name = name
+        self.description = description
+        self.label_names = tuple(label_names)
+
+        _REGISTRY.append(self)
+
+    def render(self) -> List[str]:
+        """Return lines of the metric in Prometheus text format"""
+
+        return [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} {self.type_}",
+            *self._render_samples(),
+        ]
+
+    def _render_samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def _get_labels_text(
+        self, label_values: Tuple[str, ...], *extra_labels: Tuple[str, str]
+    ) -> str:
+        """Return labels in Prometheus format - {name="value",...}"""
+
+        labels = [
+            *zip(self.label_names, label_values),
+            *extra_labels,
+        ]
+
+        if not labels:
+            return ""
+
+        return (
+            "{"
+            + ",".join(
+                f'{name}="{_escape_label_value(str(value))}"'
+                for name, value in labels
+            )
+            + "}"
+        )
+
+
+class Counter(_Metric):
+    """Counter that only grows"""
+
+    type_ = "counter"
+
+    def __init__(
+        self, name: str, description: str, label_names: Sequence[str] = ()
+    ) -> None:
+        super().__init__(name, description, label_names)
+
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *label_values: str, value: float = 1) -> None:
+        """Increase the counter with the labels"""
+
+        self._values[label_values] = self._values.get(label_values, 0) + value
+
+    def get(self, *label_values: str) -> float:
+        """Return value of the counter with the labels"""
+
+        return self._values.get(label_values, 0)
+
+    def _render_samples(self) -> List[str]:
+        return [
+            f"{self.name}{self._get_labels_text(labels)} {value}"
+            for labels, value in self._values.items()
+        ]
+
+
+class Gauge(_Metric):
+    """Value that is taken from the function on every scrape"""
+
+    type_ = "gauge"
+
+    def __init__(
+        self, name: str, description: str, get_value: Callable[[], float]
+    ) -> None:
+        super().__init__(name, description)
+
+        self._get_value = get_value
+
+    def _render_samples(self) -> List[str]:
+        return [f"{self.name} {self._get_value()}"]
+
+
+class Histogram(_Metric):
+    """Distribution of values (durations) by buckets"""
+
+    type_ = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, description, label_names)
+
+        self.buckets = tuple(buckets)
+        # Labels -> [count in every bucket (and +Inf), sum]
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *label_values: str) -> None:
+        """Add the value to the histogram with the labels"""
+
+        values = self._values.get(label_values)
+
+        if values is None:
+            values = self._values[label_values] = [
+                [0] * (len(self.buckets) + 1),
+                0.0,
+            ]
+
+        values[0][bisect_left(self.buckets, value)] += 1
+        values[1] += value
+
+    def get_count(self, *label_values: str) -> int:
+        """Return number of observed values with the labels"""
+
+        values = self._values.get(label_values)
+
+        return sum(values[0]) if values is not None else 0
+
+    def _render_samples(self) -> List[str]:
+        lines = []
+
+        for labels, (bucket_counts, total) in self._values.items():
+            cumulative_count = 0
+
+            for bound, bucket_count in zip(
+                (*self.buckets, "+Inf"), bucket_counts
+            ):
+                cumulative_count += bucket_count
+                labels_text = self._get_labels_text(labels, ("le", bound))
+                lines.append(
+                    f"{self.name}_bucket{labels_text} {cumulative_count}"
+                )
+
+            labels_text = self._get_labels_text(labels)
+            lines.append(f"{self.name}_sum{labels_text} {total}")
+            lines.append(f"{self.name}_count{labels_text} {cumulative_count}")
+
+        return lines
+
+
+def render_metrics() -> str:
+    """Return all metrics in Prometheus text format"""
+
+    lines = []
+
+    for metric in _REGISTRY:
+        lines.extend(metric.render())
+
+    return "\n".join(lines) + "\n"
+
+
+def _escape_label_value(value: str) -> str:
+    """Escape the label value for Prometheus text format"""
+
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+async def _metrics_handler(request: web.Request) -> web.Response:
+    """Return all metrics"""
+
+    return web.Response(
+        text=render_metrics(), content_type="text/plain", charset="utf-8"
+    )
+
+
+async def start_metrics_server(host: str, port: int) -> web.AppRunner:
+    """Start HTTP server with «/metrics» and return its runner"""
+
+    app = web.Application()
+    app.router.add_get("/metrics", _metrics_handler)
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+
+    logger.info("Metrics server on %s:%s", host, port)
+
+    return runner
+
+
+HANDLER_DURATION = Histogram(
+    "bot_handler_duration_seconds",
+    "Time of handling updates by handler",
+    ["handler"],
+)
+HANDLER_ERRORS = Counter(
+    "bot_handler_errors_total",
+    "Number of errors in handlers",
+    ["handler", "error"],
+)
+DB_QUERY_DURATION = Histogram(
+    "bot_db_query_duration_seconds",
+    "Time of DB queries by query",
+    ["query"],
+)
+DB_QUERY_ERRORS = Counter(
+    "bot_db_query_errors_total",
+    "Number of failed DB queries by query and error",
+    ["query", "error"],
+)
+SCHEDULER_LAG = Histogram(
+    "bot_scheduler_lag_seconds",
+    "Actual minus planned time of daily notifications",
+    buckets=(0.1, 0.5, 1, 2, 5, 10, 30, 60, 300),
+)
+TELEGRAM_REQUESTS = Counter(
+    "bot_telegram_requests_total",
+    "Number of requests to Telegram by method and result",
+    ["method", "result"],
+)
+TELEGRAM_REQUEST_DURATION = Histogram(
+    "bot_telegram_request_duration_seconds",
+    "Time from queueing to sending requests to Telegram",
+    ["method"],
+)
@@ -0,0 +1,30 @@
+"""Middlewares for the dispatcher"""
+
+from time import perf_counter
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from metrics import HANDLER_DURATION, HANDLER_ERRORS
+
+
+class MetricsMiddleware(BaseMiddleware):
+    """Record time and errors of handlers"""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        handler_name = data["handler"].callback.__name__
+        started_at = perf_counter()
+
+        try:
+            return await handler(event, data)
+        except Exception as error:
+            HANDLER_ERRORS.inc(handler_name, type(error).__name__)
+            raise
+        finally:
+            HANDLER_DURATION.observe(perf_counter() - started_at, handler_name)
@@ -0,0 +1,407 @@
+"""Versioned migrations of DB schema.
+
+Every migration has a version, and applied versions are saved to the
+«schema_migrations» table, so every migration is applied once:
+
+    python migrations.py            # apply new migrations
+    python migrations.py --check    # check that queries use indexes
+
+The check runs EXPLAIN for queries from constants/queries.py and reports
+every table that is read without an index or sorted with filesort.
+
+"""
+
+import asyncio
+from argparse import ArgumentParser
+from json import loads
+from logging import basicConfig, getLogger
+from sys import exit as sys_exit
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Iterator,
+    List,
+    NamedTuple,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+from constants.constants import LOGGING_SETTINGS
+from constants.queries import (
+    ALL_HOLIDAYS_SQL_QUERY,
+    CHANGE_DAILY_NOTIFICATION_TIME_QUERY,
+    CHANGE_DELIVERY_STATUS_QUERY,
+    CHANGE_REMINDER_DAYS_QUERY,
+    CHANGE_TIME_ZONE_QUERY,
+    DELETE_DAILY_NOTIFICATIONS_QUERY,
+    DELETE_OLD_DELIVERIES_QUERY,
+    FINISH_DELIVERIES_QUERY,
+    GET_CLAIMED_DELIVERIES_QUERY,
+    GET_DAILY_NOTIFICATIONS_PAGE_QUERY,
+    GET_HOLIDAYS_PAGE_QUERY,
+    GET_REMINDER_DAYS_QUERY,
+    GET_TIME_ZONE_QUERY,
+    GET_UNFINISHED_DELIVERIES_QUERY,
+    GET_WATERMARK_QUERY,
+    IS_EXISTS_DAILY_NOTIFICATIONS_QUERY,
+    RECLAIM_DELIVERIES_QUERY,
+)
+from db import DB_POOL, DBPool
+
+logger = getLogger(__name__)
+
+_CREATE_MIGRATIONS_TABLE_QUERY = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version INT PRIMARY KEY,
+    description VARCHAR(255) NOT NULL,
+    applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+)
+"""
+_GET_APPLIED_VERSIONS_QUERY = "SELECT version FROM schema_migrations"
+_ADD_APPLIED_VERSION_QUERY = (
+    "INSERT INTO schema_migrations(version, description) VALUES(%s, %s)"
+)
+_IS_INDEXED_QUERY = (
+    "SELECT EXISTS(SELECT * FROM information_schema.statistics "
+    "WHERE table_schema = DATABASE() AND table_name = %s "
+    "AND column_name = %s AND seq_in_index = 1)"
+)
+
+_IS_COLUMN_EXISTS_QUERY = (
+    "SELECT EXISTS(SELECT * FROM information_schema.columns "
+    "WHERE table_schema = DATABASE() AND table_name = %s "
+    "AND column_name = %s)"
+)
+
+# Titles of any length are unique by their SHA-256 (an index of title
+# would have only its prefix)
+_ADD_HOLIDAYS_TITLE_HASH_QUERY = """
+ALTER TABLE holidays
+ADD COLUMN title_hash BINARY(32) AS (UNHEX(SHA2(title, 256))) STORED
+"""
+
+# Duplicates of the first (by id) holiday with the same title and date
+_DELETE_DUPLICATE_HOLIDAYS_QUERY = """
+DELETE duplicate FROM holidays AS duplicate
+JOIN holidays AS kept
+ON kept.title_hash = duplicate.title_hash
+AND kept.date_of_holiday = duplicate.date_of_holiday
+AND kept.id < duplicate.id
+"""
+
+_ADD_HOLIDAYS_UNIQUE_KEY_QUERY = (
+    "ALTER TABLE holidays ADD UNIQUE KEY uq_holidays_title_date "
+    "(title_hash, date_of_holiday)"
+)
+
+Step = Union[str, Callable[[DBPool], Awaitable[None]]]
+
+
+class Migration(NamedTuple):
+    """Change of DB schema - SQL statements or functions with the pool"""
+
+    version: int
+    description: str
+    steps: Tuple[Step, ...]
+
+
+def _add_index_if_missing(table: str, index: str, column: str) -> Step:
+    """Return step that indexes the column if no index starts with it"""
+
+    async def add_index(pool: DBPool) -> None:
+        is_indexed = await pool.fetch_one(_IS_INDEXED_QUERY, (table, column))
+
+        if is_indexed[0]:
+            logger.info("%s.%s is already indexed", table, column)
+            return
+
+        await pool.execute(f"ALTER TABLE {table} ADD INDEX {index} ({column})")
+
+    return add_index
+
+
+async def _add_holidays_unique_key(pool: DBPool) -> None:
+    """Make holidays unique by title (its hash) and date, duplicates that
+    are already in the table are deleted first"""
+
+    is_added = await pool.fetch_one(
+        _IS_COLUMN_EXISTS_QUERY, ("holidays", "title_hash")
+    )
+
+    if not is_added[0]:
+        await pool.execute(_ADD_HOLIDAYS_TITLE_HASH_QUERY)
+
+    is_indexed = await pool.fetch_one(
+        _IS_INDEXED_QUERY, ("holidays", "title_hash")
+    )
+
+    if is_indexed[0]:
+        logger.info("holidays.title_hash is already indexed")
+        return
+
+    deleted_count = await pool.execute(_DELETE_DUPLICATE_HOLIDAYS_QUERY)
+
+    if deleted_count:
+        logger.warning("Duplicate holidays deleted: %s", deleted_count)
+
+    await pool.execute(_ADD_HOLIDAYS_UNIQUE_KEY_QUERY)
+
+
+MIGRATIONS = (
+    Migration(
+        1,
+        "Indexed month and day of holidays",
+        (
+            """
+            ALTER TABLE holidays
+            ADD COLUMN holiday_month TINYINT UNSIGNED
+                AS (MONTH(date_of_holiday)) STORED,
+            ADD COLUMN holiday_day TINYINT UNSIGNED
+                AS (DAYOFMONTH(date_of_holiday)) STORED,
+            ADD INDEX idx_holidays_month_day (holiday_month, holiday_day)
+            """,
+        ),
+    ),
+    Migration(
+        2,
+        "Indexes of daily notifications",
+        (
+            _add_index_if_missing(
+                "daily_notifications",
+                "idx_daily_notifications_chat_id",
+                "chat_id",
+            ),
+            _add_index_if_missing(
+                "daily_notifications",
+                "idx_daily_notifications_time",
+                "notification_time",
+            ),
+        ),
+    ),
+    Migration(
+        3,
+        "Days of reminders before holidays",
+        (
+            """
+            ALTER TABLE daily_notifications
+            ADD COLUMN reminder_days VARCHAR(64) NOT NULL DEFAULT ''
+            """,
+        ),
+    ),
+    Migration(
+        4,
+        "Time zones of daily notifications (empty - default time zone)",
+        (
+            """
+            ALTER TABLE daily_notifications
+            ADD COLUMN time_zone VARCHAR(64) NOT NULL DEFAULT ''
+            """,
+        ),
+    ),
+    Migration(
+        5,
+        "Log of notification deliveries and watermarks of shards",
+        (
+            """
+            CREATE TABLE IF NOT EXISTS notification_deliveries (
+                chat_id VARCHAR(32) NOT NULL,
+                delivery_date DATE NOT NULL,
+                due_minute BIGINT NOT NULL,
+                status VARCHAR(16) NOT NULL,
+                batch_id BIGINT UNSIGNED NOT NULL,
+                created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (chat_id, delivery_date),
+                INDEX idx_notification_deliveries_batch_id (batch_id),
+                INDEX idx_notification_deliveries_date (delivery_date)
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS notification_watermarks (
+                shard VARCHAR(16) PRIMARY KEY,
+                turned_minute BIGINT NOT NULL
+            )
+            """,
+        ),
+    ),
+    Migration(
+        6,
+        "Unique title and date of holidays (for upserts of imports)",
+        (_add_holidays_unique_key,),
+    ),
+)
+
+# Queries that must use indexes and example params for them
+INDEXED_QUERIES = (
+    ("ALL_HOLIDAYS_SQL_QUERY", ALL_HOLIDAYS_SQL_QUERY, ()),
+    (
+        "IS_EXISTS_DAILY_NOTIFICATIONS_QUERY",
+        IS_EXISTS_DAILY_NOTIFICATIONS_QUERY,
+        ("0",),
+    ),
+    (
+        "GET_DAILY_NOTIFICATIONS_PAGE_QUERY",
+        GET_DAILY_NOTIFICATIONS_PAGE_QUERY,
+        ("", 100),
+    ),
+    (
+        "DELETE_DAILY_NOTIFICATIONS_QUERY",
+        DELETE_DAILY_NOTIFICATIONS_QUERY,
+        ("0",),
+    ),
+    (
+        "CHANGE_DAILY_NOTIFICATION_TIME_QUERY",
+        CHANGE_DAILY_NOTIFICATION_TIME_QUERY,
+        ("09:00", "0"),
+    ),
+    ("GET_REMINDER_DAYS_QUERY", GET_REMINDER_DAYS_QUERY, ("0",)),
+    ("CHANGE_REMINDER_DAYS_QUERY", CHANGE_REMINDER_DAYS_QUERY, ("7", "0")),
+    ("GET_TIME_ZONE_QUERY", GET_TIME_ZONE_QUERY, ("0",)),
+    (
+        "CHANGE_TIME_ZONE_QUERY",
+        CHANGE_TIME_ZONE_QUERY,
+        ("Europe/Moscow", "0"),
+    ),
+    ("GET_CLAIMED_DELIVERIES_QUERY", GET_CLAIMED_DELIVERIES_QUERY, (0,)),
+    (
+        "CHANGE_DELIVERY_STATUS_QUERY",
+        CHANGE_DELIVERY_STATUS_QUERY,
+        ("failed", "0", "2024-01-01"),
+    ),
+    ("FINISH_DELIVERIES_QUERY", FINISH_DELIVERIES_QUERY, ("sent", 0)),
+    (
+        "GET_UNFINISHED_DELIVERIES_QUERY",
+        GET_UNFINISHED_DELIVERIES_QUERY,
+        ("2024-01-01", 900),
+    ),
+    (
+        "RECLAIM_DELIVERIES_QUERY",
+        RECLAIM_DELIVERIES_QUERY,
+        (0, "0", "2024-01-01", 900),
+    ),
+    (
+        "DELETE_OLD_DELIVERIES_QUERY",
+        DELETE_OLD_DELIVERIES_QUERY,
+        ("2024-01-01",),
+    ),
+    ("GET_WATERMARK_QUERY", GET_WATERMARK_QUERY, ("0/1",)),
+    ("GET_HOLIDAYS_PAGE_QUERY", GET_HOLIDAYS_PAGE_QUERY, (0, 1000)),
+)
+
+
+async def apply_migrations(
+    pool: DBPool, migrations: Sequence[Migration] = MIGRATIONS
+) -> List[int]:
+    """Apply not applied migrations in order and return their versions"""
+
+    await pool.execute(_CREATE_MIGRATIONS_TABLE_QUERY)
+
+    applied_versions = {
+        row[0] for row in await pool.fetch_all(_GET_APPLIED_VERSIONS_QUERY)
+    }
+    new_versions = []
+
+    for migration in sorted(migrations, key=lambda item: item.version):
+        if migration.version in applied_versions:
+            continue
+
+        logger.info(
+            "Applying migration %s: %s",
+            migration.version,
+            migration.description,
+        )
+
+        for step in migration.steps:
+            if isinstance(step, str):
+                await pool.execute(step)
+            else:
+                await step(pool)
+
+        # DDL is not transactional in MySQL, so the version is saved after
+        # all steps (a failed migration is applied again from the start)
+        await pool.execute(
+            _ADD_APPLIED_VERSION_QUERY,
+            (migration.version, migration.description),
+        )
+        new_versions.append(migration.version)
+
+    return new_versions
+
+
+async def check_indexes(pool: DBPool) -> List[str]:
+    """Return problems found in plans of the queries (empty - no problems)"""
+
+    problems = []
+
+    for name, query, params in INDEXED_QUERIES:
+        row = await pool.fetch_one(f"EXPLAIN FORMAT=JSON {query}", params)
+
+        problems.extend(
+            f"{name}: {problem}" for problem in get_plan_problems(row[0])
+        )
+
+    return problems
+
+
+def get_plan_problems(plan: str) -> List[str]:
+    """Return full scans and filesorts from EXPLAIN in JSON format"""
+
+    problems = []
+
+    for node in _iter_plan_nodes(loads(plan)):
+        if node.get("using_filesort"):
+            problems.append("filesort")
+
+        if "table_name" in node and node.get("access_type") == "ALL":
+            problems.append(f"full scan of {node['table_name']}")
+
+    return problems
+
+
+def _iter_plan_nodes(node: Any) -> Iterator[dict]:
+    """Yield all objects of the plan"""
+
+    if isinstance(node, dict):
+        yield node
+
+        for value in node.values():
+            yield from _iter_plan_nodes(value)
+    elif isinstance(node, list):
+        for item in node:
+            yield from _iter_plan_nodes(item)
+
+
+async def main() -> int:
+    """Apply migrations or check plans of queries, return exit code"""
+
+    parser = ArgumentParser(description="Migrations of DB schema")
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Check that queries use indexes instead of migrating",
+    )
+    args = parser.parse_args()
+
+    try:
+        if args.check:
+            problems = await check_indexes(DB_POOL)
+
+            for problem in problems:
+                print(problem)
+
+            print("OK" if not problems else f"Problems: {len(problems)}")
+
+            return 1 if problems else 0
+
+        new_versions = await apply_migrations(DB_POOL)
+        print(f"Applied migrations: {new_versions or 'none'}")
+
+        return 0
+    finally:
+        DB_POOL.close()
+
+
+if __name__ == "__main__":
+    basicConfig(**LOGGING_SETTINGS)
+    sys_exit(asyncio.run(main()))
@@ -0,0 +1,149 @@
+"""Reminders about holidays some days before them.
+
+Every subscriber can choose days before holidays to be reminded (e.g. 7, 3
+and 1). Subscribers are grouped by these days, so the daily plan is made
+once for every distinct number of days (not for every subscriber): holidays
+on «today + days» are taken from the holidays index and rendered into one
+message. Reminders are sent with daily notifications at the chat's time.
+
+"""
+
+from datetime import date, timedelta
+from logging import getLogger
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from holidays_index import HOLIDAY_INDEX
+from templates import REMINDER_FORMAT
+from utils import get_formatted_holidays
+
+logger = getLogger(__name__)
+
+
+class ReminderPlanner:
+    """Days of reminders of subscribers and reminders planned for today"""
+
+    def __init__(self) -> None:
+        self._days_by_chat: Dict[str, Tuple[int, ...]] = {}
+        self._chats_by_days: Dict[int, Set[str]] = {}
+
+        # Date -> days before holidays -> message (None - no holidays on
+        # that day). Users in different time zones have different dates.
+        self._plans: Dict[date, Dict[int, Optional[str]]] = {}
+        self._plans_version: Optional[int] = None
+
+    def set_days(self, chat_id: str, days: Iterable[int]) -> None:
+        """Set days before holidays to remind the chat (empty - never)"""
+
+        chat_id = str(chat_id)
+        days = tuple(sorted(set(days), reverse=True))
+
+        self.remove_chat(chat_id)
+
+        if not days:
+            return
+
+        self._days_by_chat[chat_id] = days
+
+        for days_before in days:
+            self._chats_by_days.setdefault(days_before, set()).add(chat_id)
+
+    def get_days(self, chat_id: str) -> Tuple[int, ...]:
+        """Return days before holidays to remind the chat"""
+
+        return self._days_by_chat.get(str(chat_id), ())
+
+    def remove_chat(self, chat_id: str) -> None:
+        """Don't remind the chat anymore"""
+
+        for days_before in self._days_by_chat.pop(str(chat_id), ()):
+            chat_ids = self._chats_by_days[days_before]
+            chat_ids.discard(str(chat_id))
+
+            if not chat_ids:
+                del self._chats_by_days[days_before]
+
+    async def plan(self, today: Optional[date] = None) -> int:
+        """Make the plan of reminders for the day for all subscribers.
+
+        Return number of planned messages (one per number of days).
+
+        """
+
+        today = today or date.today()
+        version = await HOLIDAY_INDEX.get_version()
+
+        if self._plans_version != version:
+            self._plans = {}
+            self._plans_version = version
+
+        # Plans of yesterday and tomorrow are kept for other time zones
+        for plan_date in list(self._plans):
+            if abs((plan_date - today).days) > 1:
+                del self._plans[plan_date]
+
+        plan = self._plans.setdefault(today, {})
+
+        for days_before in sorted(self._chats_by_days):
+            if days_before not in plan:
+                plan[days_before] = await self._render(today, days_before)
+
+        planned_count = sum(message is not None for message in plan.values())
+
+        logger.info(
+            "Reminders planned for %s: %s messages for %s chats",
+            today,
+            planned_count,
+            len(self._days_by_chat),
+        )
+
+        return planned_count
+
+    async def get_reminders(
+        self, chat_ids: Iterable[str], today: Optional[date] = None
+    ) -> List[Tuple[str, str]]:
+        """Return planned reminders (chat id and message) for the chats.
+
+        Today is the chats' local date (server's date by default).
+
+        """
+
+        today = today or date.today()
+        plan = self._plans.get(today)
+
+        if (
+            plan is None
+            or self._plans_version != HOLIDAY_INDEX.version
+            or not self._chats_by_days.keys() <= plan.keys()
+        ):
+            # The day has changed or someone has chosen new days
+            await self.plan(today)
+            plan = self._plans[today]
+
+        reminders = []
+
+        for chat_id in chat_ids:
+            for days_before in self._days_by_chat.get(str(chat_id), ()):
+                message = plan.get(days_before)
+
+                if message is not None:
+                    reminders.append((chat_id, message))
+
+        return reminders
+
+    @staticmethod
+    async def _render(today: date, days_before: int) -> Optional[str]:
+        """Return reminder about holidays in «days_before» days"""
+
+        holidays = await HOLIDAY_INDEX.get_date(
+            today + timedelta(days=days_before)
+        )
+
+        if not holidays:
+            return None
+
+        return await get_formatted_holidays(
+            holidays, format_name=REMINDER_FORMAT, today=today
+        )
+
+
+REMINDER_PLANNER = ReminderPlanner()
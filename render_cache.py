@@ -0,0 +1,76 @@
+"""Cache of rendered messages with holidays.
+
+Messages depend only on the holidays and today's date (days left, ages),
+so each one is rendered once per day and per version of the holidays.
+
+"""
+
+from collections import OrderedDict
+from datetime import date
+from typing import Awaitable, Callable, Dict, Hashable, Optional
+
+from constants.constants import RENDER_CACHE_SIZE
+from tracing import span
+
+
+class RenderCache:
+    """LRU cache of messages for today"""
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+
+        self._messages: OrderedDict = OrderedDict()
+        self._date: Optional[date] = None
+
+    async def get_or_render(
+        self,
+        view: Hashable,
+        holidays_version: Hashable,
+        render: Callable[[], Awaitable[str]],
+    ) -> str:
+        """Return cached message for the view or render and cache it"""
+
+        today = date.today()
+
+        if today != self._date:
+            self._messages.clear()
+            self._date = today
+
+        key = (view, holidays_version)
+        message = self._messages.get(key)
+
+        if message is not None:
+            self.hits += 1
+            self._messages.move_to_end(key)
+            return message
+
+        self.misses += 1
+
+        with span("render", view=str(view)):
+            message = await render()
+
+        self._messages[key] = message
+
+        if len(self._messages) > self.max_size:
+            self._messages.popitem(last=False)
+
+        return message
+
+    def clear(self) -> None:
+        """Remove all cached messages"""
+
+        self._messages.clear()
+
+    def get_stats(self) -> Dict[str, int]:
+        """Return size of the cache, number of hits and misses"""
+
+        return {
+            "size": len(self._messages),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+RENDER_CACHE = RenderCache(RENDER_CACHE_SIZE)
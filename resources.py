@@ -0,0 +1,103 @@
+"""Resources of the process: Telegram bot, DB pool and scheduler.
+
+Importing modules of the bot does no I/O and doesn't need secrets. The
+resources are created in «RESOURCES.startup()» (the token and DB settings
+are read there) and closed in «RESOURCES.shutdown()» by the bot's process
+and by every notification worker.
+
+"""
+
+from logging import getLogger
+from typing import Optional
+
+from aiogram import Bot
+from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import PRODUCTION, TelegramAPIServer
+from aiogram.enums import ParseMode
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+
+from constants.constants import TELEGRAM_API_URL, get_token
+from db import DB_POOL, DBPool
+
+logger = getLogger(__name__)
+
+
+def create_bot(token: str, api_url: str = "") -> Bot:
+    """Return bot that sends HTML messages (to the API server if the URL
+    is set)"""
+
+    return Bot(
+        token,
+        session=AiohttpSession(
+            api=(
+                TelegramAPIServer.from_base(api_url) if api_url else PRODUCTION
+            )
+        ),
+        default=DefaultBotProperties(parse_mode=ParseMode.HTML),
+    )
+
+
+class Resources:
+    """Bot, DB pool and scheduler created on startup"""
+
+    def __init__(self, db_pool: DBPool) -> None:
+        self.db_pool = db_pool
+
+        self._bot: Optional[Bot] = None
+        self._scheduler: Optional[AsyncIOScheduler] = None
+
+    @property
+    def bot(self) -> Bot:
+        """Bot of the process"""
+
+        if self._bot is None:
+            raise RuntimeError("Resources aren't started")
+
+        return self._bot
+
+    @property
+    def scheduler(self) -> AsyncIOScheduler:
+        """Scheduler of the process"""
+
+        if self._scheduler is None:
+            raise RuntimeError("Resources aren't started")
+
+        return self._scheduler
+
+    @property
+    def is_started(self) -> bool:
+        """Are the resources created"""
+
+        return self._bot is not None
+
+    async def startup(self) -> None:
+        """Read settings and create the resources (once)"""
+
+        if self.is_started:
+            return
+
+        self.db_pool.start()
+        self._bot = create_bot(get_token(), TELEGRAM_API_URL)
+        self._scheduler = AsyncIOScheduler()
+
+        logger.info("Resources are started")
+
+    async def shutdown(self) -> None:
+        """Stop the scheduler, close the bot's session and DB connections"""
+
+        if self._scheduler is not None and self._scheduler.running:
+            self._scheduler.shutdown(wait=False)
+
+        if self._bot is not None:
+            await self._bot.session.close()
+
+        self.db_pool.close()
+
+        self._bot = None
+        self._scheduler = None
+
+        logger.info("Resources are closed")
+
+
+RESOURCES = Resources(DB_POOL)
@@ -0,0 +1,403 @@
+"""Queue for all outgoing requests to Telegram.
+
+Requests are sent by a few workers with a global rate limit and a rate
+limit per chat. Replies to users go before bulk notifications, and
+requests that got «Too Many Requests» are retried after «retry_after».
+Requests that aren't sent when the queue is stopped fail with
+SendQueueStoppedError.
+
+"""
+
+from asyncio import (
+    CancelledError,
+    Future,
+    PriorityQueue,
+    Task,
+    TimerHandle,
+    create_task,
+    get_running_loop,
+    sleep,
+)
+from itertools import count
+from logging import getLogger
+from time import monotonic
+from typing import Any, Dict, List, Optional
+
+from aiogram.exceptions import TelegramAPIError, TelegramRetryAfter
+from aiogram.methods import SendMessage, SendPhoto
+from aiogram.methods.base import TelegramMethod
+
+from constants.constants import (
+    SEND_MAX_RETRIES,
+    SEND_PER_CHAT_BURST,
+    SEND_PER_CHAT_RATE_LIMIT,
+    SEND_RATE_LIMIT,
+    SEND_WORKERS,
+)
+from metrics import TELEGRAM_REQUEST_DURATION, TELEGRAM_REQUESTS, Gauge
+from tracing import span
+
+logger = getLogger(__name__)
+
+INTERACTIVE_PRIORITY = 0
+BULK_PRIORITY = 1
+
+# Per chat buckets are cleaned after this number of sent requests
+_CHAT_BUCKETS_CLEANUP_PERIOD = 1_000
+
+
+class SendQueueStoppedError(TelegramAPIError):
+    """Request isn't sent, as the queue is stopped (a Telegram API error,
+    so senders that catch «TelegramAPIError» handle it as before)"""
+
+
+class TokenBucket:
+    """Token bucket rate limiter"""
+
+    __slots__ = ("rate", "capacity", "_tokens", "_updated_at")
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+
+        self._tokens = capacity
+        self._updated_at = monotonic()
+
+    def reserve(self) -> float:
+        """Take a token if there is one.
+
+        Return 0 if the token is taken, otherwise seconds to wait for it.
+
+        """
+
+        self._refill()
+
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0
+
+        return (1 - self._tokens) / self.rate
+
+    async def acquire(self) -> None:
+        """Wait for a token and take it"""
+
+        while (delay := self.reserve()) > 0:
+            await sleep(delay)
+
+    def is_full(self) -> bool:
+        """Is the bucket full (nothing was taken recently)"""
+
+        self._refill()
+
+        return self._tokens >= self.capacity
+
+    def _refill(self) -> None:
+        """Add tokens for the time passed since the last refill"""
+
+        now = monotonic()
+
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated_at) * self.rate
+        )
+        self._updated_at = now
+
+
+class _OutgoingRequest:
+    """Request waiting in the queue"""
+
+    __slots__ = ("method", "future", "enqueued_at", "retries")
+
+    def __init__(self, method: TelegramMethod, future: Future) -> None:
+        self.method = method
+        self.future = future
+        self.enqueued_at = monotonic()
+        self.retries = 0
+
+
+class SendQueue:
+    """Priority queue of requests to Telegram with rate limits"""
+
+    def __init__(
+        self,
+        rate_limit: float,
+        per_chat_rate_limit: float,
+        per_chat_burst: int,
+        workers_count: int,
+        max_retries: int,
+    ) -> None:
+        self._rate_limit = rate_limit
+        self._per_chat_rate_limit = per_chat_rate_limit
+        self._per_chat_burst = per_chat_burst
+        self._workers_count = workers_count
+        self._max_retries = max_retries
+
+        self._queue: Optional[PriorityQueue] = None
+        self._workers: List[Task] = []
+        self._sequence = count()
+        self._global_bucket = TokenBucket(rate_limit, rate_limit)
+        self._chat_buckets: Dict[Any, TokenBucket] = {}
+        # Requests waiting to be put back to the queue
+        self._delayed: Dict[_OutgoingRequest, TimerHandle] = {}
+
+        self.counters = {"sent": 0, "retried": 0, "failed": 0}
+        self._latency_sum = 0.0
+        self._latency_max = 0.0
+
+    async def send(
+        self, method: TelegramMethod, priority: int = INTERACTIVE_PRIORITY
+    ) -> Any:
+        """Put the request (bound to the bot) to the queue and return
+        Telegram's response when it is sent"""
+
+        if self._queue is None:
+            self._start()
+
+        future = get_running_loop().create_future()
+
+        self._queue.put_nowait(
+            (
+                priority,
+                next(self._sequence),
+                _OutgoingRequest(method, future),
+            )
+        )
+
+        with span(f"telegram.{type(method).__name__}", priority=priority):
+            return await future
+
+    def set_rate_limit(self, rate_limit: float) -> None:
+        """Change max number of requests per second"""
+
+        self._rate_limit = rate_limit
+        self._global_bucket = TokenBucket(rate_limit, rate_limit)
+
+    async def stop(self) -> None:
+        """Stop the workers, fail requests that aren't sent"""
+
+        for worker in self._workers:
+            worker.cancel()
+
+        for worker in self._workers:
+            try:
+                await worker
+            except CancelledError:
+                pass
+
+        for request, timer in self._delayed.items():
+            timer.cancel()
+            self._fail_stopped(request)
+
+        while self._queue is not None and not self._queue.empty():
+            self._fail_stopped(self._queue.get_nowait()[2])
+
+        self._delayed = {}
+        self._workers = []
+        self._queue = None
+
+    def get_stats(self) -> Dict[str, float]:
+        """Return queue's depth, counters and latency of sent requests"""
+
+        sent = self.counters["sent"]
+        queue_depth = self._queue.qsize() if self._queue is not None else 0
+
+        return {
+            "queue_depth": queue_depth + len(self._delayed),
+            **self.counters,
+            "latency_avg": self._latency_sum / sent if sent else 0.0,
+            "latency_max": self._latency_max,
+        }
+
+    def _start(self) -> None:
+        """Create the queue and the workers in the running loop"""
+
+        self._queue = PriorityQueue()
+        self._workers = [
+            create_task(self._work()) for _ in range(self._workers_count)
+        ]
+
+    async def _work(self) -> None:
+        """Take requests from the queue and send them"""
+
+        while True:
+            item = await self._queue.get()
+
+            try:
+                await self._process(*item)
+            except CancelledError:
+                # The queue is stopped while the request is sent
+                self._fail_stopped(item[2])
+                raise
+            except Exception as error:
+                logger.exception(error)
+            finally:
+                self._queue.task_done()
+
+    async def _process(
+        self, priority: int, sequence: int, request: _OutgoingRequest
+    ) -> None:
+        """Send the request if the chat's limit allows it"""
+
+        if request.future.done():
+            # The sender doesn't wait for the result anymore
+            return
+
+        chat_id = getattr(request.method, "chat_id", None)
+
+        if chat_id is not None:
+            delay = self._get_chat_bucket(chat_id).reserve()
+
+            if delay > 0:
+                self._put_later(delay, priority, sequence, request)
+                return
+
+        await self._global_bucket.acquire()
+
+        try:
+            result = await request.method
+        except TelegramRetryAfter as error:
+            if request.retries < self._max_retries:
+                request.retries += 1
+                self.counters["retried"] += 1
+                TELEGRAM_REQUESTS.inc(
+                    self._get_method_name(request), type(error).__name__
+                )
+
+                logger.warning(
+                    "Flood control for chat %s, retry in %s seconds",
+                    chat_id,
+                    error.retry_after,
+                )
+                self._put_later(error.retry_after, priority, sequence, request)
+            else:
+                self._fail(request, error)
+        except Exception as error:
+            self._fail(request, error)
+        else:
+            self._succeed(request, result)
+
+    @staticmethod
+    def _get_method_name(request: _OutgoingRequest) -> str:
+        """Return name of Telegram's method of the request"""
+
+        return type(request.method).__name__
+
+    def _succeed(self, request: _OutgoingRequest, result: Any) -> None:
+        """Save the latency and return the result to the sender"""
+
+        latency = monotonic() - request.enqueued_at
+        method_name = self._get_method_name(request)
+
+        TELEGRAM_REQUESTS.inc(method_name, "ok")
+        TELEGRAM_REQUEST_DURATION.observe(latency, method_name)
+
+        self.counters["sent"] += 1
+        self._latency_sum += latency
+        self._latency_max = max(self._latency_max, latency)
+
+        if not request.future.done():
+            request.future.set_result(result)
+
+        if self.counters["sent"] % _CHAT_BUCKETS_CLEANUP_PERIOD == 0:
+            self._clean_chat_buckets()
+
+    def _fail(self, request: _OutgoingRequest, error: Exception) -> None:
+        """Return the error to the sender"""
+
+        self.counters["failed"] += 1
+        TELEGRAM_REQUESTS.inc(
+            self._get_method_name(request), type(error).__name__
+        )
+
+        if not request.future.done():
+            request.future.set_exception(error)
+
+    def _fail_stopped(self, request: _OutgoingRequest) -> None:
+        """Return error to the sender of the request that isn't sent"""
+
+        self._fail(
+            request,
+            SendQueueStoppedError(request.method, "Send queue is stopped"),
+        )
+
+    def _put_later(
+        self,
+        delay: float,
+        priority: int,
+        sequence: int,
+        request: _OutgoingRequest,
+    ) -> None:
+        """Put the request back to the queue after delay (keep its order)"""
+
+        def put_back() -> None:
+            self._delayed.pop(request, None)
+
+            if self._queue is None:
+                self._fail_stopped(request)
+            else:
+                self._queue.put_nowait((priority, sequence, request))
+
+        self._delayed[request] = get_running_loop().call_later(delay, put_back)
+
+    def _get_chat_bucket(self, chat_id: Any) -> TokenBucket:
+        """Return rate limiter of the chat"""
+
+        bucket = self._chat_buckets.get(chat_id)
+
+        if bucket is None:
+            bucket = self._chat_buckets[chat_id] = TokenBucket(
+                self._per_chat_rate_limit, self._per_chat_burst
+            )
+
+        return bucket
+
+    def _clean_chat_buckets(self) -> None:
+        """Remove limiters of the chats without recent requests"""
+
+        self._chat_buckets = {
+            chat_id: bucket
+            for chat_id, bucket in self._chat_buckets.items()
+            if not bucket.is_full()
+        }
+
+
+SEND_QUEUE = SendQueue(
+    SEND_RATE_LIMIT,
+    SEND_PER_CHAT_RATE_LIMIT,
+    SEND_PER_CHAT_BURST,
+    SEND_WORKERS,
+    SEND_MAX_RETRIES,
+)
+
+SEND_QUEUE_DEPTH = Gauge(
+    "bot_send_queue_depth",
+    "Number of requests to Telegram waiting in the queue",
+    lambda: SEND_QUEUE.get_stats()["queue_depth"],
+)
+
+
+async def send(
+    method: TelegramMethod, priority: int = INTERACTIVE_PRIORITY
+) -> Any:
+    """Send the request (bound to the bot) through the queue"""
+
+    return await SEND_QUEUE.send(method, priority)
+
+
+async def send_message(
+    bot, chat_id: Any, text: str, priority: int = BULK_PRIORITY, **kwargs
+) -> Any:
+    """Send the message to the chat through the queue"""
+
+    return await send(
+        SendMessage(chat_id=chat_id, text=text, **kwargs).as_(bot), priority
+    )
+
+
+async def send_photo(
+    bot, chat_id: Any, photo, priority: int = BULK_PRIORITY, **kwargs
+) -> Any:
+    """Send the photo to the chat through the queue"""
+
+    return await send(
+        SendPhoto(chat_id=chat_id, photo=photo, **kwargs).as_(bot), priority
+    )
@@ -1,101 +1,334 @@
 """All business-logic of the project"""
 
+from asyncio import Semaphore, gather
+from datetime import date
 from logging import getLogger
-from typing import Dict, Tuple
-
-from aiogram.types import FSInputFile, Message
+from os import path
+from tempfile import TemporaryDirectory
+from typing import AsyncIterator, Iterable, List, Optional, Tuple
+
+from aiogram.exceptions import TelegramAPIError, TelegramBadRequest
+from aiogram.types import (
+    CallbackQuery,
+    FSInputFile,
+    InlineKeyboardMarkup,
+    Message,
+)
 from mysql.connector import Error
 
-from constants.constants import DB_CONNECT, ERROR_MESSAGE
+from constants.constants import (
+    DEFAULT_TIME_ZONE,
+    ERROR_MESSAGE,
+    HOLIDAYS_PAGE_CALLBACK,
+    HOLIDAYS_PAGE_SIZE,
+    MESSAGE_MAX_LENGTH,
+    NOTIFICATIONS_CONCURRENCY,
+    STALE_HOLIDAYS_NOTE,
+)
 from constants.queries import (
     ADD_DAILY_NOTIFICATIONS_QUERY,
     CHANGE_DAILY_NOTIFICATION_TIME_QUERY,
+    CHANGE_REMINDER_DAYS_QUERY,
+    CHANGE_TIME_ZONE_QUERY,
     DELETE_DAILY_NOTIFICATIONS_QUERY,
-    GET_DAILY_NOTIFICATIONS_QUERY,
+    GET_DAILY_NOTIFICATIONS_PAGE_QUERY,
+    GET_REMINDER_DAYS_QUERY,
+    GET_TIME_ZONE_QUERY,
     IS_EXISTS_DAILY_NOTIFICATIONS_QUERY,
-    TODAYS_HOLIDAYS_SQL_QUERY,
 )
+from custom_types import DeliveryReport, TypePageKey
+from db import DB_POOL
+from holidays_index import HOLIDAY_INDEX
+from holidays_io import (
+    export_holidays,
+    get_file_format,
+    get_import_report_text,
+    import_holidays,
+)
+from keyboards import get_pages_inline_keyboard
+from media import answer_photo, send_photo
+from reminders import REMINDER_PLANNER
+from render_cache import RENDER_CACHE
+from sender import INTERACTIVE_PRIORITY, send, send_message
+from templates import LIST_FORMAT, get_message_format
 from utils import (
     get_formatted_holidays,
     get_hours_and_minutes_from_seconds_delta,
+    parse_reminder_days,
+    split_html_message,
 )
 
-cursor = DB_CONNECT.cursor()
-
 logger = getLogger(__name__)
 
+_PAGE_AFTER = "after"
+_PAGE_BEFORE = "before"
 
-async def send_sql_query_result_to_user(
-    message: Message, sql_query: str
+
+async def send_holidays_to_user(
+    message: Message, month: Optional[int] = None
 ) -> None:
-    """Execute SQL query, format the result and send to the user"""
+    """Get holidays (all or in the month), format and send to the user"""
+
+    async def render() -> str:
+        if month is None:
+            holidays = await HOLIDAY_INDEX.get_all()
+        else:
+            holidays = await HOLIDAY_INDEX.get_month(month)
+
+        return await get_formatted_holidays(holidays)
 
     try:
-        cursor.execute(sql_query)
-        holidays = cursor.fetchall()
+        holidays_info = await RENDER_CACHE.get_or_render(
+            ("holidays", month), await HOLIDAY_INDEX.get_version(), render
+        )
+
+        for part in split_html_message(_get_stale_note() + holidays_info):
+            await send(message.answer(part))
+    except Error as error:
+        logger.error(error)
+        await answer_photo(
+            message, "photos/tinkoff.jpg", caption=ERROR_MESSAGE
+        )
+
+
+async def send_month_choosing_instruction(message: Message) -> None:
+    """Send instruction about month choosing"""
+
+    await answer_photo(
+        message,
+        "photos/month_choosing_button.png",
+        caption="Также ты можешь получить <u>праздники в конкретном месяце</u>."
+        " Для этого нажми на эту кнопку 👆",
+    )
+
+
+async def send_upcoming_holidays(message: Message, count: int) -> None:
+    """Send the next holidays from today (with the nearest first)"""
+
+    async def render() -> str:
+        return await get_formatted_holidays(
+            await HOLIDAY_INDEX.get_upcoming(date.today(), count)
+        )
+
+    try:
+        holidays_info = await RENDER_CACHE.get_or_render(
+            ("upcoming", count), await HOLIDAY_INDEX.get_version(), render
+        )
+
+        for part in split_html_message(_get_stale_note() + holidays_info):
+            await send(message.answer(part))
+    except Error as error:
+        logger.error(error)
+        await answer_photo(
+            message, "photos/tinkoff.jpg", caption=ERROR_MESSAGE
+        )
+
+
+async def send_holidays_page(message: Message) -> None:
+    """Send the first page of all holidays with «◀» and «▶» buttons"""
+
+    try:
+        text, keyboard = await get_holidays_page()
+
+        await send(message.answer(text, reply_markup=keyboard))
+    except Error as error:
+        logger.error(error)
+        await answer_photo(
+            message, "photos/tinkoff.jpg", caption=ERROR_MESSAGE
+        )
+
+
+async def edit_holidays_page(callback_query: CallbackQuery) -> None:
+    """Show the page of all holidays chosen by «◀» or «▶» button in the
+    same message"""
+
+    page = _parse_page_callback(callback_query.data)
 
-        if holidays:
-            holidays_info = await get_formatted_holidays(holidays)
+    if page is None:
+        # Malformed or forged data, the page isn't changed
+        logger.warning("Wrong page callback: %s", callback_query.data)
+        await send(callback_query.answer())
+        return
+
+    direction, key = page
+
+    try:
+        if direction == _PAGE_BEFORE:
+            text, keyboard = await get_holidays_page(before=key)
         else:
-            holidays_info = "Праздников в этот период нет"
+            text, keyboard = await get_holidays_page(after=key)
 
-        await message.answer(holidays_info)
+        await send(
+            callback_query.message.edit_text(text, reply_markup=keyboard)
+        )
+    except TelegramBadRequest as error:
+        # The same page is shown already (e.g. after double click)
+        logger.warning(error)
     except Error as error:
         logger.error(error)
-        await message.answer_photo(
-            FSInputFile("photos/tinkoff.jpg"),
-            ERROR_MESSAGE,
+        await answer_photo(
+            callback_query.message, "photos/tinkoff.jpg", caption=ERROR_MESSAGE
         )
+    finally:
+        await send(callback_query.answer())
+
+
+def _parse_page_callback(data: str) -> Optional[Tuple[str, TypePageKey]]:
+    """Return direction and key of the page from callback data of «◀» or
+    «▶» button (None if the data is wrong)"""
+
+    parts = data.split(":")
+
+    if len(parts) != 5 or parts[1] not in (_PAGE_AFTER, _PAGE_BEFORE):
+        return None
+
+    try:
+        key = tuple(int(item) for item in parts[2:])
+    except ValueError:
+        return None
+
+    return parts[1], key
+
+
+async def get_holidays_page(
+    after: Optional[TypePageKey] = None,
+    before: Optional[TypePageKey] = None,
+) -> Tuple[str, Optional[InlineKeyboardMarkup]]:
+    """Return text and keyboard of the page of all holidays.
+
+    The page has up to HOLIDAYS_PAGE_SIZE holidays, but not more than fit
+    into one message.
+
+    """
+
+    page = await HOLIDAY_INDEX.get_page(HOLIDAYS_PAGE_SIZE, after, before)
+
+    if not page.holidays:
+        return get_message_format(LIST_FORMAT).empty, None
+
+    items = list(zip(page.keys, page.holidays))
+
+    # Going back, the holidays nearest to the previous page are kept
+    if before is not None:
+        items.reverse()
+
+    stale_note = _get_stale_note()
+    texts = []
+    keys = []
+    length = len(stale_note)
+
+    for key, holiday in items:
+        text = await get_formatted_holidays([holiday])
+
+        if texts and length + len(text) > MESSAGE_MAX_LENGTH:
+            break
+
+        texts.append(text)
+        keys.append(key)
+        length += len(text)
+
+    is_cut = len(keys) < len(items)
+
+    if before is not None:
+        texts.reverse()
+        keys.reverse()
+
+    has_previous = page.has_previous or (is_cut and before is not None)
+    has_next = page.has_next or (is_cut and before is None)
+
+    keyboard = get_pages_inline_keyboard(
+        (
+            _get_page_callback_data(_PAGE_BEFORE, keys[0])
+            if has_previous
+            else None
+        ),
+        _get_page_callback_data(_PAGE_AFTER, keys[-1]) if has_next else None,
+    )
+
+    # A single holiday can be longer than a message
+    return split_html_message(stale_note + "".join(texts))[0], keyboard
+
+
+def _get_stale_note() -> str:
+    """Return note about possibly stale holidays if DB is unavailable"""
+
+    return STALE_HOLIDAYS_NOTE if HOLIDAY_INDEX.is_stale else ""
+
+
+def _get_page_callback_data(direction: str, key: TypePageKey) -> str:
+    """Return callback data of the button that shows the next page in the
+    direction from the key"""
+
+    return ":".join(
+        (HOLIDAYS_PAGE_CALLBACK, direction, *(str(item) for item in key))
+    )
 
 
 async def is_daily_notification_exists(message: Message) -> bool:
     """Check is there is the user's daily notification"""
 
     try:
-        cursor.execute(
-            IS_EXISTS_DAILY_NOTIFICATIONS_QUERY.format(chat_id=message.chat.id)
+        is_exists = await DB_POOL.fetch_one(
+            IS_EXISTS_DAILY_NOTIFICATIONS_QUERY, (str(message.chat.id),)
         )
 
-        return bool(cursor.fetchone()[0])
+        return bool(is_exists[0])
     except Error as error:
         logger.error(error)
-        await message.answer_photo(
-            FSInputFile("photos/tinkoff.jpg"),
-            ERROR_MESSAGE,
+        await answer_photo(
+            message, "photos/tinkoff.jpg", caption=ERROR_MESSAGE
         )
 
 
-async def get_daily_notifications_from_db() -> Dict[str, Tuple[int, int]]:
-    """Return all chat ids for daily notifications"""
+async def iter_daily_notifications_from_db(
+    page_size: int,
+) -> AsyncIterator[List[Tuple[str, Tuple[int, int], Tuple[int, ...], str]]]:
+    """Yield chat ids, times, days of reminders and time zones of daily
+    notifications page by page"""
 
-    try:
-        cursor.execute(GET_DAILY_NOTIFICATIONS_QUERY)
+    last_chat_id = ""
 
-        return {
-            notification[0]: await get_hours_and_minutes_from_seconds_delta(
-                notification[1]
+    while True:
+        try:
+            notifications = await DB_POOL.fetch_all(
+                GET_DAILY_NOTIFICATIONS_PAGE_QUERY, (last_chat_id, page_size)
             )
-            for notification in cursor.fetchall()
-        }
-    except Error as error:
-        logger.error(error)
+        except Error as error:
+            logger.error(error)
+            return
+
+        if not notifications:
+            return
+
+        yield [
+            (
+                chat_id,
+                await get_hours_and_minutes_from_seconds_delta(time_),
+                parse_reminder_days(reminder_days),
+                time_zone or DEFAULT_TIME_ZONE,
+            )
+            for chat_id, time_, reminder_days, time_zone in notifications
+        ]
+
+        if len(notifications) < page_size:
+            return
+
+        last_chat_id = notifications[-1][0]
 
 
 async def add_new_daily_notification_to_db(message: Message) -> None:
     """Add a new daily notification for the user"""
 
     try:
-        cursor.execute(
-            ADD_DAILY_NOTIFICATIONS_QUERY.format(chat_id=message.chat.id)
+        await DB_POOL.execute(
+            ADD_DAILY_NOTIFICATIONS_QUERY, (str(message.chat.id),)
         )
-        DB_CONNECT.commit()
 
-        await message.answer("Уведомление добавлено! ☑️")
+        await send(message.answer("Уведомление добавлено! ☑️"))
     except Error as error:
         logger.error(error)
-        await message.answer_photo(
-            FSInputFile("photos/tinkoff.jpg"),
-            ERROR_MESSAGE,
+        await answer_photo(
+            message, "photos/tinkoff.jpg", caption=ERROR_MESSAGE
         )
 
 
@@ -103,36 +336,170 @@ async def delete_daily_notification_from_db(message: Message) -> None:
     """Delete daily notification for the user"""
 
     try:
-        cursor.execute(
-            DELETE_DAILY_NOTIFICATIONS_QUERY.format(chat_id=message.chat.id)
+        await DB_POOL.execute(
+            DELETE_DAILY_NOTIFICATIONS_QUERY, (str(message.chat.id),)
+        )
+
+        await send(message.answer("Уведомление отключено! ☑️"))
+    except Error as error:
+        logger.error(error)
+        await answer_photo(
+            message, "photos/tinkoff.jpg", caption=ERROR_MESSAGE
+        )
+
+
+async def send_today_holidays(
+    bot, chat_ids: Iterable[str], today: Optional[date] = None
+) -> DeliveryReport:
+    """Send today's holidays to all the users.
+
+    The message is rendered once and sent to the users concurrently. Today
+    is the users' local date (server's date by default).
+
+    """
+
+    chat_ids = list(chat_ids)
+    today = today or date.today()
+
+    try:
+        holidays = await HOLIDAY_INDEX.get_date(today)
+    except Error as error:
+        logger.error(error)
+        return DeliveryReport(delivered=0, skipped=0, failed=len(chat_ids))
+
+    if not holidays:
+        return DeliveryReport(delivered=0, skipped=len(chat_ids), failed=0)
+
+    holidays_info = await RENDER_CACHE.get_or_render(
+        ("notification", today),
+        HOLIDAY_INDEX.version,
+        lambda: get_formatted_holidays(holidays, True, today=today),
+    )
+
+    return await _send_messages(
+        bot, [(chat_id, holidays_info) for chat_id in chat_ids]
+    )
+
+
+async def send_reminders(
+    bot, chat_ids: Iterable[str], today: Optional[date] = None
+) -> DeliveryReport:
+    """Send planned reminders about the next holidays to the users"""
+
+    chat_ids = list(chat_ids)
+
+    try:
+        reminders = await REMINDER_PLANNER.get_reminders(chat_ids, today)
+    except Error as error:
+        logger.error(error)
+        return DeliveryReport(delivered=0, skipped=0, failed=len(chat_ids))
+
+    return await _send_messages(bot, reminders)
+
+
+async def _send_messages(
+    bot, messages: List[Tuple[str, str]]
+) -> DeliveryReport:
+    """Send the messages (chat id and text) concurrently"""
+
+    semaphore = Semaphore(NOTIFICATIONS_CONCURRENCY)
+
+    async def send_to_chat(chat_id: str, text: str) -> bool:
+        async with semaphore:
+            try:
+                await send_message(bot, chat_id, text)
+            except TelegramAPIError as error:
+                logger.error("Notification to %s failed: %s", chat_id, error)
+                return False
+
+        return True
+
+    results = await gather(
+        *(send_to_chat(chat_id, text) for chat_id, text in messages)
+    )
+    failed_chat_ids = tuple(
+        chat_id
+        for (chat_id, _), is_delivered in zip(messages, results)
+        if not is_delivered
+    )
+
+    return DeliveryReport(
+        delivered=len(results) - len(failed_chat_ids),
+        skipped=0,
+        failed=len(failed_chat_ids),
+        failed_chat_ids=failed_chat_ids,
+    )
+
+
+async def get_reminder_days_from_db(message: Message) -> Tuple[int, ...]:
+    """Return days before holidays to remind the user"""
+
+    row = await DB_POOL.fetch_one(
+        GET_REMINDER_DAYS_QUERY, (str(message.chat.id),)
+    )
+
+    return parse_reminder_days(row[0]) if row else ()
+
+
+async def change_reminder_days_in_db(
+    message: Message, days: Tuple[int, ...]
+) -> bool:
+    """Save days before holidays to remind the user, return True if they
+    are saved"""
+
+    try:
+        await DB_POOL.execute(
+            CHANGE_REMINDER_DAYS_QUERY,
+            (",".join(str(item) for item in days), str(message.chat.id)),
         )
-        DB_CONNECT.commit()
 
-        await message.answer("Уведомление отключено! ☑️")
+        if days:
+            days_text = ", ".join(str(item) for item in days)
+            await send(
+                message.answer(
+                    f"Напомню о праздниках за столько дней: {days_text} 🔔"
+                )
+            )
+        else:
+            await send(message.answer("Напоминания отключены! ☑️"))
     except Error as error:
         logger.error(error)
-        await message.answer_photo(
-            FSInputFile("photos/tinkoff.jpg"),
-            ERROR_MESSAGE,
+        await answer_photo(
+            message, "photos/tinkoff.jpg", caption=ERROR_MESSAGE
         )
+        return False
+
+    return True
+
+
+async def get_time_zone_from_db(message: Message) -> str:
+    """Return time zone of the user's daily notification"""
+
+    row = await DB_POOL.fetch_one(GET_TIME_ZONE_QUERY, (str(message.chat.id),))
 
+    return (row[0] if row else "") or DEFAULT_TIME_ZONE
 
-async def send_today_holidays(bot, chat_id: str) -> None:
-    """Send today's holidays to the user"""
+
+async def change_time_zone_in_db(message: Message, time_zone: str) -> bool:
+    """Save time zone of the user's daily notification, return True if it
+    is saved"""
 
     try:
-        cursor.execute(TODAYS_HOLIDAYS_SQL_QUERY)
-        holidays = cursor.fetchall()
+        await DB_POOL.execute(
+            CHANGE_TIME_ZONE_QUERY, (time_zone, str(message.chat.id))
+        )
 
-        if holidays:
-            holidays_info = await get_formatted_holidays(holidays, True)
-            await bot.send_message(chat_id=chat_id, text=holidays_info)
+        await send(
+            message.answer(f"Часовой пояс уведомления изменен на {time_zone}!")
+        )
     except Error as error:
         logger.error(error)
-        await bot.answer_photo(
-            FSInputFile("photos/tinkoff.jpg"),
-            ERROR_MESSAGE,
+        await answer_photo(
+            message, "photos/tinkoff.jpg", caption=ERROR_MESSAGE
         )
+        return False
+
+    return True
 
 
 async def change_daily_notification_time_in_db(
@@ -141,21 +508,81 @@ async def change_daily_notification_time_in_db(
     """Change daily notification's time to new time from user"""
 
     try:
-        cursor.execute(
-            CHANGE_DAILY_NOTIFICATION_TIME_QUERY.format(
-                new_time=new_time,
-                chat_id=chat_id,
-            )
+        await DB_POOL.execute(
+            CHANGE_DAILY_NOTIFICATION_TIME_QUERY, (new_time, chat_id)
+        )
+
+        await send_message(
+            bot,
+            chat_id,
+            f"Время ежедневного уведомления изменено на {new_time}!",
+            INTERACTIVE_PRIORITY,
+        )
+    except Error as error:
+        logger.error(error)
+        await send_photo(
+            bot,
+            chat_id,
+            "photos/tinkoff.jpg",
+            INTERACTIVE_PRIORITY,
+            caption=ERROR_MESSAGE,
         )
-        DB_CONNECT.commit()
 
-        await bot.send_message(
-            chat_id=chat_id,
-            text=f"Время ежедневного уведомления изменено на {new_time}!",
+
+async def import_holidays_from_document(bot, message: Message) -> None:
+    """Import holidays from the message's CSV or iCalendar document"""
+
+    try:
+        file_format = get_file_format(message.document.file_name or "")
+    except ValueError:
+        await send(
+            message.answer(
+                "Поддерживаются только файлы CSV и iCalendar (.ics)"
+            )
         )
+        return
+
+    with TemporaryDirectory() as directory:
+        file_path = path.join(directory, f"holidays.{file_format}")
+
+        try:
+            await bot.download(message.document, destination=file_path)
+
+            with open(file_path, encoding="utf-8-sig", newline="") as file:
+                report = await import_holidays(DB_POOL, file, file_format)
+        except (Error, TelegramAPIError, UnicodeDecodeError) as error:
+            logger.error(error)
+            await answer_photo(
+                message, "photos/tinkoff.jpg", caption=ERROR_MESSAGE
+            )
+            return
+
+    try:
+        await HOLIDAY_INDEX.refresh()
     except Error as error:
         logger.error(error)
-        await bot.answer_photo(
-            FSInputFile("photos/tinkoff.jpg"),
-            ERROR_MESSAGE,
+
+    await send(message.answer(get_import_report_text(report)))
+
+
+async def send_holidays_export(message: Message, file_format: str) -> None:
+    """Send all holidays to the user as CSV or iCalendar file"""
+
+    with TemporaryDirectory() as directory:
+        file_path = path.join(directory, f"holidays.{file_format}")
+
+        try:
+            with open(file_path, "w", encoding="utf-8", newline="") as file:
+                exported = await export_holidays(DB_POOL, file, file_format)
+        except Error as error:
+            logger.error(error)
+            await answer_photo(
+                message, "photos/tinkoff.jpg", caption=ERROR_MESSAGE
+            )
+            return
+
+        await send(
+            message.answer_document(
+                FSInputFile(file_path), caption=f"Праздников: {exported}"
+            )
         )
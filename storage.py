@@ -0,0 +1,340 @@
+"""Storage for FSM.
+
+Keeps a limited number of the most recently used entries in memory and
+removes entries that were not used for a long time. If the path is set,
+entries are also saved to SQLite (in batches), so states survive restarts.
+
+"""
+
+from asyncio import CancelledError, Lock, create_task, get_running_loop, sleep
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from json import dumps, loads
+from logging import getLogger
+from sqlite3 import connect
+from time import time
+from typing import Any, Dict, Mapping, Optional
+
+from aiogram.exceptions import DataNotDictLikeError
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+
+logger = getLogger(__name__)
+
+_CREATE_TABLE_QUERY = """
+CREATE TABLE IF NOT EXISTS fsm_storage (
+    key TEXT PRIMARY KEY,
+    state TEXT,
+    data TEXT NOT NULL,
+    accessed_at REAL NOT NULL
+)
+"""
+_SELECT_QUERY = "SELECT state, data, accessed_at FROM fsm_storage WHERE key=?"
+_UPSERT_QUERY = "INSERT OR REPLACE INTO fsm_storage VALUES (?, ?, ?, ?)"
+_DELETE_QUERY = "DELETE FROM fsm_storage WHERE key=?"
+_DELETE_EXPIRED_QUERY = "DELETE FROM fsm_storage WHERE accessed_at < ?"
+
+
+class _StorageRecord:
+    """State and data of one key"""
+
+    __slots__ = ("state", "data", "accessed_at", "saved_at")
+
+    def __init__(
+        self,
+        state: Optional[str] = None,
+        data: Optional[Dict[str, Any]] = None,
+        accessed_at: float = 0,
+    ) -> None:
+        self.state = state
+        self.data = data if data is not None else {}
+        self.accessed_at = accessed_at
+        self.saved_at = accessed_at
+
+
+class BoundedStorage(BaseStorage):
+    """FSM storage with max number of entries in memory and idle TTL"""
+
+    def __init__(
+        self,
+        max_size: int,
+        ttl: float,
+        path: Optional[str] = None,
+        flush_interval: float = 5,
+        batch_size: int = 500,
+    ) -> None:
+        self._max_size = max_size
+        self._ttl = ttl
+        self._path = path
+        self._flush_interval = flush_interval
+        self._batch_size = batch_size
+
+        self._records: OrderedDict = OrderedDict()
+        # Changes not saved to SQLite yet (None - the key is deleted)
+        self._dirty: Dict[str, Optional[_StorageRecord]] = {}
+
+        self._connection = None
+        self._executor = None
+        self._flush_lock = None
+        self._flush_task = None
+        self._cleanup_task = None
+
+    async def set_state(
+        self, key: StorageKey, state: StateType = None
+    ) -> None:
+        record = await self._get_record(key) or _StorageRecord()
+        record.state = state.state if isinstance(state, State) else state
+
+        self._save(key, record)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        record = await self._get_record(key)
+
+        return record.state if record is not None else None
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        if not isinstance(data, dict):
+            raise DataNotDictLikeError(
+                f"Data must be a dict or dict-like object, "
+                f"got {type(data).__name__}"
+            )
+
+        record = await self._get_record(key) or _StorageRecord()
+        record.data = data.copy()
+
+        self._save(key, record)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        record = await self._get_record(key)
+
+        return record.data.copy() if record is not None else {}
+
+    async def close(self) -> None:
+        if self._cleanup_task is not None:
+            self._cleanup_task.cancel()
+
+            try:
+                await self._cleanup_task
+            except CancelledError:
+                pass
+
+            self._cleanup_task = None
+
+        if self._flush_task is not None:
+            await self._flush_task
+            self._flush_task = None
+
+        if self._path is not None:
+            await self._flush()
+
+        if self._connection is not None:
+            await self._run_in_executor(self._connection.close)
+            self._connection = None
+
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    async def _get_record(self, key: StorageKey) -> Optional[_StorageRecord]:
+        """Return not expired record of the key"""
+
+        now = time()
+        record = self._records.get(key)
+
+        if record is None and self._path is not None:
+            record = await self._load(key)
+
+            if record is not None:
+                self._records[key] = record
+                self._evict()
+
+        if record is None:
+            return None
+
+        if now - record.accessed_at > self._ttl:
+            self._delete(key)
+            return None
+
+        record.accessed_at = now
+        self._records.move_to_end(key)
+
+        # Save access time rarely, it is only needed to expire on disk
+        if self._path is not None and now - record.saved_at > self._ttl / 10:
+            self._mark_dirty(key, record)
+
+        return record
+
+    def _save(self, key: StorageKey, record: _StorageRecord) -> None:
+        """Save the record in memory and mark it to be saved to SQLite"""
+
+        if record.state is None and not record.data:
+            self._delete(key)
+            return
+
+        record.accessed_at = time()
+
+        self._records[key] = record
+        self._records.move_to_end(key)
+        self._evict()
+
+        if self._path is not None:
+            self._mark_dirty(key, record)
+
+        if self._cleanup_task is None:
+            self._cleanup_task = create_task(self._clean_periodically())
+
+    def _delete(self, key: StorageKey) -> None:
+        """Delete the record of the key"""
+
+        self._records.pop(key, None)
+
+        if self._path is not None:
+            self._dirty[self._get_key_string(key)] = None
+
+    def _evict(self) -> None:
+        """Remove least recently used records over max size from memory.
+
+        Records saved to SQLite are loaded again on the next access.
+
+        """
+
+        while len(self._records) > self._max_size:
+            self._records.popitem(last=False)
+
+    def _mark_dirty(self, key: StorageKey, record: _StorageRecord) -> None:
+        """Mark the record to be saved to SQLite with the next batch"""
+
+        record.saved_at = record.accessed_at
+        self._dirty[self._get_key_string(key)] = record
+
+        if len(self._dirty) >= self._batch_size and (
+            self._flush_task is None or self._flush_task.done()
+        ):
+            self._flush_task = create_task(self._flush())
+
+    async def _clean_periodically(self) -> None:
+        """Remove expired records and save changes to SQLite"""
+
+        while True:
+            await sleep(self._flush_interval)
+
+            try:
+                self._remove_expired()
+
+                if self._path is not None:
+                    await self._flush()
+            except Exception as error:
+                logger.error(error)
+
+    def _remove_expired(self) -> None:
+        """Remove expired records from memory (the oldest are first)"""
+
+        expired_before = time() - self._ttl
+
+        while self._records:
+            record = next(iter(self._records.values()))
+
+            if record.accessed_at >= expired_before:
+                break
+
+            self._records.popitem(last=False)
+
+    async def _load(self, key: StorageKey) -> Optional[_StorageRecord]:
+        """Return the record from not saved changes or from SQLite"""
+
+        key_string = self._get_key_string(key)
+
+        if key_string in self._dirty:
+            return self._dirty[key_string]
+
+        row = await self._run_in_executor(self._select, key_string)
+
+        if row is None:
+            return None
+
+        state, data, accessed_at = row
+
+        return _StorageRecord(state, loads(data), accessed_at)
+
+    async def _flush(self) -> None:
+        """Save all changes to SQLite in one transaction"""
+
+        if self._flush_lock is None:
+            self._flush_lock = Lock()
+
+        async with self._flush_lock:
+            if not self._dirty:
+                return
+
+            dirty, self._dirty = self._dirty, {}
+
+            rows_to_save = [
+                (key, record.state, dumps(record.data), record.accessed_at)
+                for key, record in dirty.items()
+                if record is not None
+            ]
+            keys_to_delete = [
+                (key,) for key, record in dirty.items() if record is None
+            ]
+
+            await self._run_in_executor(
+                self._write, rows_to_save, keys_to_delete, time() - self._ttl
+            )
+
+    async def _run_in_executor(self, func, *args) -> Any:
+        """Run the function in the only thread that works with SQLite"""
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="fsm_storage"
+            )
+
+        return await get_running_loop().run_in_executor(
+            self._executor, func, *args
+        )
+
+    def _get_connection(self):
+        """Return connection to SQLite (open it on first use)"""
+
+        if self._connection is None:
+            self._connection = connect(self._path, check_same_thread=False)
+            self._connection.execute(_CREATE_TABLE_QUERY)
+
+        return self._connection
+
+    def _select(self, key_string: str) -> Optional[tuple]:
+        """Select the record from SQLite"""
+
+        return (
+            self._get_connection()
+            .execute(_SELECT_QUERY, (key_string,))
+            .fetchone()
+        )
+
+    def _write(
+        self, rows_to_save: list, keys_to_delete: list, expired_before: float
+    ) -> None:
+        """Write changes to SQLite and remove expired records"""
+
+        connection = self._get_connection()
+
+        with connection:
+            connection.executemany(_UPSERT_QUERY, rows_to_save)
+            connection.executemany(_DELETE_QUERY, keys_to_delete)
+            connection.execute(_DELETE_EXPIRED_QUERY, (expired_before,))
+
+    @staticmethod
+    def _get_key_string(key: StorageKey) -> str:
+        """Return the key as a string for SQLite"""
+
+        return ":".join(
+            str(item)
+            for item in (
+                key.bot_id,
+                key.chat_id,
+                key.user_id,
+                key.thread_id,
+                key.business_connection_id,
+                key.destiny,
+            )
+        )
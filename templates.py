@@ -0,0 +1,188 @@
+"""Templates of messages with holidays.
+
+Templates are compiled once (split to text and fields), so rendering only
+joins strings. Holidays are rendered by message formats - templates of a
+holiday and a birthday with a header and a separator. New formats are added
+with «register_message_format».
+
+"""
+
+from functools import lru_cache
+from html import escape
+from string import Formatter
+from typing import (
+    Any,
+    Dict,
+    FrozenSet,
+    Iterable,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+)
+
+from constants.constants import MONTHS_GENITIVE
+
+LIST_FORMAT = "list"
+NOTIFICATION_FORMAT = "notification"
+REMINDER_FORMAT = "reminder"
+
+
+class Template:
+    """Template with «{field}» fields.
+
+    Values of the fields are escaped for HTML, the template's text is not.
+
+    """
+
+    __slots__ = ("text", "fields", "_parts")
+
+    def __init__(self, text: str) -> None:
+        self.text = text
+        # Text before the field and the field (None - end of template)
+        self._parts = []
+
+        for literal, field, format_spec, conversion in Formatter().parse(text):
+            if format_spec or conversion:
+                raise ValueError(
+                    f"Format spec and conversion are not supported: {text!r}"
+                )
+
+            self._parts.append((literal, field))
+
+        self.fields = frozenset(
+            field for _, field in self._parts if field is not None
+        )
+
+    def render(self, values: Mapping[str, Any]) -> str:
+        """Return the template with values of the fields"""
+
+        buffer = []
+
+        for literal, field in self._parts:
+            buffer.append(literal)
+
+            if field is not None:
+                buffer.append(escape(str(values[field]), quote=False))
+
+        return "".join(buffer)
+
+
+class MessageFormat(NamedTuple):
+    """Templates of a message with holidays"""
+
+    holiday: Template
+    birthday: Template
+    empty: str
+    header: Optional[str] = None
+    separator: str = ""
+
+    @property
+    def fields(self) -> FrozenSet[str]:
+        """Return fields used by the templates"""
+
+        return self.holiday.fields | self.birthday.fields
+
+
+_MESSAGE_FORMATS: Dict[str, MessageFormat] = {}
+
+
+def register_message_format(name: str, message_format: MessageFormat) -> None:
+    """Add (or replace) the message format"""
+
+    _MESSAGE_FORMATS[name] = message_format
+
+
+def get_message_format(name: str) -> MessageFormat:
+    """Return the message format by name"""
+
+    return _MESSAGE_FORMATS[name]
+
+
+def render_holidays(
+    holidays_values: Iterable[Mapping[str, Any]], format_name: str
+) -> str:
+    """Return message with the holidays in the format.
+
+    Every holiday is a mapping with values of the templates' fields and
+    «is_birthday».
+
+    """
+
+    message_format = _MESSAGE_FORMATS[format_name]
+    items: List[str] = [
+        (
+            message_format.birthday
+            if values["is_birthday"]
+            else message_format.holiday
+        ).render(values)
+        for values in holidays_values
+    ]
+
+    if not items:
+        return message_format.empty
+
+    if message_format.header is not None:
+        items.insert(0, message_format.header)
+
+    return message_format.separator.join(items)
+
+
+@lru_cache(maxsize=None)
+def get_date_text(month: int, day: int) -> str:
+    """Return date as «01 января» (month in genitive case)"""
+
+    return f"{day:02d} {MONTHS_GENITIVE[month - 1]}"
+
+
+register_message_format(
+    LIST_FORMAT,
+    MessageFormat(
+        holiday=Template(
+            "<b>{title} - {date}</b>\n"
+            "⏳ <u>Осталось дней:</u> {days_left}\n"
+            "🎉 <u>Кого поздравляем:</u> {whom_to_congratulate}\n\n"
+        ),
+        birthday=Template(
+            "<b>{title} - {date}</b>\n"
+            "⏳ <u>Осталось дней:</u> {days_left}\n"
+            "🗓️ <u>Сколько исполнится:</u> {age} {age_suffix}\n\n"
+        ),
+        empty="Праздников в этот период нет",
+    ),
+)
+register_message_format(
+    NOTIFICATION_FORMAT,
+    MessageFormat(
+        holiday=Template(
+            "Сегодня праздник - <b>{title}</b>\n"
+            "Не забудь поздравить причастных 🎉: {whom_to_congratulate}"
+        ),
+        birthday=Template(
+            "Сегодня <b>{title}</b>.\n"
+            "Исполнилось <b>{age} {age_suffix}</b>\n"
+            "Не забудь поздравить! 🎉"
+        ),
+        empty="Сегодня праздников нет",
+        header="Привет! 👋",
+        separator="\n\n",
+    ),
+)
+register_message_format(
+    REMINDER_FORMAT,
+    MessageFormat(
+        holiday=Template(
+            "<b>{title} - {date}</b>\n"
+            "⏳ <u>Осталось дней:</u> {days_left}\n"
+            "🎉 <u>Кого поздравляем:</u> {whom_to_congratulate}"
+        ),
+        birthday=Template(
+            "<b>{title} - {date}</b>\n"
+            "⏳ <u>Осталось дней:</u> {days_left}\n"
+            "🗓️ <u>Сколько исполнится:</u> {age} {age_suffix}"
+        ),
+        empty="Скоро праздников нет",
+        header="Напоминание 🔔 Скоро праздник, не забудь про подарок 🎁",
+        separator="\n\n",
+    ),
+)
@@ -0,0 +1,109 @@
+"""Tests for iCalendar feed of the holidays"""
+
+from aiohttp import ClientSession, web
+from pytest import mark
+
+from calendar_feed import CalendarFeed, create_calendar_app, is_etag_matched
+from holidays_index import HolidayIndex
+from ics_format import iter_events, iter_unfolded_lines
+from tests.mocks import HOLIDAYS_ROWS
+
+
+async def _start_server(app: web.Application) -> tuple:
+    """Start the application on a free port and return runner and URL"""
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+
+    host, port = runner.addresses[0][:2]
+
+    return runner, f"http://{host}:{port}"
+
+
+def _get_feed(version: int = 1) -> CalendarFeed:
+    """Return feed of an index with test holidays"""
+
+    index = HolidayIndex()
+    index.build(HOLIDAYS_ROWS, version=version)
+
+    return CalendarFeed(index, "Праздники")
+
+
+@mark.asyncio
+async def test_calendar_feed_has_yearly_events() -> None:
+    """Test the feed has an event with a yearly rule for every holiday"""
+
+    body, etag = await _get_feed().get()
+    lines = body.decode().splitlines(keepends=True)
+    events = [event for _, event in iter_events(lines)]
+
+    assert body.startswith(b"BEGIN:VCALENDAR\r\n")
+    assert (
+        "X-WR-CALNAME:Праздники" in dict(iter_unfolded_lines(lines)).values()
+    )
+    assert len(events) == len(HOLIDAYS_ROWS)
+    assert all(event["RRULE"][1].startswith("FREQ=YEARLY") for event in events)
+    assert etag.startswith('"') and etag.endswith('"')
+
+
+@mark.asyncio
+async def test_calendar_feed_is_rendered_once_per_version() -> None:
+    """Test the feed is rendered again only for a new holidays' version"""
+
+    feed = _get_feed()
+
+    first = await feed.get()
+    assert await feed.get() == first
+    assert feed.renders == 1
+
+    # The same holidays give the same ETag
+    assert (await _get_feed(version=2).get())[1] == first[1]
+
+    feed.index.build(HOLIDAYS_ROWS[:2], version=2)
+    second = await feed.get()
+
+    assert feed.renders == 2
+    assert second[1] != first[1]
+
+
+def test_is_etag_matched() -> None:
+    """Test If-None-Match header is compared with the ETag"""
+
+    assert is_etag_matched('"abc"', '"abc"')
+    assert is_etag_matched('"x", W/"abc"', '"abc"')
+    assert is_etag_matched("*", '"abc"')
+    assert not is_etag_matched('"abcd"', '"abc"')
+    assert not is_etag_matched(None, '"abc"')
+
+
+@mark.asyncio
+async def test_calendar_app_returns_not_modified() -> None:
+    """Test the server returns the feed with ETag and 304 for the ETag"""
+
+    runner, url = await _start_server(
+        create_calendar_app(_get_feed(), "/feed.ics")
+    )
+
+    try:
+        async with ClientSession() as session:
+            async with session.get(f"{url}/feed.ics") as response:
+                assert response.status == 200
+                assert response.content_type == "text/calendar"
+                body = await response.read()
+                etag = response.headers["ETag"]
+
+            assert b"BEGIN:VEVENT" in body
+
+            async with session.get(
+                f"{url}/feed.ics", headers={"If-None-Match": etag}
+            ) as response:
+                assert response.status == 304
+                assert response.headers["ETag"] == etag
+                assert await response.read() == b""
+
+            async with session.get(f"{url}/other.ics") as response:
+                assert response.status == 404
+    finally:
+        await runner.cleanup()
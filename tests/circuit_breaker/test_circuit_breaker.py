@@ -0,0 +1,106 @@
+"""Tests for CircuitBreaker class"""
+
+from mysql.connector import Error
+from pytest import raises
+
+from circuit_breaker import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    CircuitOpenError,
+)
+
+
+class FakeClock:
+    """Clock that is moved by tests"""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_circuit_breaker_opens_after_failures_in_a_row() -> None:
+    """Test the breaker opens only after the threshold of failures in a
+    row and rejects calls while it is open"""
+
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=10)
+
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+
+    assert breaker.state == CLOSED
+    breaker.before_call()
+
+    breaker.record_failure()
+
+    assert breaker.state == OPEN
+
+    with raises(CircuitOpenError):
+        breaker.before_call()
+
+    assert breaker.rejections == 1
+    # Handlers catch it as a MySQL error
+    assert issubclass(CircuitOpenError, Error)
+
+
+def test_circuit_breaker_probes_when_half_open() -> None:
+    """Test only one probe is let through after the reset timeout, its
+    failure opens the breaker again and its success closes it"""
+
+    clock = FakeClock()
+    breaker = CircuitBreaker(
+        failure_threshold=1, reset_timeout=10, clock=clock
+    )
+
+    breaker.record_failure()
+    clock.now = 10
+
+    assert breaker.state == HALF_OPEN
+
+    breaker.before_call()
+
+    with raises(CircuitOpenError):
+        breaker.before_call()
+
+    breaker.record_failure()
+    clock.now = 15
+
+    assert breaker.state == OPEN
+
+    with raises(CircuitOpenError):
+        breaker.before_call()
+
+    clock.now = 20
+    breaker.before_call()
+    breaker.record_success()
+
+    assert breaker.state == CLOSED
+    breaker.before_call()
+
+
+def test_circuit_breaker_replaces_lost_probe() -> None:
+    """Test a probe without result (e.g. cancelled) doesn't keep the
+    breaker open forever"""
+
+    clock = FakeClock()
+    breaker = CircuitBreaker(
+        failure_threshold=1, reset_timeout=10, clock=clock
+    )
+
+    breaker.record_failure()
+    clock.now = 10
+    breaker.before_call()
+
+    clock.now = 15
+
+    with raises(CircuitOpenError):
+        breaker.before_call()
+
+    clock.now = 20
+    breaker.before_call()
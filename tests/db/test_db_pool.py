@@ -0,0 +1,332 @@
+"""Tests for DBPool class"""
+
+from time import perf_counter
+
+from mysql.connector.errors import (
+    InterfaceError,
+    OperationalError,
+    ProgrammingError,
+)
+from pytest import mark, raises
+
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from constants.queries import (
+    CLAIM_DELIVERIES_QUERY,
+    IS_EXISTS_DAILY_NOTIFICATIONS_QUERY,
+)
+from db import DBPool
+
+
+class FakeCursor:
+    """Cursor that remembers executed queries"""
+
+    def __init__(self, prepared: bool) -> None:
+        self.prepared = prepared
+        self.executed = []
+        self.is_closed = False
+        self.rowcount = 1
+
+    def execute(self, query: str, params=None) -> None:
+        self.executed.append((query, params))
+
+    def executemany(self, query: str, params_seq) -> None:
+        self.executed.append((query, list(params_seq)))
+        self.rowcount = len(params_seq)
+
+    def fetchone(self) -> tuple:
+        return (1,)
+
+    def fetchall(self) -> list:
+        return []
+
+    def close(self) -> None:
+        self.is_closed = True
+
+
+class FakeConnection:
+    """Connection that remembers created cursors"""
+
+    def __init__(self) -> None:
+        self.cursors = []
+        self.transactions = []
+
+    def start_transaction(self) -> None:
+        self.transactions.append("started")
+
+    def commit(self) -> None:
+        self.transactions[-1] = "committed"
+
+    def rollback(self) -> None:
+        self.transactions[-1] = "rolled back"
+
+    def is_connected(self) -> bool:
+        return True
+
+    def cursor(self, prepared: bool = False) -> FakeCursor:
+        cursor = FakeCursor(prepared)
+        self.cursors.append(cursor)
+        return cursor
+
+    def close(self) -> None:
+        pass
+
+
+class LostConnection(FakeConnection):
+    """Connection closed by the server before the first query"""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.is_lost = True
+        self.reconnects = 0
+
+    def is_connected(self) -> bool:
+        return not self.is_lost
+
+    def cursor(self, prepared: bool = False) -> FakeCursor:
+        if self.is_lost:
+            raise OperationalError(msg="MySQL Connection not available")
+
+        return super().cursor(prepared)
+
+    def reconnect(self, attempts: int, delay: float) -> None:
+        self.is_lost = False
+        self.reconnects += 1
+
+    def rollback(self) -> None:
+        if self.is_lost:
+            raise OperationalError(msg="MySQL Connection not available")
+
+        super().rollback()
+
+
+@mark.asyncio
+async def test_db_pool_prepares_query_once_per_connection() -> None:
+    """Test queries from the registry are prepared once and re-executed"""
+
+    connection = FakeConnection()
+    pool = DBPool({}, size=1)
+    pool._connect = lambda: connection
+
+    for chat_id in ("1", "2", "3"):
+        await pool.fetch_one(IS_EXISTS_DAILY_NOTIFICATIONS_QUERY, (chat_id,))
+
+    pool.close()
+
+    assert len(connection.cursors) == 1
+    assert connection.cursors[0].prepared
+    assert [params for _, params in connection.cursors[0].executed] == [
+        ("1",),
+        ("2",),
+        ("3",),
+    ]
+    assert pool.get_stats() == {
+        "executions": {"IS_EXISTS_DAILY_NOTIFICATIONS_QUERY": 3},
+        "prepared_statements": 0,
+    }
+
+
+@mark.asyncio
+async def test_db_pool_does_not_prepare_unknown_queries() -> None:
+    """Test queries not from the registry use ordinary closed cursors"""
+
+    connection = FakeConnection()
+    pool = DBPool({}, size=1)
+    pool._connect = lambda: connection
+
+    await pool.execute("SELECT 1")
+    await pool.execute("SELECT 1")
+
+    assert pool.get_stats() == {
+        "executions": {"other": 2},
+        "prepared_statements": 0,
+    }
+    assert len(connection.cursors) == 2
+    assert all(
+        not cursor.prepared and cursor.is_closed
+        for cursor in connection.cursors
+    )
+
+    pool.close()
+
+
+@mark.asyncio
+async def test_db_pool_executes_batches_by_ordinary_cursor() -> None:
+    """Test batches are executed by one executemany of ordinary cursor"""
+
+    connection = FakeConnection()
+    pool = DBPool({}, size=1)
+    pool._connect = lambda: connection
+    rows = [("1", "2024-05-01", 1, 7), ("2", "2024-05-01", 1, 7)]
+
+    assert await pool.execute_many(CLAIM_DELIVERIES_QUERY, rows) == 2
+    assert await pool.execute_many(CLAIM_DELIVERIES_QUERY, []) == 0
+
+    assert len(connection.cursors) == 1
+    assert not connection.cursors[0].prepared
+    assert connection.cursors[0].is_closed
+    assert connection.cursors[0].executed == [(CLAIM_DELIVERIES_QUERY, rows)]
+
+    pool.close()
+
+
+@mark.asyncio
+async def test_db_pool_transaction_commits_or_rolls_back() -> None:
+    """Test transaction is committed after the block and rolled back if
+    the block fails"""
+
+    connection = FakeConnection()
+    pool = DBPool({}, size=1)
+    pool._connect = lambda: connection
+    rows = [("1", "2024-05-01", 1, 7)]
+
+    async with pool.transaction() as transaction:
+        await transaction.execute_many(CLAIM_DELIVERIES_QUERY, rows)
+
+    with raises(RuntimeError):
+        async with pool.transaction() as transaction:
+            await transaction.execute("SELECT 1")
+            raise RuntimeError
+
+    # The connection is back in the pool
+    await pool.execute("SELECT 1")
+
+    assert connection.transactions == ["committed", "rolled back"]
+    assert [cursor.executed[0][0] for cursor in connection.cursors] == [
+        CLAIM_DELIVERIES_QUERY,
+        "SELECT 1",
+        "SELECT 1",
+    ]
+
+    pool.close()
+
+
+@mark.asyncio
+async def test_db_pool_fails_fast_while_circuit_is_open() -> None:
+    """Test queries aren't sent to DB after failures in a row, and DB's
+    answers (like wrong queries) don't open the circuit"""
+
+    attempts = []
+
+    def connect() -> FakeConnection:
+        attempts.append(1)
+        raise InterfaceError(msg="Can't connect to MySQL server")
+
+    pool = DBPool({}, size=1, breaker=CircuitBreaker(2, reset_timeout=60))
+    pool._connect = connect
+
+    for _ in range(2):
+        with raises(InterfaceError):
+            await pool.fetch_all("SELECT 1")
+
+    started_at = perf_counter()
+
+    with raises(CircuitOpenError):
+        await pool.fetch_all("SELECT 1")
+
+    assert perf_counter() - started_at < 0.1
+    assert len(attempts) == 2
+
+    connection = FakeConnection()
+    connection.cursor = lambda prepared=False: raise_programming_error()
+    pool.breaker = CircuitBreaker(1, reset_timeout=60)
+    pool._connect = lambda: connection
+
+    with raises(ProgrammingError):
+        await pool.fetch_all("SELECT wrong")
+
+    assert pool.breaker.state == "closed"
+
+    pool.close()
+
+
+def raise_programming_error() -> None:
+    """Fail like a wrong query"""
+
+    raise ProgrammingError(msg="Wrong query")
+
+
+@mark.asyncio
+async def test_db_pool_fails_if_no_free_connection() -> None:
+    """Test a query fails after the timeout while all connections are
+    taken"""
+
+    pool = DBPool({}, size=1, query_timeout=0.05)
+    pool._connect = FakeConnection
+
+    async with pool.transaction():
+        started_at = perf_counter()
+
+        with raises(OperationalError):
+            await pool.fetch_all("SELECT 1")
+
+        assert perf_counter() - started_at < 1
+
+    # The connection is free again
+    assert await pool.fetch_all("SELECT 1") == []
+
+    pool.close()
+
+
+@mark.asyncio
+async def test_db_pool_reconnects_lost_connection() -> None:
+    """Test the query is executed again after reconnect, with the query
+    prepared again for the new session"""
+
+    connection = LostConnection()
+    pool = DBPool({}, size=1)
+    pool._connect = lambda: connection
+
+    assert await pool.fetch_one(
+        IS_EXISTS_DAILY_NOTIFICATIONS_QUERY, ("1",)
+    ) == (1,)
+
+    assert connection.reconnects == 1
+    assert len(connection.cursors) == 1
+    assert connection.cursors[0].executed == [
+        (IS_EXISTS_DAILY_NOTIFICATIONS_QUERY, ("1",))
+    ]
+
+    pool.close()
+
+
+@mark.asyncio
+async def test_db_pool_returns_connection_after_error() -> None:
+    """Test the connection of a failed query is given back to the pool"""
+
+    connection = FakeConnection()
+    pool = DBPool({}, size=1, query_timeout=1)
+    pool._connect = lambda: connection
+    cursor = connection.cursor
+
+    connection.cursor = lambda prepared=False: raise_programming_error()
+
+    with raises(ProgrammingError):
+        await pool.fetch_all("SELECT wrong")
+
+    connection.cursor = cursor
+
+    assert await pool.fetch_all("SELECT 1") == []
+    assert len(pool._free_connections) == 1
+
+    pool.close()
+
+
+@mark.asyncio
+async def test_db_pool_keeps_error_if_rollback_fails() -> None:
+    """Test the block's error isn't hidden by a failed rollback, and the
+    connection is given back to the pool"""
+
+    connection = LostConnection()
+    connection.is_lost = False
+    pool = DBPool({}, size=1, query_timeout=1)
+    pool._connect = lambda: connection
+
+    with raises(RuntimeError):
+        async with pool.transaction():
+            connection.is_lost = True
+            raise RuntimeError
+
+    assert connection.transactions == ["started"]
+    assert len(pool._free_connections) == 1
+
+    pool.close()
@@ -0,0 +1,181 @@
+"""Tests for DeliveryLog class"""
+
+from datetime import date
+
+from pytest import mark
+
+from constants.queries import (
+    CHANGE_DELIVERY_STATUS_QUERY,
+    CLAIM_DELIVERIES_QUERY,
+    FINISH_DELIVERIES_QUERY,
+    GET_CLAIMED_DELIVERIES_QUERY,
+    GET_UNFINISHED_DELIVERIES_QUERY,
+    GET_WATERMARK_QUERY,
+    RECLAIM_DELIVERIES_QUERY,
+    SAVE_WATERMARK_QUERY,
+)
+from custom_types import DeliveryReport
+from delivery_log import DeliveryLog
+
+TODAY = date(2024, 5, 1)
+
+
+class FakePool:
+    """Pool with deliveries and watermarks tables in memory (pending
+    deliveries are older than the send timeout)"""
+
+    def __init__(self) -> None:
+        # (chat_id, date) -> [status, batch_id]
+        self.deliveries = {}
+        self.watermarks = {}
+        self.batches_sizes = []
+
+    async def execute_many(self, query: str, params_seq) -> int:
+        self.batches_sizes.append(len(params_seq))
+
+        for params in params_seq:
+            if query == CLAIM_DELIVERIES_QUERY:
+                chat_id, delivery_date, _, batch_id = params
+                self.deliveries.setdefault(
+                    (chat_id, delivery_date), ["pending", batch_id]
+                )
+            elif query == CHANGE_DELIVERY_STATUS_QUERY:
+                status, chat_id, delivery_date = params
+                self.deliveries[(chat_id, delivery_date)][0] = status
+            elif query == RECLAIM_DELIVERIES_QUERY:
+                batch_id, chat_id, delivery_date, _ = params
+                delivery = self.deliveries.get((chat_id, delivery_date))
+
+                if delivery is not None and delivery[0] != "sent":
+                    delivery[:] = ["pending", batch_id]
+
+        return len(params_seq)
+
+    async def execute(self, query: str, params=None) -> int:
+        if query == FINISH_DELIVERIES_QUERY:
+            status, batch_id = params
+
+            for delivery in self.deliveries.values():
+                if delivery == ["pending", batch_id]:
+                    delivery[0] = status
+        elif query == SAVE_WATERMARK_QUERY:
+            self.watermarks[params[0]] = params[1]
+
+        return 0
+
+    async def fetch_all(self, query: str, params=None) -> list:
+        if query == GET_UNFINISHED_DELIVERIES_QUERY:
+            return [
+                (int(chat_id), delivery_date, status)
+                for (chat_id, delivery_date), (status, _) in (
+                    self.deliveries.items()
+                )
+                if delivery_date >= params[0] and status != "sent"
+            ]
+
+        assert query == GET_CLAIMED_DELIVERIES_QUERY
+
+        return [
+            (chat_id,)
+            for (chat_id, _), (_, batch_id) in self.deliveries.items()
+            if batch_id == params[0]
+        ]
+
+    async def fetch_one(self, query: str, params=None):
+        assert query == GET_WATERMARK_QUERY
+
+        if params[0] in self.watermarks:
+            return (self.watermarks[params[0]],)
+
+        return None
+
+
+@mark.asyncio
+async def test_delivery_log_claims_chats_once_per_date() -> None:
+    """Test chats are claimed once per date in batches"""
+
+    pool = FakePool()
+    log = DeliveryLog(pool, batch_size=2)
+
+    batch = await log.claim(["1", "2", "3"], TODAY, 100)
+    assert batch.chat_ids == ["1", "2", "3"]
+    assert pool.batches_sizes == [2, 1]
+
+    # Moved to a later time or caught up after restart
+    batch = await log.claim(["3", "4"], TODAY, 200)
+    assert batch.chat_ids == ["4"]
+
+    batch = await log.claim(["3"], date(2024, 5, 2), 1_540)
+    assert batch.chat_ids == ["3"]
+
+
+@mark.asyncio
+async def test_delivery_log_finish_saves_statuses() -> None:
+    """Test failed chats and the rest of the batch get their statuses"""
+
+    pool = FakePool()
+    log = DeliveryLog(pool, batch_size=10)
+
+    batch = await log.claim(["1", "2", "3"], TODAY, 100)
+    await log.finish(
+        batch,
+        DeliveryReport(
+            delivered=2, skipped=0, failed=1, failed_chat_ids=("2",)
+        ),
+    )
+
+    batch = await log.claim(["4"], TODAY, 100)
+    await log.finish(batch, DeliveryReport(delivered=0, skipped=1, failed=0))
+
+    assert {
+        chat_id: status
+        for (chat_id, _), (status, _) in pool.deliveries.items()
+    } == {"1": "sent", "2": "failed", "3": "sent", "4": "skipped"}
+
+
+@mark.asyncio
+async def test_delivery_log_watermark() -> None:
+    """Test watermarks are saved for every shard"""
+
+    log = DeliveryLog(FakePool(), batch_size=10)
+
+    assert await log.get_watermark("0/2") is None
+
+    await log.save_watermark("0/2", 100)
+    await log.save_watermark("0/2", 101)
+    await log.save_watermark("1/2", 90)
+
+    assert await log.get_watermark("0/2") == 101
+    assert await log.get_watermark("1/2") == 90
+
+
+@mark.asyncio
+async def test_delivery_log_reclaims_unfinished_deliveries() -> None:
+    """Test failed and pending deliveries are claimed again, and sent ones
+    are kept"""
+
+    pool = FakePool()
+    log = DeliveryLog(pool, batch_size=10, send_timeout=60)
+
+    batch = await log.claim(["1", "2", "3"], TODAY, 100)
+    await log.finish(
+        batch,
+        DeliveryReport(
+            delivered=2, skipped=0, failed=1, failed_chat_ids=("2",)
+        ),
+    )
+    await log.claim(["4"], TODAY, 100)
+
+    assert sorted(await log.get_unfinished(TODAY)) == [
+        ("2", TODAY, "failed"),
+        ("4", TODAY, "pending"),
+    ]
+    assert await log.get_unfinished(date(2024, 5, 2)) == []
+
+    batch = await log.reclaim(["1", "2", "4"], TODAY)
+
+    assert batch.chat_ids == ["2", "4"]
+
+    await log.finish(batch, DeliveryReport(delivered=2, skipped=0, failed=0))
+
+    assert await log.get_unfinished(TODAY) == []
@@ -0,0 +1,159 @@
+"""Tests for HolidayIndex class"""
+
+from datetime import date
+
+from pytest import mark, raises
+
+import holidays_index
+from circuit_breaker import CircuitOpenError
+from custom_types import HolidayRecord
+from holidays_index import HolidayIndex
+from tests.mocks import HOLIDAYS_ROWS
+
+
+@mark.asyncio
+async def test_holiday_index_keeps_db_order() -> None:
+    """Test HolidayIndex returns holidays in the same order as DB"""
+
+    index = HolidayIndex()
+    index.build(HOLIDAYS_ROWS, version=1)
+
+    assert [item.as_tuple() for item in await index.get_all()] == list(
+        HOLIDAYS_ROWS
+    )
+
+
+@mark.asyncio
+async def test_holiday_index_buckets() -> None:
+    """Test HolidayIndex returns holidays by month and by day"""
+
+    index = HolidayIndex()
+    index.build(HOLIDAYS_ROWS, version=1)
+
+    assert await index.get_month(3) == [
+        HolidayRecord(*row) for row in HOLIDAYS_ROWS[1:4]
+    ]
+    assert await index.get_day(3, 8) == [
+        HolidayRecord(*row) for row in HOLIDAYS_ROWS[2:4]
+    ]
+    assert await index.get_month(7) == []
+    assert await index.get_day(1, 2) == []
+
+
+def test_holiday_record_unpacks_as_tuple() -> None:
+    """Test HolidayRecord can be unpacked as TypeHoliday"""
+
+    holiday_date, title, is_birthday, whom_to_congratulate = HolidayRecord(
+        *HOLIDAYS_ROWS[0]
+    )
+
+    assert holiday_date == date(1990, 1, 15)
+    assert (title, is_birthday, whom_to_congratulate) == (
+        "День рождения Маши",
+        1,
+        None,
+    )
+
+
+@mark.asyncio
+async def test_holiday_index_get_page() -> None:
+    """Test HolidayIndex returns pages after and before the keys"""
+
+    index = HolidayIndex()
+    index.build(
+        [(*row, number + 1) for number, row in enumerate(HOLIDAYS_ROWS)],
+        version=1,
+    )
+
+    first_page = await index.get_page(2)
+
+    assert first_page.keys == [(1, 15, 1), (3, 1, 2)]
+    assert not first_page.has_previous and first_page.has_next
+
+    second_page = await index.get_page(2, after=first_page.keys[-1])
+
+    assert second_page.keys == [(3, 8, 3), (3, 8, 4)]
+    assert second_page.has_previous and second_page.has_next
+
+    last_page = await index.get_page(2, after=second_page.keys[-1])
+
+    assert last_page.holidays == [HolidayRecord(*HOLIDAYS_ROWS[4])]
+    assert last_page.has_previous and not last_page.has_next
+
+    assert (await index.get_page(2, before=last_page.keys[0])) == second_page
+
+
+@mark.asyncio
+async def test_holiday_index_get_upcoming_wraps_to_next_year() -> None:
+    """Test HolidayIndex returns the next holidays from today in a ring"""
+
+    index = HolidayIndex()
+    index.build(HOLIDAYS_ROWS, version=1)
+
+    upcoming = await index.get_upcoming(date(2025, 3, 8), 4)
+
+    assert [holiday.title for holiday in upcoming] == [
+        "8 марта",
+        "День рождения Пети",
+        "Новый год",
+        "День рождения Маши",
+    ]
+    assert len(await index.get_upcoming(date(2025, 1, 1), 100)) == len(
+        HOLIDAYS_ROWS
+    )
+
+
+@mark.asyncio
+async def test_holiday_index_get_upcoming_february_29() -> None:
+    """Test February 29 is upcoming on February 28 of non-leap year"""
+
+    index = HolidayIndex()
+    index.build(
+        [
+            (date(2000, 2, 29), "Високосный праздник", 0, "Всех"),
+            (date(2000, 3, 1), "Первое марта", 0, "Всех"),
+        ]
+    )
+
+    upcoming = await index.get_upcoming(date(2025, 2, 28), 1)
+
+    assert [holiday.title for holiday in upcoming] == ["Високосный праздник"]
+
+    upcoming = await index.get_upcoming(date(2025, 3, 1), 1)
+
+    assert [holiday.title for holiday in upcoming] == ["Первое марта"]
+
+
+class FailingPool:
+    """Pool of unavailable DB"""
+
+    async def fetch_one(self, query: str, params=None) -> tuple:
+        raise CircuitOpenError(msg="DB is unavailable")
+
+
+class WorkingPool:
+    """Pool of DB with the same holidays"""
+
+    async def fetch_one(self, query: str, params=None) -> tuple:
+        return ("holidays", 1)
+
+
+@mark.asyncio
+async def test_holiday_index_serves_stale_holidays(monkeypatch) -> None:
+    """Test the index keeps the loaded holidays if DB is unavailable and is
+    marked as stale until the next successful check"""
+
+    index = HolidayIndex()
+    index.build(HOLIDAYS_ROWS, version=1)
+    monkeypatch.setattr(holidays_index, "DB_POOL", FailingPool())
+
+    with raises(CircuitOpenError):
+        await index.refresh()
+
+    assert index.is_stale
+    assert len(await index.get_all()) == len(HOLIDAYS_ROWS)
+
+    monkeypatch.setattr(holidays_index, "DB_POOL", WorkingPool())
+
+    assert not await index.refresh()
+    assert not index.is_stale
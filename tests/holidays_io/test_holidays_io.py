@@ -0,0 +1,172 @@
+"""Tests for import and export of holidays"""
+
+from contextlib import asynccontextmanager
+from datetime import date
+from io import StringIO
+
+from pytest import mark, raises
+
+from constants.queries import GET_HOLIDAYS_PAGE_QUERY, UPSERT_HOLIDAYS_QUERY
+from holidays_io import (
+    CSV_FORMAT,
+    ICS_FORMAT,
+    RowError,
+    export_holidays,
+    get_file_format,
+    import_holidays,
+    iter_csv_holidays,
+    iter_ics_holidays,
+)
+from ics_format import fold_line, iter_unfolded_lines
+from tests.mocks import HOLIDAYS_ROWS
+
+
+class FakeTransaction:
+    """Transaction that remembers batches"""
+
+    def __init__(self, pool: "FakePool") -> None:
+        self.pool = pool
+
+    async def execute_many(self, query: str, params_seq) -> int:
+        assert query == UPSERT_HOLIDAYS_QUERY
+
+        if params_seq:
+            self.pool.batches.append(list(params_seq))
+
+        return len(params_seq)
+
+
+class FakePool:
+    """Pool with holidays table"""
+
+    def __init__(self, rows=()) -> None:
+        self.rows = [(*row, number) for number, row in enumerate(rows, 1)]
+        self.batches = []
+        self.is_committed = False
+
+    @asynccontextmanager
+    async def transaction(self):
+        yield FakeTransaction(self)
+        self.is_committed = True
+
+    async def fetch_all(self, query: str, params=None) -> list:
+        assert query == GET_HOLIDAYS_PAGE_QUERY
+
+        last_id, page_size = params
+
+        return [row for row in self.rows if row[4] > last_id][:page_size]
+
+
+def test_iter_csv_holidays_reports_wrong_rows() -> None:
+    """Test CSV rows are parsed and wrong rows are reported by lines"""
+
+    lines = StringIO(
+        "date,title,is_birthday,whom_to_congratulate\n"
+        "1990-01-15,День рождения Маши,1,\n"
+        "2000-13-01,Плохая дата,0,Всех\n"
+        "1970-03-08,8 марта,0,Маму и бабушку\n"
+        "1970-03-09,,0,\n"
+        "1970-03-10,Праздник,yes,\n"
+    )
+
+    items = list(iter_csv_holidays(lines))
+
+    assert items[0] == (date(1990, 1, 15), "День рождения Маши", 1, None)
+    assert items[2] == (date(1970, 3, 8), "8 марта", 0, "Маму и бабушку")
+    assert [item.line for item in items if isinstance(item, RowError)] == [
+        3,
+        5,
+        6,
+    ]
+
+
+def test_iter_csv_holidays_without_columns() -> None:
+    """Test CSV without required columns is one error"""
+
+    assert list(iter_csv_holidays(StringIO("when,what\n"))) == [
+        RowError(1, "No columns: date, title")
+    ]
+
+
+def test_iter_ics_holidays() -> None:
+    """Test events are parsed with folded lines and escaped text"""
+
+    lines = StringIO(
+        "BEGIN:VCALENDAR\r\n"
+        "BEGIN:VEVENT\r\n"
+        "DTSTART;VALUE=DATE:19900115\r\n"
+        "SUMMARY:День рождения\r\n"
+        "  Маши\r\n"
+        "CATEGORIES:FAMILY,BIRTHDAY\r\n"
+        "END:VEVENT\r\n"
+        "BEGIN:VEVENT\r\n"
+        "DTSTART:19700308T090000Z\r\n"
+        "SUMMARY:8 марта\r\n"
+        "DESCRIPTION:Маму\\, бабушку\r\n"
+        "END:VEVENT\r\n"
+        "BEGIN:VEVENT\r\n"
+        "SUMMARY:Без даты\r\n"
+        "END:VEVENT\r\n"
+        "END:VCALENDAR\r\n"
+    )
+
+    assert list(iter_ics_holidays(lines)) == [
+        (date(1990, 1, 15), "День рождения Маши", 1, None),
+        (date(1970, 3, 8), "8 марта", 0, "Маму, бабушку"),
+        RowError(13, "No DTSTART"),
+    ]
+
+
+@mark.asyncio
+async def test_import_holidays_in_batches() -> None:
+    """Test holidays are upserted in batches in one transaction"""
+
+    lines = ["date,title\n"] + [
+        f"2000-01-{day:02d},Праздник {day}\n" for day in range(1, 6)
+    ]
+    pool = FakePool()
+
+    report = await import_holidays(pool, lines, CSV_FORMAT, batch_size=2)
+
+    assert report.imported == 5
+    assert report.errors_count == 0
+    assert [len(batch) for batch in pool.batches] == [2, 2, 1]
+    assert pool.is_committed
+
+
+@mark.asyncio
+@mark.parametrize("file_format", (CSV_FORMAT, ICS_FORMAT))
+async def test_export_and_import_holidays(file_format: str) -> None:
+    """Test exported holidays are imported back the same"""
+
+    file = StringIO(newline="")
+    exported = await export_holidays(
+        FakePool(HOLIDAYS_ROWS), file, file_format, page_size=2
+    )
+
+    pool = FakePool()
+    file.seek(0)
+    report = await import_holidays(pool, file, file_format)
+
+    assert exported == report.imported == len(HOLIDAYS_ROWS)
+    assert pool.batches == [[tuple(row) for row in HOLIDAYS_ROWS]]
+
+
+def test_fold_line() -> None:
+    """Test long lines are folded by 75 octets and unfolded back"""
+
+    line = "SUMMARY:" + "Праздник " * 20
+    folded = fold_line(line)
+
+    assert all(len(part.encode()) <= 75 for part in folded.split("\r\n")[:-1])
+    assert list(iter_unfolded_lines(StringIO(folded))) == [(1, line)]
+
+
+def test_get_file_format() -> None:
+    """Test format is chosen by the file's extension"""
+
+    assert get_file_format("holidays.CSV") == CSV_FORMAT
+    assert get_file_format("family.ics") == ICS_FORMAT
+
+    with raises(ValueError):
+        get_file_format("holidays.xlsx")
@@ -0,0 +1,83 @@
+"""Tests for load_daily_jobs function"""
+
+from datetime import datetime, timedelta, timezone
+
+from pytest import mark
+
+import jobs
+import services
+from constants.queries import GET_DAILY_NOTIFICATIONS_PAGE_QUERY
+from reminders import ReminderPlanner
+from timing_wheel import TimingWheel
+
+
+class FakePagesPool:
+    """Pool with daily notifications that are fetched by keyset pages"""
+
+    def __init__(self, rows: list) -> None:
+        self.rows = rows
+        self.fetched = []
+
+    async def fetch_all(self, query: str, params=None) -> list:
+        assert query == GET_DAILY_NOTIFICATIONS_PAGE_QUERY
+
+        self.fetched.append(params)
+        last_chat_id, page_size = params
+
+        return [row for row in self.rows if row[0] > last_chat_id][:page_size]
+
+
+@mark.asyncio
+async def test_load_daily_jobs_loads_all_pages(monkeypatch) -> None:
+    """Test every page starts after the last chat of the previous one and
+    loading stops after a short page"""
+
+    pool = FakePagesPool(
+        [
+            (str(chat_id), timedelta(hours=9, minutes=30), "7,1", None)
+            for chat_id in range(1, 6)
+        ]
+    )
+    wheel = TimingWheel()
+    planner = ReminderPlanner()
+    monkeypatch.setattr(services, "DB_POOL", pool)
+    monkeypatch.setattr(jobs, "DAILY_NOTIFICATIONS_PAGE_SIZE", 2)
+    monkeypatch.setattr(jobs, "NOTIFICATION_WHEEL", wheel)
+    monkeypatch.setattr(jobs, "REMINDER_PLANNER", planner)
+
+    loaded_count = await jobs.load_daily_jobs(
+        since=datetime(2024, 5, 1, tzinfo=timezone.utc)
+    )
+
+    assert loaded_count == 5
+    assert pool.fetched == [("", 2), ("2", 2), ("4", 2)]
+    assert len(wheel) == 5
+    assert wheel.get("5") == ((9, 30), services.DEFAULT_TIME_ZONE)
+    assert planner.get_days("5") == (7, 1)
+
+
+@mark.asyncio
+async def test_load_daily_jobs_loads_only_shard(monkeypatch) -> None:
+    """Test a full last page is followed by an empty one and only chats of
+    the shard are added"""
+
+    pool = FakePagesPool(
+        [
+            (str(chat_id), timedelta(hours=9), "", "UTC")
+            for chat_id in range(1, 5)
+        ]
+    )
+    wheel = TimingWheel()
+    monkeypatch.setattr(services, "DB_POOL", pool)
+    monkeypatch.setattr(jobs, "DAILY_NOTIFICATIONS_PAGE_SIZE", 2)
+    monkeypatch.setattr(jobs, "NOTIFICATION_WHEEL", wheel)
+    monkeypatch.setattr(jobs, "REMINDER_PLANNER", ReminderPlanner())
+
+    loaded_count = await jobs.load_daily_jobs(0, 2)
+    chat_ids = [str(chat_id) for chat_id in range(1, 5)]
+
+    assert pool.fetched == [("", 2), ("2", 2), ("4", 2)]
+    assert loaded_count == len(wheel)
+    assert [chat_id for chat_id in chat_ids if chat_id in wheel] == [
+        chat_id for chat_id in chat_ids if jobs.get_shard(chat_id, 2) == 0
+    ]
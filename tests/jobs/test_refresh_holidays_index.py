@@ -0,0 +1,38 @@
+"""Tests for refresh_holidays_index function"""
+
+from logging import ERROR
+
+from pytest import mark
+
+import holidays_index
+import jobs
+from circuit_breaker import CircuitOpenError
+from holidays_index import HolidayIndex
+from tests.mocks import HOLIDAYS_ROWS
+
+
+class FailingPool:
+    """Pool of unavailable DB"""
+
+    async def fetch_one(self, query: str, params=None) -> tuple:
+        raise CircuitOpenError(msg="DB is unavailable")
+
+
+@mark.asyncio
+async def test_refresh_holidays_index_logs_db_errors(
+    monkeypatch, caplog
+) -> None:
+    """Test the job logs one line while DB is unavailable and the index is
+    kept as stale"""
+
+    index = HolidayIndex()
+    index.build(HOLIDAYS_ROWS, version=1)
+    monkeypatch.setattr(jobs, "HOLIDAY_INDEX", index)
+    monkeypatch.setattr(holidays_index, "DB_POOL", FailingPool())
+
+    with caplog.at_level(ERROR, logger=jobs.logger.name):
+        await jobs.refresh_holidays_index()
+
+    assert index.is_stale
+    assert len(await index.get_all()) == len(HOLIDAYS_ROWS)
+    assert [record.exc_info for record in caplog.records] == [None]
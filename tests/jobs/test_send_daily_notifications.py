@@ -0,0 +1,233 @@
+"""Tests for send_daily_notifications and resend_unfinished_deliveries
+functions"""
+
+from datetime import date, datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from aiogram.exceptions import TelegramBadRequest
+from pytest import fixture, mark
+
+import jobs
+import services
+from custom_types import DeliveryReport
+from delivery_log import DeliveryBatch
+from holidays_index import HolidayIndex
+from render_cache import RenderCache
+from timing_wheel import TimingWheel
+
+NOW = datetime(2024, 5, 1, 9, 0, 5, tzinfo=timezone.utc)
+TODAY = date(2024, 5, 1)
+NOW_MINUTE = int(NOW.timestamp()) // 60
+
+
+class FakeDatetime(datetime):
+    """Datetime that is always NOW"""
+
+    @classmethod
+    def now(cls, tz=None) -> datetime:
+        return NOW
+
+
+class FakeHistogram:
+    """Histogram that remembers observed values"""
+
+    def __init__(self) -> None:
+        self.values = []
+
+    def observe(self, value: float) -> None:
+        self.values.append(value)
+
+
+class FakeDeliveryLog:
+    """Log with statuses of deliveries in memory (all pending deliveries
+    are older than the send timeout)"""
+
+    batch_size = 2
+
+    def __init__(self) -> None:
+        # (chat_id, date) -> status
+        self.statuses = {}
+        self.claimed = []
+        self.reclaimed = []
+        self.reports = []
+        self.watermarks = []
+
+    async def claim(self, chat_ids, delivery_date: date, due_minute: int):
+        self.claimed.append((list(chat_ids), delivery_date, due_minute))
+
+        return self._get_batch(chat_ids, delivery_date, (None,))
+
+    async def get_unfinished(self, first_date: date) -> list:
+        return [
+            (chat_id, delivery_date, status)
+            for (chat_id, delivery_date), status in self.statuses.items()
+            if delivery_date >= first_date and status in ("pending", "failed")
+        ]
+
+    async def reclaim(self, chat_ids, delivery_date: date):
+        self.reclaimed.append(list(chat_ids))
+
+        return self._get_batch(chat_ids, delivery_date, ("pending", "failed"))
+
+    async def finish(self, batch, report: DeliveryReport) -> None:
+        self.reports.append(report)
+
+        for chat_id in batch.chat_ids:
+            self.statuses[(chat_id, batch.delivery_date)] = (
+                "failed" if chat_id in report.failed_chat_ids else "sent"
+            )
+
+    async def save_watermark(self, shard: str, minute: int) -> None:
+        self.watermarks.append((shard, minute))
+
+    def _get_batch(self, chat_ids, delivery_date: date, statuses: tuple):
+        """Claim the chats whose deliveries have one of the statuses"""
+
+        claimed_chat_ids = [
+            chat_id
+            for chat_id in chat_ids
+            if self.statuses.get((chat_id, delivery_date)) in statuses
+        ]
+
+        for chat_id in claimed_chat_ids:
+            self.statuses[(chat_id, delivery_date)] = "pending"
+
+        return DeliveryBatch(1, delivery_date, claimed_chat_ids)
+
+
+@fixture
+def sending(monkeypatch) -> SimpleNamespace:
+    """Patch jobs to send to fake chats (the chat «3» fails), return the
+    wheel, the log and lists of sent holidays and reminders"""
+
+    index = HolidayIndex()
+    index.build([(date(2000, 5, 1), "Праздник", 0, "Всех", 1)], version=1)
+    result = SimpleNamespace(
+        wheel=TimingWheel(),
+        delivery_log=FakeDeliveryLog(),
+        render_cache=RenderCache(10),
+        scheduler_lag=FakeHistogram(),
+        sent=[],
+        reminded=[],
+    )
+
+    async def send_message(bot, chat_id: str, text: str) -> None:
+        result.sent.append(chat_id)
+
+        if chat_id == "3":
+            raise TelegramBadRequest(None, "chat not found")
+
+    async def send_reminders(bot, chat_ids, today) -> DeliveryReport:
+        result.reminded.extend(chat_ids)
+        return DeliveryReport(delivered=len(chat_ids), skipped=0, failed=0)
+
+    monkeypatch.setattr(jobs, "datetime", FakeDatetime)
+    monkeypatch.setattr(jobs, "NOTIFICATION_WHEEL", result.wheel)
+    monkeypatch.setattr(jobs, "DELIVERY_LOG", result.delivery_log)
+    monkeypatch.setattr(jobs, "RESOURCES", SimpleNamespace(bot=None))
+    monkeypatch.setattr(jobs, "send_reminders", send_reminders)
+    monkeypatch.setattr(jobs, "SCHEDULER_LAG", result.scheduler_lag)
+    monkeypatch.setattr(services, "HOLIDAY_INDEX", index)
+    monkeypatch.setattr(services, "RENDER_CACHE", result.render_cache)
+    monkeypatch.setattr(services, "send_message", send_message)
+
+    return result
+
+
+def add_chats(wheel: TimingWheel, chat_ids, time_=(9, 0)) -> None:
+    """Add the chats to the wheel as at 08:00 UTC"""
+
+    for chat_id in chat_ids:
+        wheel.add(
+            chat_id, time_, "UTC", datetime(2024, 5, 1, 8, tzinfo=timezone.utc)
+        )
+
+
+@mark.asyncio
+async def test_send_daily_notifications_sends_slot_once(sending) -> None:
+    """Test chats of one slot are claimed and finished by batches, the
+    message is rendered once and every claimed chat gets it once"""
+
+    add_chats(sending.wheel, ("1", "2", "3", "4"))
+    sending.wheel.set_last_turn(NOW - timedelta(minutes=1))
+    sending.delivery_log.statuses[("4", TODAY)] = "sent"
+
+    await jobs.send_daily_notifications("0/1")
+    # The next turn of the same minute finds no due chats
+    await jobs.send_daily_notifications("0/1")
+
+    assert sending.delivery_log.claimed == [
+        (["1", "2"], TODAY, NOW_MINUTE),
+        (["3", "4"], TODAY, NOW_MINUTE),
+    ]
+    assert sorted(sending.sent) == ["1", "2", "3"]
+    assert sorted(sending.reminded) == ["1", "2", "3"]
+    assert sending.render_cache.misses == 1
+    # Lag of the 09:00 slot, the empty turn has no slots
+    assert sending.scheduler_lag.values == [5.0]
+    assert sending.delivery_log.reports == [
+        DeliveryReport(delivered=2, skipped=0, failed=0),
+        DeliveryReport(
+            delivered=0, skipped=0, failed=1, failed_chat_ids=("3",)
+        ),
+    ]
+    assert sending.delivery_log.statuses == {
+        ("1", TODAY): "sent",
+        ("2", TODAY): "sent",
+        ("3", TODAY): "failed",
+        ("4", TODAY): "sent",
+    }
+    assert sending.delivery_log.watermarks == [("0/1", NOW_MINUTE)] * 2
+
+
+@mark.asyncio
+async def test_send_daily_notifications_claims_due_minutes(sending) -> None:
+    """Test chats caught up by a late turn are claimed with their own due
+    minutes"""
+
+    add_chats(sending.wheel, ("1",), (8, 55))
+    add_chats(sending.wheel, ("2",))
+    sending.wheel.set_last_turn(NOW - timedelta(minutes=10))
+
+    await jobs.send_daily_notifications("0/1")
+
+    assert sending.delivery_log.claimed == [
+        (["1"], TODAY, NOW_MINUTE - 5),
+        (["2"], TODAY, NOW_MINUTE),
+    ]
+    assert sending.scheduler_lag.values == [305.0, 5.0]
+
+
+@mark.asyncio
+async def test_resend_unfinished_deliveries(sending) -> None:
+    """Test today's failed and pending notifications of the shard's chats
+    are sent again, and reminders only with pending ones"""
+
+    add_chats(sending.wheel, ("1", "2", "3", "5"))
+    sending.delivery_log.statuses = {
+        # Left by a stopped process
+        ("1", TODAY): "pending",
+        ("2", TODAY): "failed",
+        ("3", TODAY): "failed",
+        # Has been sent
+        ("4", TODAY): "sent",
+        # The date is over for the chat
+        ("5", TODAY - timedelta(days=1)): "failed",
+        # The chat of another shard
+        ("6", TODAY): "pending",
+    }
+
+    await jobs.resend_unfinished_deliveries()
+
+    assert sending.delivery_log.reclaimed == [["1", "2"], ["3"]]
+    assert sorted(sending.sent) == ["1", "2", "3"]
+    assert sending.reminded == ["1"]
+    assert sending.delivery_log.statuses[("1", TODAY)] == "sent"
+    assert sending.delivery_log.statuses[("2", TODAY)] == "sent"
+    assert sending.delivery_log.statuses[("3", TODAY)] == "failed"
+
+    # Nothing is sent twice
+    sending.sent.clear()
+    await jobs.resend_unfinished_deliveries()
+
+    assert sending.sent == ["3"]
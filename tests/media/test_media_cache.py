@@ -0,0 +1,67 @@
+"""Tests for cache of uploaded photos"""
+
+from types import SimpleNamespace
+
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import FSInputFile
+from pytest import mark
+
+import media
+from media import MediaCache
+
+
+def get_sent_message(file_id: str) -> SimpleNamespace:
+    """Return message with the photo as Telegram returns it"""
+
+    return SimpleNamespace(photo=[SimpleNamespace(file_id=file_id)])
+
+
+def test_media_cache_keeps_file_id_by_content(tmp_path) -> None:
+    """Test file_id is saved to disk and forgotten if the file changes"""
+
+    photo_path = tmp_path / "cat.jpg"
+    photo_path.write_bytes(b"cat")
+    cache_path = str(tmp_path / "media_cache.json")
+
+    cache = MediaCache(cache_path)
+
+    assert isinstance(cache.get(str(photo_path)), FSInputFile)
+
+    cache.remember(str(photo_path), get_sent_message("cat_id"))
+
+    assert MediaCache(cache_path).get(str(photo_path)) == "cat_id"
+
+    photo_path.write_bytes(b"another cat")
+
+    assert isinstance(cache.get(str(photo_path)), FSInputFile)
+
+
+@mark.asyncio
+async def test_send_photo_uploads_again_if_file_id_rejected(
+    tmp_path, monkeypatch
+) -> None:
+    """Test the photo is uploaded if Telegram rejects cached file_id"""
+
+    photo_path = tmp_path / "cat.jpg"
+    photo_path.write_bytes(b"cat")
+    cache = MediaCache(None)
+    cache.remember(str(photo_path), get_sent_message("old_id"))
+    sent_photos = []
+
+    async def fake_send(method, priority):
+        sent_photos.append(method.photo)
+
+        if method.photo == "old_id":
+            raise TelegramBadRequest(method, "wrong file identifier")
+
+        return get_sent_message("new_id")
+
+    monkeypatch.setattr(media, "MEDIA_CACHE", cache)
+    monkeypatch.setattr(media, "send", fake_send)
+
+    await media.send_photo(None, 1, str(photo_path))
+    await media.send_photo(None, 1, str(photo_path))
+
+    assert sent_photos[0] == "old_id"
+    assert isinstance(sent_photos[1], FSInputFile)
+    assert sent_photos[2] == "new_id"
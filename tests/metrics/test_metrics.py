@@ -0,0 +1,37 @@
+"""Tests for metrics in Prometheus text format"""
+
+from metrics import Counter, Histogram
+
+
+def test_counter_renders_values_by_labels() -> None:
+    """Test Counter sums values with the same labels"""
+
+    counter = Counter("test_requests_total", "Test requests", ["result"])
+
+    counter.inc("ok")
+    counter.inc("ok")
+    counter.inc('bad "error"', value=3)
+
+    assert counter.render() == [
+        "# HELP test_requests_total Test requests",
+        "# TYPE test_requests_total counter",
+        'test_requests_total{result="ok"} 2',
+        'test_requests_total{result="bad \\"error\\""} 3',
+    ]
+
+
+def test_histogram_renders_cumulative_buckets() -> None:
+    """Test Histogram puts values to buckets with «le» bound"""
+
+    histogram = Histogram("test_duration_seconds", "Test", buckets=(0.1, 1))
+
+    for value in (0.05, 0.1, 0.5, 5):
+        histogram.observe(value)
+
+    assert histogram.render()[2:] == [
+        'test_duration_seconds_bucket{le="0.1"} 2',
+        'test_duration_seconds_bucket{le="1"} 3',
+        'test_duration_seconds_bucket{le="+Inf"} 4',
+        "test_duration_seconds_sum 5.65",
+        "test_duration_seconds_count 4",
+    ]
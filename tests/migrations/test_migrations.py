@@ -0,0 +1,182 @@
+"""Tests for migrations of DB schema"""
+
+from json import dumps
+
+from pytest import mark
+
+from migrations import (
+    INDEXED_QUERIES,
+    MIGRATIONS,
+    Migration,
+    apply_migrations,
+    check_indexes,
+    get_plan_problems,
+)
+
+
+class FakePool:
+    """Pool that remembers executed statements"""
+
+    def __init__(self, applied_versions=()) -> None:
+        self.applied_versions = list(applied_versions)
+        self.executed = []
+
+    async def execute(self, query: str, params=None) -> int:
+        if query.startswith("INSERT INTO schema_migrations"):
+            self.applied_versions.append(params[0])
+        elif not query.lstrip().startswith("CREATE TABLE"):
+            self.executed.append(query)
+
+        return 0
+
+    async def fetch_all(self, query: str, params=None) -> list:
+        return [(version,) for version in self.applied_versions]
+
+
+@mark.asyncio
+async def test_apply_migrations_applies_only_new_migrations() -> None:
+    """Test migrations are applied once and in order of versions"""
+
+    steps_with_pool = []
+
+    async def step(pool) -> None:
+        steps_with_pool.append(pool)
+
+    migrations = (
+        Migration(3, "Third", ("SQL 3", step)),
+        Migration(1, "First", ("SQL 1",)),
+        Migration(2, "Second", ("SQL 2",)),
+    )
+    pool = FakePool(applied_versions=[1])
+
+    assert await apply_migrations(pool, migrations) == [2, 3]
+    assert pool.executed == ["SQL 2", "SQL 3"]
+    assert steps_with_pool == [pool]
+
+    assert await apply_migrations(pool, migrations) == []
+    assert pool.executed == ["SQL 2", "SQL 3"]
+
+
+def test_get_plan_problems() -> None:
+    """Test full scans and filesorts are found in EXPLAIN output"""
+
+    indexed_plan = {
+        "query_block": {
+            "select_id": 1,
+            "ordering_operation": {
+                "using_filesort": False,
+                "table": {
+                    "table_name": "holidays",
+                    "access_type": "index",
+                    "key": "idx_holidays_month_day",
+                },
+            },
+        }
+    }
+    not_indexed_plan = {
+        "query_block": {
+            "select_id": 1,
+            "ordering_operation": {
+                "using_filesort": True,
+                "table": {"table_name": "holidays", "access_type": "ALL"},
+            },
+        }
+    }
+
+    assert get_plan_problems(dumps(indexed_plan)) == []
+    assert get_plan_problems(dumps(not_indexed_plan)) == [
+        "filesort",
+        "full scan of holidays",
+    ]
+
+
+class FakeExplainPool:
+    """Pool that returns the same plan for every EXPLAIN"""
+
+    def __init__(self, plan: dict) -> None:
+        self.plan = plan
+        self.explained = []
+
+    async def fetch_one(self, query: str, params=None) -> tuple:
+        assert query.startswith("EXPLAIN FORMAT=JSON ")
+
+        self.explained.append((query, params))
+
+        return (dumps(self.plan),)
+
+
+@mark.asyncio
+async def test_check_indexes_explains_every_indexed_query() -> None:
+    """Test every indexed query is explained with its params and problems
+    are reported by the query's name"""
+
+    pool = FakeExplainPool(
+        {"query_block": {"table": {"table_name": "t", "access_type": "ref"}}}
+    )
+
+    assert await check_indexes(pool) == []
+    assert pool.explained == [
+        (f"EXPLAIN FORMAT=JSON {query}", params)
+        for _, query, params in INDEXED_QUERIES
+    ]
+    assert all(
+        isinstance(name, str)
+        and name.endswith("_QUERY")
+        and isinstance(query, str)
+        and isinstance(params, tuple)
+        for name, query, params in INDEXED_QUERIES
+    )
+
+    pool.plan["query_block"]["table"]["access_type"] = "ALL"
+
+    assert await check_indexes(pool) == [
+        f"{name}: full scan of t" for name, _, _ in INDEXED_QUERIES
+    ]
+
+
+class FakeHolidaysPool:
+    """Pool with holidays table that has duplicates"""
+
+    def __init__(self) -> None:
+        self.columns = {"title", "date_of_holiday"}
+        self.indexed_columns = set()
+        self.executed = []
+
+    async def fetch_one(self, query: str, params=None) -> tuple:
+        if "information_schema.columns" in query:
+            return (params[1] in self.columns,)
+
+        return (params[1] in self.indexed_columns,)
+
+    async def execute(self, query: str, params=None) -> int:
+        self.executed.append(query.split()[0])
+
+        if "ADD COLUMN title_hash" in query:
+            self.columns.add("title_hash")
+        elif "ADD UNIQUE KEY" in query:
+            assert "(title_hash, date_of_holiday)" in query
+            self.indexed_columns.add("title_hash")
+        elif query.lstrip().startswith("DELETE"):
+            return 2
+
+        return 0
+
+
+@mark.asyncio
+async def test_holidays_unique_key_migration_deletes_duplicates() -> None:
+    """Test duplicates are deleted before the key of title's hash is added,
+    and the migration can be applied again after a failure"""
+
+    (step,) = next(
+        migration for migration in MIGRATIONS if migration.version == 6
+    ).steps
+    pool = FakeHolidaysPool()
+
+    await step(pool)
+
+    assert pool.executed == ["ALTER", "DELETE", "ALTER"]
+
+    pool.executed.clear()
+    await step(pool)
+
+    assert pool.executed == []
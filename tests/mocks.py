@@ -1,5 +1,7 @@
 """Mocks for tests"""
 
+from datetime import date
+
 AGE_AND_SUFFIX = (
     # год
     ("1", "год"),
@@ -65,3 +67,12 @@ NOTIFICATION_TIME_AND_IS_CORRECT = (
     ("hello world", False),
     ("", False),
 )
+
+# Rows of the holidays table sorted by month and day
+HOLIDAYS_ROWS = (
+    (date(1990, 1, 15), "День рождения Маши", 1, None),
+    (date(2000, 3, 1), "Годовщина переезда", 0, "Всех"),
+    (date(1970, 3, 8), "8 марта", 0, "Маму и бабушку"),
+    (date(1985, 3, 8), "День рождения Пети", 1, None),
+    (date(1960, 12, 31), "Новый год", 0, "Всех"),
+)
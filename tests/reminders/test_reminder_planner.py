@@ -0,0 +1,99 @@
+"""Tests for ReminderPlanner class"""
+
+from datetime import date
+
+from pytest import fixture, mark
+
+import reminders
+from holidays_index import HolidayIndex
+from reminders import ReminderPlanner
+from tests.mocks import HOLIDAYS_ROWS
+
+TODAY = date(2023, 3, 1)
+
+
+@fixture
+def index(monkeypatch) -> HolidayIndex:
+    """Return holidays index used by reminders"""
+
+    index = HolidayIndex()
+    index.build(
+        HOLIDAYS_ROWS + ((date(1992, 2, 29), "День рождения Вани", 1, None),),
+        version=1,
+    )
+    monkeypatch.setattr(reminders, "HOLIDAY_INDEX", index)
+
+    return index
+
+
+@mark.asyncio
+async def test_reminder_planner_renders_once_per_days(
+    index, monkeypatch
+) -> None:
+    """Test the plan has one message per distinct days, not per chat"""
+
+    rendered = []
+    render = ReminderPlanner._render
+
+    async def render_spy(today: date, days_before: int):
+        rendered.append(days_before)
+        return await render(today, days_before)
+
+    monkeypatch.setattr(ReminderPlanner, "_render", staticmethod(render_spy))
+
+    planner = ReminderPlanner()
+    planner.set_days("1", (7, 1))
+    planner.set_days("2", (7,))
+    planner.set_days("3", (7, 3))
+
+    # Holidays are only in 7 days (March 8)
+    assert await planner.plan(TODAY) == 1
+    assert sorted(rendered) == [1, 3, 7]
+
+    await planner.plan(TODAY)
+    assert sorted(rendered) == [1, 3, 7]
+
+
+@mark.asyncio
+async def test_reminder_planner_get_reminders(index) -> None:
+    """Test chats get only reminders about days with holidays"""
+
+    planner = ReminderPlanner()
+    planner.set_days("1", (7, 1))
+    planner.set_days("2", (3,))
+    planner.set_days("3", (7,))
+
+    reminders_ = await planner.get_reminders(["1", "2"], TODAY)
+
+    assert [chat_id for chat_id, _ in reminders_] == ["1"]
+    assert "8 марта" in reminders_[0][1]
+    assert "День рождения Пети" in reminders_[0][1]
+    assert reminders_[0][1].startswith("Напоминание")
+
+
+@mark.asyncio
+async def test_reminder_planner_feb_29_in_non_leap_year(index) -> None:
+    """Test holidays on February 29 are reminded on February 28"""
+
+    planner = ReminderPlanner()
+    planner.set_days("1", (1,))
+
+    reminders_ = await planner.get_reminders(["1"], date(2023, 2, 27))
+
+    assert len(reminders_) == 1
+    assert "День рождения Вани" in reminders_[0][1]
+
+
+@mark.asyncio
+async def test_reminder_planner_remove_chat(index) -> None:
+    """Test removed and changed chats get only their current reminders"""
+
+    planner = ReminderPlanner()
+    planner.set_days("1", (7,))
+    planner.set_days("2", (7,))
+    planner.set_days("2", (1,))
+    planner.remove_chat("1")
+
+    assert planner.get_days("1") == ()
+    assert planner.get_days("2") == (1,)
+    assert await planner.get_reminders(["1", "2"], TODAY) == []
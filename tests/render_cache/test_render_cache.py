@@ -0,0 +1,44 @@
+"""Tests for RenderCache class"""
+
+from pytest import mark
+
+from render_cache import RenderCache
+
+
+@mark.asyncio
+async def test_render_cache_renders_once() -> None:
+    """Test RenderCache renders the message once for the same key"""
+
+    renders = []
+    cache = RenderCache(max_size=10)
+
+    async def render() -> str:
+        renders.append(1)
+        return "message"
+
+    for _ in range(3):
+        assert await cache.get_or_render("view", 1, render) == "message"
+
+    await cache.get_or_render("view", 2, render)
+
+    assert len(renders) == 2
+    assert cache.get_stats() == {"size": 2, "hits": 2, "misses": 2}
+
+
+@mark.asyncio
+async def test_render_cache_evicts_least_recently_used() -> None:
+    """Test RenderCache removes the least recently used message"""
+
+    cache = RenderCache(max_size=2)
+
+    async def render() -> str:
+        return "message"
+
+    await cache.get_or_render("first", 1, render)
+    await cache.get_or_render("second", 1, render)
+    await cache.get_or_render("first", 1, render)
+    await cache.get_or_render("third", 1, render)
+    await cache.get_or_render("first", 1, render)
+    await cache.get_or_render("second", 1, render)
+
+    assert cache.get_stats() == {"size": 2, "hits": 2, "misses": 4}
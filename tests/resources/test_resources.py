@@ -0,0 +1,54 @@
+"""Tests for resources created on startup"""
+
+from pytest import MonkeyPatch, mark, raises
+
+from db import DBPool
+from resources import Resources
+
+
+def test_resources_are_not_created_on_import() -> None:
+    """Test resources can't be used before startup"""
+
+    resources = Resources(DBPool({}, size=1))
+
+    assert not resources.is_started
+
+    with raises(RuntimeError):
+        resources.bot
+
+    with raises(RuntimeError):
+        resources.scheduler
+
+
+@mark.asyncio
+async def test_resources_startup_and_shutdown(
+    monkeypatch: MonkeyPatch,
+) -> None:
+    """Test startup reads settings and creates resources, shutdown closes
+    them"""
+
+    monkeypatch.setenv("TOKEN", "42:TEST")
+    monkeypatch.setenv("DB_HOST", "localhost")
+    monkeypatch.setenv("DB_USER", "user")
+    monkeypatch.setenv("DB_PASSWORD", "password")
+    monkeypatch.setenv("DB_NAME", "holidays")
+
+    pool = DBPool(size=1)
+    resources = Resources(pool)
+
+    await resources.startup()
+    bot = resources.bot
+
+    assert bot.token == "42:TEST"
+    assert pool._settings["database"] == "holidays"
+    assert pool._executor is not None
+
+    # Startup is done once
+    await resources.startup()
+    assert resources.bot is bot
+
+    resources.scheduler.start()
+    await resources.shutdown()
+
+    assert not resources.is_started
+    assert pool._executor is None
@@ -0,0 +1,125 @@
+"""Tests for SendQueue class"""
+
+from asyncio import Event, create_task, gather, sleep, wait_for
+
+from aiogram.exceptions import TelegramRetryAfter
+from pytest import mark, raises
+
+from sender import (
+    BULK_PRIORITY,
+    INTERACTIVE_PRIORITY,
+    SendQueue,
+    SendQueueStoppedError,
+)
+
+
+class FakeMethod:
+    """Request to Telegram that saves the order of sending"""
+
+    def __init__(self, chat_id, sent, errors=()):
+        self.chat_id = chat_id
+        self.sent = sent
+        self.errors = list(errors)
+
+    def __await__(self):
+        return self._send().__await__()
+
+    async def _send(self):
+        if self.errors:
+            raise self.errors.pop(0)
+
+        self.sent.append(self.chat_id)
+
+        return self.chat_id
+
+
+class HangingMethod(FakeMethod):
+    """Request to Telegram that is never answered"""
+
+    async def _send(self):
+        await Event().wait()
+
+
+@mark.asyncio
+async def test_send_queue_sends_interactive_before_bulk() -> None:
+    """Test SendQueue sends interactive requests before bulk ones"""
+
+    sent = []
+    queue = SendQueue(1_000, 1_000, 10, 1, 0)
+
+    try:
+        await gather(
+            queue.send(FakeMethod("bulk_1", sent), BULK_PRIORITY),
+            queue.send(FakeMethod("bulk_2", sent), BULK_PRIORITY),
+            queue.send(FakeMethod("user", sent), INTERACTIVE_PRIORITY),
+        )
+    finally:
+        await queue.stop()
+
+    assert sent == ["user", "bulk_1", "bulk_2"]
+
+
+@mark.asyncio
+async def test_send_queue_retries_after_flood_error() -> None:
+    """Test SendQueue retries the request after «retry_after» seconds"""
+
+    sent = []
+    queue = SendQueue(1_000, 1_000, 10, 1, 1)
+    flood_error = TelegramRetryAfter(None, "Flood control", retry_after=0)
+
+    try:
+        assert await queue.send(FakeMethod(1, sent, [flood_error])) == 1
+        assert queue.get_stats()["retried"] == 1
+
+        with raises(TelegramRetryAfter):
+            await queue.send(FakeMethod(2, sent, [flood_error] * 2))
+    finally:
+        await queue.stop()
+
+    assert sent == [1]
+
+
+@mark.asyncio
+async def test_send_queue_limits_chat_rate() -> None:
+    """Test SendQueue waits for the chat's limit"""
+
+    sent = []
+    queue = SendQueue(1_000, 10, 1, 2, 0)
+
+    try:
+        await gather(
+            queue.send(FakeMethod("chat", sent)),
+            queue.send(FakeMethod("chat", sent)),
+            queue.send(FakeMethod("other", sent)),
+        )
+    finally:
+        await queue.stop()
+
+    assert sent == ["chat", "other", "chat"]
+
+
+@mark.asyncio
+async def test_send_queue_stop_fails_unsent_requests() -> None:
+    """Test requests that are being sent, queued or waiting for a retry
+    fail when the queue is stopped"""
+
+    sent = []
+    queue = SendQueue(1_000, 1_000, 10, 1, 1)
+    flood_error = TelegramRetryAfter(None, "Flood control", retry_after=60)
+    sending = [
+        create_task(queue.send(FakeMethod("delayed", sent, [flood_error]))),
+        create_task(queue.send(HangingMethod("hanging", sent))),
+        create_task(queue.send(FakeMethod("queued", sent))),
+    ]
+
+    for _ in range(5):
+        await sleep(0)
+
+    assert queue.get_stats()["queue_depth"] == 2
+
+    await queue.stop()
+    results = await wait_for(gather(*sending, return_exceptions=True), 1)
+
+    assert [type(result) for result in results] == [SendQueueStoppedError] * 3
+    assert sent == []
+    assert queue.get_stats()["queue_depth"] == 0
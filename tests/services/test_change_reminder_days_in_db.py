@@ -0,0 +1,56 @@
+"""Tests for change_reminder_days_in_db function"""
+
+from types import SimpleNamespace
+
+from pytest import mark
+
+import services
+from constants.queries import CHANGE_REMINDER_DAYS_QUERY
+from services import change_reminder_days_in_db
+
+
+class FakePool:
+    """Pool that remembers executed queries"""
+
+    def __init__(self) -> None:
+        self.executed = []
+
+    async def execute(self, query: str, params=None) -> int:
+        self.executed.append((query, params))
+        return 1
+
+
+class FakeMessage:
+    """Message that remembers answers"""
+
+    def __init__(self, chat_id: int) -> None:
+        self.chat = SimpleNamespace(id=chat_id)
+        self.answers = []
+
+    def answer(self, text: str) -> str:
+        self.answers.append(text)
+        return text
+
+
+async def fake_send(method) -> None:
+    """Send nothing"""
+
+
+@mark.asyncio
+async def test_change_reminder_days_in_db_saves_days(monkeypatch) -> None:
+    """Test the days are saved for the chat and the user is answered"""
+
+    pool = FakePool()
+    message = FakeMessage(42)
+    monkeypatch.setattr(services, "DB_POOL", pool)
+    monkeypatch.setattr(services, "send", fake_send)
+
+    assert await change_reminder_days_in_db(message, (7, 3, 1))
+    assert await change_reminder_days_in_db(message, ())
+
+    assert pool.executed == [
+        (CHANGE_REMINDER_DAYS_QUERY, ("7,3,1", "42")),
+        (CHANGE_REMINDER_DAYS_QUERY, ("", "42")),
+    ]
+    assert "7, 3, 1" in message.answers[0]
+    assert message.answers[1] == "Напоминания отключены! ☑️"
@@ -0,0 +1,69 @@
+"""Tests for change_time_zone_in_db function"""
+
+from types import SimpleNamespace
+
+from mysql.connector.errors import OperationalError
+from pytest import mark
+
+import services
+from constants.queries import CHANGE_TIME_ZONE_QUERY
+from services import change_time_zone_in_db
+
+
+class FakePool:
+    """Pool that remembers executed queries (or fails like unavailable
+    DB)"""
+
+    def __init__(self, is_available: bool = True) -> None:
+        self.is_available = is_available
+        self.executed = []
+
+    async def execute(self, query: str, params=None) -> int:
+        if not self.is_available:
+            raise OperationalError(msg="DB is unavailable")
+
+        self.executed.append((query, params))
+        return 1
+
+
+class FakeMessage:
+    """Message that remembers answers"""
+
+    def __init__(self, chat_id: int) -> None:
+        self.chat = SimpleNamespace(id=chat_id)
+        self.answers = []
+
+    def answer(self, text: str) -> str:
+        self.answers.append(text)
+        return text
+
+
+async def fake_send(method) -> None:
+    """Send nothing"""
+
+
+@mark.asyncio
+async def test_change_time_zone_in_db_returns_result(monkeypatch) -> None:
+    """Test True is returned if the time zone is saved and False (with the
+    error photo) if DB fails"""
+
+    photos = []
+
+    async def answer_photo(message, path: str, **kwargs) -> None:
+        photos.append(path)
+
+    pool = FakePool()
+    message = FakeMessage(42)
+    monkeypatch.setattr(services, "DB_POOL", pool)
+    monkeypatch.setattr(services, "send", fake_send)
+    monkeypatch.setattr(services, "answer_photo", answer_photo)
+
+    assert await change_time_zone_in_db(message, "Asia/Tokyo")
+    assert pool.executed == [(CHANGE_TIME_ZONE_QUERY, ("Asia/Tokyo", "42"))]
+    assert photos == []
+
+    pool.is_available = False
+
+    assert not await change_time_zone_in_db(message, "Europe/Paris")
+    assert photos == ["photos/tinkoff.jpg"]
+    assert len(message.answers) == 1
@@ -0,0 +1,80 @@
+"""Tests for edit_holidays_page function"""
+
+from datetime import date
+from types import SimpleNamespace
+
+from pytest import mark
+
+import services
+from holidays_index import HolidayIndex
+from services import edit_holidays_page
+
+
+class FakeCallbackQuery:
+    """Callback query that remembers edits of its message and answers"""
+
+    def __init__(self, data: str) -> None:
+        self.data = data
+        self.edits = []
+        self.answers = 0
+        self.message = SimpleNamespace(edit_text=self.edit_text)
+
+    def edit_text(self, text: str, reply_markup=None) -> str:
+        self.edits.append(text)
+        return text
+
+    def answer(self) -> None:
+        self.answers += 1
+
+
+async def fake_send(method) -> None:
+    """Send nothing"""
+
+
+@mark.asyncio
+@mark.parametrize(
+    "data",
+    (
+        "holidays_page:after:1:x:4",
+        "holidays_page:after:1:4",
+        "holidays_page:after:1:4:4:4",
+        "holidays_page:sideways:1:4:4",
+        "holidays_page",
+    ),
+)
+async def test_edit_holidays_page_ignores_wrong_data(
+    monkeypatch, data: str
+) -> None:
+    """Test malformed callback data is answered without changing the
+    page"""
+
+    callback_query = FakeCallbackQuery(data)
+    monkeypatch.setattr(services, "send", fake_send)
+
+    await edit_holidays_page(callback_query)
+
+    assert callback_query.edits == []
+    assert callback_query.answers == 1
+
+
+@mark.asyncio
+async def test_edit_holidays_page_shows_next_page(monkeypatch) -> None:
+    """Test the page after the key is shown"""
+
+    index = HolidayIndex()
+    index.build(
+        [
+            (date(2000, 1, day), f"Праздник {day}", 0, "Всех", day)
+            for day in range(1, 4)
+        ],
+        version=1,
+    )
+    callback_query = FakeCallbackQuery("holidays_page:after:1:1:1")
+    monkeypatch.setattr(services, "HOLIDAY_INDEX", index)
+    monkeypatch.setattr(services, "send", fake_send)
+
+    await edit_holidays_page(callback_query)
+
+    assert "Праздник 1 " not in callback_query.edits[0]
+    assert "Праздник 2 " in callback_query.edits[0]
+    assert callback_query.answers == 1
@@ -0,0 +1,67 @@
+"""Tests for get_holidays_page function"""
+
+from datetime import date
+
+from pytest import mark
+
+import services
+from holidays_index import HolidayIndex
+from services import get_holidays_page
+
+
+def get_buttons_data(keyboard) -> list:
+    """Return callback data of all buttons of the keyboard"""
+
+    return [button.callback_data for button in keyboard.inline_keyboard[0]]
+
+
+@mark.asyncio
+async def test_get_holidays_page_fits_into_message(monkeypatch) -> None:
+    """Test the page has only holidays that fit into one message"""
+
+    index = HolidayIndex()
+    index.build(
+        [
+            (date(2000, 1, day), "Праздник" * 100, 0, "Всех", day)
+            for day in range(1, 11)
+        ],
+        version=1,
+    )
+    monkeypatch.setattr(services, "HOLIDAY_INDEX", index)
+    monkeypatch.setattr(services, "HOLIDAYS_PAGE_SIZE", 10)
+
+    text, keyboard = await get_holidays_page()
+
+    assert len(text) <= services.MESSAGE_MAX_LENGTH
+    assert text.count("Осталось дней") == 4
+    assert get_buttons_data(keyboard) == ["holidays_page:after:1:4:4"]
+
+    text, keyboard = await get_holidays_page(after=(1, 4, 4))
+
+    assert text.count("Осталось дней") == 4
+    assert get_buttons_data(keyboard) == [
+        "holidays_page:before:1:5:5",
+        "holidays_page:after:1:8:8",
+    ]
+
+    text, keyboard = await get_holidays_page(before=(1, 5, 5))
+
+    assert get_buttons_data(keyboard) == ["holidays_page:after:1:4:4"]
+
+
+@mark.asyncio
+async def test_get_holidays_page_marks_stale_holidays(monkeypatch) -> None:
+    """Test the page has a note if holidays can't be checked in DB"""
+
+    index = HolidayIndex()
+    index.build([(date(2000, 1, 1), "Праздник", 0, "Всех", 1)], version=1)
+    monkeypatch.setattr(services, "HOLIDAY_INDEX", index)
+
+    text, _ = await get_holidays_page()
+
+    assert services.STALE_HOLIDAYS_NOTE not in text
+
+    index._is_stale = True
+    text, _ = await get_holidays_page()
+
+    assert text.startswith(services.STALE_HOLIDAYS_NOTE)
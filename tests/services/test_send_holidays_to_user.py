@@ -0,0 +1,59 @@
+"""Tests for send_holidays_to_user function"""
+
+from types import SimpleNamespace
+
+from pytest import mark
+
+import holidays_index
+import services
+from holidays_index import HolidayIndex
+from render_cache import RenderCache
+from services import send_holidays_to_user
+from tests.mocks import HOLIDAYS_ROWS
+
+
+class FakePool:
+    """Pool of DB with holidays"""
+
+    async def fetch_one(self, query: str, params=None) -> tuple:
+        return ("holidays", 7)
+
+    async def fetch_all(self, query: str, params=None) -> list:
+        return list(HOLIDAYS_ROWS)
+
+
+class FakeMessage:
+    """Message that remembers answers"""
+
+    def __init__(self) -> None:
+        self.chat = SimpleNamespace(id=42)
+        self.answers = []
+
+    def answer(self, text: str) -> str:
+        self.answers.append(text)
+        return text
+
+
+async def fake_send(method) -> None:
+    """Send nothing"""
+
+
+@mark.asyncio
+async def test_send_holidays_to_user_caches_by_loaded_version(
+    monkeypatch,
+) -> None:
+    """Test holidays rendered from a cold index are cached by the version
+    they are loaded with"""
+
+    render_cache = RenderCache(10)
+    monkeypatch.setattr(holidays_index, "DB_POOL", FakePool())
+    monkeypatch.setattr(services, "HOLIDAY_INDEX", HolidayIndex())
+    monkeypatch.setattr(services, "RENDER_CACHE", render_cache)
+    monkeypatch.setattr(services, "send", fake_send)
+
+    message = FakeMessage()
+    await send_holidays_to_user(message)
+    await send_holidays_to_user(message)
+
+    assert (render_cache.misses, render_cache.hits) == (1, 1)
+    assert message.answers[0] == message.answers[-1]
@@ -0,0 +1,26 @@
+"""Tests for send_reminders function"""
+
+from mysql.connector.errors import OperationalError
+from pytest import mark
+
+import services
+from custom_types import DeliveryReport
+from services import send_reminders
+
+
+class FailingPlanner:
+    """Planner that can't render reminders (DB is unavailable)"""
+
+    async def get_reminders(self, chat_ids, today=None) -> list:
+        raise OperationalError(msg="DB is unavailable")
+
+
+@mark.asyncio
+async def test_send_reminders_reports_db_error_as_failed(monkeypatch) -> None:
+    """Test reminders of all chats are failed if they can't be planned"""
+
+    monkeypatch.setattr(services, "REMINDER_PLANNER", FailingPlanner())
+
+    assert await send_reminders(None, iter(["1", "2", "3"])) == (
+        DeliveryReport(delivered=0, skipped=0, failed=3)
+    )
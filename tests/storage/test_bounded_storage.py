@@ -0,0 +1,76 @@
+"""Tests for BoundedStorage class"""
+
+from asyncio import sleep
+
+from aiogram.fsm.storage.base import StorageKey
+from pytest import mark
+
+from states import MonthStates, NotificationStates
+from storage import BoundedStorage
+
+
+def _get_key(chat_id: int) -> StorageKey:
+    """Return storage key for the chat"""
+
+    return StorageKey(bot_id=42, chat_id=chat_id, user_id=chat_id)
+
+
+@mark.asyncio
+async def test_bounded_storage_removes_least_recently_used() -> None:
+    """Test BoundedStorage keeps max number of entries"""
+
+    storage = BoundedStorage(max_size=2, ttl=60)
+
+    try:
+        for chat_id in range(3):
+            await storage.set_state(
+                _get_key(chat_id), MonthStates.choosing_month
+            )
+
+        assert await storage.get_state(_get_key(0)) is None
+        assert await storage.get_state(_get_key(2)) == (
+            MonthStates.choosing_month.state
+        )
+    finally:
+        await storage.close()
+
+
+@mark.asyncio
+async def test_bounded_storage_removes_expired() -> None:
+    """Test BoundedStorage removes entries that were not used for TTL"""
+
+    storage = BoundedStorage(max_size=10, ttl=0.05)
+
+    try:
+        await storage.set_state(_get_key(1), MonthStates.choosing_month)
+        await sleep(0.1)
+
+        assert await storage.get_state(_get_key(1)) is None
+        assert await storage.get_data(_get_key(1)) == {}
+    finally:
+        await storage.close()
+
+
+@mark.asyncio
+async def test_bounded_storage_keeps_entries_after_restart(tmp_path) -> None:
+    """Test BoundedStorage with path loads entries saved before closing"""
+
+    path = str(tmp_path / "fsm.sqlite3")
+    storage = BoundedStorage(max_size=1, ttl=60, path=path)
+
+    await storage.set_state(_get_key(1), NotificationStates.awaiting_new_time)
+    await storage.set_data(_get_key(1), {"page": 2})
+    await storage.set_state(_get_key(2), MonthStates.choosing_month)
+    await storage.set_state(_get_key(2), None)
+    await storage.close()
+
+    storage = BoundedStorage(max_size=1, ttl=60, path=path)
+
+    try:
+        assert await storage.get_state(_get_key(1)) == (
+            NotificationStates.awaiting_new_time.state
+        )
+        assert await storage.get_data(_get_key(1)) == {"page": 2}
+        assert await storage.get_state(_get_key(2)) is None
+    finally:
+        await storage.close()
@@ -0,0 +1,65 @@
+"""Tests for templates of messages"""
+
+from datetime import date
+
+from pytest import mark, raises
+
+from templates import (
+    MessageFormat,
+    Template,
+    get_date_text,
+    register_message_format,
+)
+from utils import get_formatted_holidays
+
+
+def test_template_renders_escaped_values() -> None:
+    """Test Template puts values of fields escaped for HTML"""
+
+    template = Template("<b>{title}</b> - {whom}")
+
+    assert (
+        template.render({"title": "Мама & папа", "whom": "<Все>"})
+        == "<b>Мама &amp; папа</b> - &lt;Все&gt;"
+    )
+
+
+def test_template_rejects_format_spec() -> None:
+    """Test Template doesn't compile fields with format spec"""
+
+    with raises(ValueError):
+        Template("{days_left:03d}")
+
+
+def test_get_date_text() -> None:
+    """Test dates are in Russian with month in genitive case"""
+
+    assert get_date_text(3, 8) == "08 марта"
+    assert get_date_text(12, 31) == "31 декабря"
+
+
+@mark.asyncio
+async def test_get_formatted_holidays_with_registered_format() -> None:
+    """Test new message format is used by name"""
+
+    register_message_format(
+        "short",
+        MessageFormat(
+            holiday=Template("{date} - {title}"),
+            birthday=Template("{date} - {title} ({age} {age_suffix})"),
+            empty="Пусто",
+            separator="\n",
+        ),
+    )
+    holidays = [
+        (date(1990, 1, 15), "День рождения Маши", 1, None),
+        (date(1970, 3, 8), "8 марта", 0, "Маму"),
+    ]
+    age = date.today().year - 1990 + 1
+
+    message = await get_formatted_holidays(holidays, format_name="short")
+
+    assert message.startswith("15 января - День рождения Маши (")
+    assert message.endswith("\n08 марта - 8 марта")
+    assert str(age) in message or str(age - 1) in message
+    assert await get_formatted_holidays([], format_name="short") == "Пусто"
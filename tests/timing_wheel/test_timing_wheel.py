@@ -0,0 +1,173 @@
+"""Tests for TimingWheel class"""
+
+from datetime import date, datetime, timedelta, timezone
+
+from timing_wheel import TimingWheel
+
+UTC = timezone.utc
+
+
+def _turn_until(wheel: TimingWheel, start: datetime, end: datetime) -> list:
+    """Turn the wheel every minute, return (UTC time, local date, chat id)
+    of all due chats"""
+
+    due = []
+    now = start
+
+    while now <= end:
+        for local_date, chat_ids in wheel.turn(now).items():
+            due.extend((now, local_date, chat_id) for chat_id in chat_ids)
+
+        now += timedelta(minutes=1)
+
+    return due
+
+
+def test_timing_wheel_notifies_at_local_time() -> None:
+    """Test chats are due at their local time once a day"""
+
+    start = datetime(2023, 6, 1, 0, 0, tzinfo=UTC)
+    wheel = TimingWheel()
+    wheel.add("1", (9, 0), "Europe/Moscow", start)
+    wheel.add("-100", (9, 0), "UTC", start)
+
+    due = _turn_until(wheel, start, start + timedelta(days=2))
+
+    assert due == [
+        (datetime(2023, 6, 1, 6, 0, tzinfo=UTC), date(2023, 6, 1), "1"),
+        (datetime(2023, 6, 1, 9, 0, tzinfo=UTC), date(2023, 6, 1), "-100"),
+        (datetime(2023, 6, 2, 6, 0, tzinfo=UTC), date(2023, 6, 2), "1"),
+        (datetime(2023, 6, 2, 9, 0, tzinfo=UTC), date(2023, 6, 2), "-100"),
+    ]
+
+
+def test_timing_wheel_groups_chats_by_local_date() -> None:
+    """Test chats due at the same minute are grouped by their local date"""
+
+    start = datetime(2023, 6, 1, 20, 0, tzinfo=UTC)
+    wheel = TimingWheel()
+    wheel.add("1", (0, 30), "Asia/Tokyo", start)
+    wheel.add("2", (15, 30), "UTC", start)
+
+    assert wheel.turn(datetime(2023, 6, 2, 15, 30, tzinfo=UTC)) == {
+        date(2023, 6, 3): ["1"],
+        date(2023, 6, 2): ["2"],
+    }
+
+
+def test_timing_wheel_dst_start() -> None:
+    """Test skipped local time is notified after the change and other
+    times keep local time"""
+
+    # DST starts on 2023-03-12 at 02:00 in New York (UTC-5 -> UTC-4)
+    start = datetime(2023, 3, 11, 0, 0, tzinfo=UTC)
+    wheel = TimingWheel()
+    wheel.add("1", (2, 30), "America/New_York", start)
+    wheel.add("2", (9, 0), "America/New_York", start)
+
+    due = _turn_until(wheel, start, start + timedelta(days=3))
+
+    assert [(now.hour, now.minute, chat_id) for now, _, chat_id in due] == [
+        (7, 30, "1"),
+        (14, 0, "2"),
+        (7, 30, "1"),
+        (13, 0, "2"),
+        (6, 30, "1"),
+        (13, 0, "2"),
+    ]
+    assert [local_date.day for _, local_date, _ in due] == [
+        11,
+        11,
+        12,
+        12,
+        13,
+        13,
+    ]
+
+
+def test_timing_wheel_dst_end() -> None:
+    """Test repeated local time is notified once"""
+
+    # DST ends on 2023-11-05 at 02:00 in New York (UTC-4 -> UTC-5)
+    start = datetime(2023, 11, 4, 0, 0, tzinfo=UTC)
+    wheel = TimingWheel()
+    wheel.add("1", (1, 30), "America/New_York", start)
+
+    due = _turn_until(wheel, start, start + timedelta(days=3))
+
+    # 01:30 EDT on November 5 and not 01:30 EST again
+    assert [(now.day, now.hour, now.minute) for now, _, _ in due] == [
+        (4, 5, 30),
+        (5, 5, 30),
+        (6, 6, 30),
+    ]
+    assert [local_date.day for _, local_date, _ in due] == [4, 5, 6]
+
+
+def test_timing_wheel_move_and_remove() -> None:
+    """Test moved chats are due only at the new time, removed - never"""
+
+    start = datetime(2023, 6, 1, 0, 0, tzinfo=UTC)
+    wheel = TimingWheel()
+
+    for chat_id in range(10):
+        wheel.add(str(chat_id), (10, 0), "UTC", start)
+
+    wheel.add("3", (11, 0), "UTC", start)
+    wheel.remove("0")
+    wheel.remove("5")
+
+    assert len(wheel) == 8
+    assert "0" not in wheel
+    assert wheel.get("3") == ((11, 0), "UTC")
+    assert wheel.get("0") is None
+
+    due = _turn_until(wheel, start, start + timedelta(hours=12))
+
+    assert [
+        (now.hour, chat_id) for now, _, chat_id in due if now.hour == 11
+    ] == [(11, "3")]
+    assert sorted(chat_id for now, _, chat_id in due if now.hour == 10) == [
+        "1",
+        "2",
+        "4",
+        "6",
+        "7",
+        "8",
+        "9",
+    ]
+
+
+def test_timing_wheel_late_turn() -> None:
+    """Test minutes skipped between turns are turned by the next turn"""
+
+    start = datetime(2023, 6, 1, 9, 0, tzinfo=UTC)
+    wheel = TimingWheel()
+    wheel.add("1", (9, 5), "UTC", start)
+    wheel.add("2", (9, 7), "UTC", start)
+    wheel.turn(start)
+
+    # Chats are grouped by their planned minutes
+    assert wheel.turn_slots(start + timedelta(minutes=10)) == {
+        int(start.timestamp()) // 60 + 5: {date(2023, 6, 1): ["1"]},
+        int(start.timestamp()) // 60 + 7: {date(2023, 6, 1): ["2"]},
+    }
+    assert wheel.turn(start + timedelta(minutes=11)) == {}
+
+
+def test_timing_wheel_catches_up_since_last_turn() -> None:
+    """Test chats added as at the last turn are due on the next turn"""
+
+    watermark = datetime(2023, 6, 1, 8, 0, tzinfo=UTC)
+    wheel = TimingWheel()
+    wheel.add("1", (9, 0), "UTC", watermark)
+    wheel.add("2", (10, 30), "UTC", watermark)
+    wheel.add("3", (7, 0), "UTC", watermark)
+    wheel.set_last_turn(watermark)
+
+    assert wheel.turn(datetime(2023, 6, 1, 10, 0, tzinfo=UTC)) == {
+        date(2023, 6, 1): ["1"]
+    }
+    assert wheel.last_minute == int(
+        datetime(2023, 6, 1, 10, 0, tzinfo=UTC).timestamp() // 60
+    )
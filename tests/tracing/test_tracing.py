@@ -0,0 +1,99 @@
+"""Tests for tracing of updates"""
+
+from json import loads
+
+from pytest import mark
+
+import tracing
+from render_cache import RenderCache
+from tracing import TraceExporter, TracingMiddleware, UpdateProfiler, span
+
+
+def test_span_outside_of_update_does_nothing() -> None:
+    """Test span yields None if there is no traced update"""
+
+    with span("db.query") as current_span:
+        assert current_span is None
+
+
+@mark.asyncio
+async def test_tracing_middleware_exports_span_tree(tmp_path) -> None:
+    """Test TracingMiddleware writes the update with child spans"""
+
+    traces_path = tmp_path / "traces.jsonl"
+    exporter = TraceExporter(str(traces_path))
+    tracing.TRACE_EXPORTER, old_exporter = exporter, tracing.TRACE_EXPORTER
+
+    async def render() -> str:
+        with span("db.query", query="ALL_HOLIDAYS_SQL_QUERY"):
+            return "message"
+
+    async def handler(event, data) -> str:
+        return await RenderCache(max_size=10).get_or_render("view", 1, render)
+
+    try:
+        assert await TracingMiddleware()(handler, object(), {}) == "message"
+    finally:
+        tracing.TRACE_EXPORTER = old_exporter
+        exporter.close()
+
+    trace = loads(traces_path.read_text(encoding="utf-8"))
+
+    assert trace["name"] == "update"
+    assert [child["name"] for child in trace["children"]] == ["render"]
+    assert trace["children"][0]["children"][0]["attributes"] == {
+        "query": "ALL_HOLIDAYS_SQL_QUERY"
+    }
+
+
+@mark.asyncio
+async def test_update_profiler_saves_profile_after_updates(tmp_path) -> None:
+    """Test profile is saved when the last of N updates is handled"""
+
+    profiler = UpdateProfiler(str(tmp_path))
+    tracing.UPDATE_PROFILER, old_profiler = profiler, tracing.UPDATE_PROFILER
+    saved_paths = []
+
+    async def on_profile_saved(profile_path: str) -> None:
+        saved_paths.append(profile_path)
+
+    async def handler(event, data) -> None:
+        sum(range(1_000))
+
+    middleware = TracingMiddleware(on_profile_saved)
+    profiler.start(2)
+
+    try:
+        await middleware(handler, object(), {})
+
+        assert profiler.is_enabled
+        assert not saved_paths
+
+        await middleware(handler, object(), {})
+    finally:
+        tracing.UPDATE_PROFILER = old_profiler
+
+    assert not profiler.is_enabled
+    assert len(saved_paths) == 1
+    assert list(tmp_path.iterdir())[0].suffix == ".prof"
+
+
+def test_update_profiler_rejects_overlapping_start(tmp_path) -> None:
+    """Test start while updates are profiled doesn't reset the counters"""
+
+    profiler = UpdateProfiler(str(tmp_path))
+
+    assert profiler.start(2)
+
+    profiler.enable()
+
+    assert not profiler.start(5)
+
+    assert profiler.disable() is None
+
+    profiler.enable()
+    profile_path = profiler.disable()
+
+    assert profile_path is not None
+    assert not profiler.is_enabled
+    assert profiler.start(1)
@@ -0,0 +1,27 @@
+"""Tests for get_next_date function"""
+
+from datetime import date
+
+from pytest import mark
+
+from utils import get_next_date
+
+
+@mark.parametrize(
+    "holiday_date, today, next_date",
+    [
+        (date(1990, 5, 10), date(2025, 5, 1), date(2025, 5, 10)),
+        (date(1990, 5, 10), date(2025, 5, 10), date(2025, 5, 10)),
+        (date(1990, 5, 10), date(2025, 5, 11), date(2026, 5, 10)),
+        (date(1990, 1, 1), date(2025, 12, 31), date(2026, 1, 1)),
+        (date(2000, 2, 29), date(2025, 2, 1), date(2025, 2, 28)),
+        (date(2000, 2, 29), date(2027, 3, 1), date(2028, 2, 29)),
+        (date(2000, 2, 29), date(2028, 2, 29), date(2028, 2, 29)),
+    ],
+)
+def test_get_next_date(
+    holiday_date: date, today: date, next_date: date
+) -> None:
+    """Test get_next_date wraps to next year and handles February 29"""
+
+    assert get_next_date(holiday_date, today) == next_date
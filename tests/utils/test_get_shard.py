@@ -0,0 +1,18 @@
+"""Tests for get_shard function"""
+
+from utils import get_shard
+
+
+def test_get_shard_is_stable_for_int_and_str_chat_id() -> None:
+    """Test get_shard returns the same shard for int and str chat id"""
+
+    for chat_id in (1, -100123, 987654321):
+        assert get_shard(chat_id, 4) == get_shard(str(chat_id), 4)
+
+
+def test_get_shard_returns_shard_in_range() -> None:
+    """Test get_shard returns shard from 0 to shards count"""
+
+    shards = {get_shard(chat_id, 3) for chat_id in range(1_000)}
+
+    assert shards == {0, 1, 2}
@@ -0,0 +1,28 @@
+"""Tests for parse_reminder_days function"""
+
+from pytest import mark, raises
+
+from utils import parse_reminder_days
+
+
+@mark.parametrize(
+    "text, days",
+    (
+        ("", ()),
+        ("7", (7,)),
+        ("1,7, 3", (7, 3, 1)),
+        ("3 3 1", (3, 1)),
+    ),
+)
+def test_parse_reminder_days(text: str, days: tuple) -> None:
+    """Test parse_reminder_days returns unique days, the farthest first"""
+
+    assert parse_reminder_days(text) == days
+
+
+@mark.parametrize("text", ("0", "-1", "1000", "week"))
+def test_parse_reminder_days_wrong_days(text: str) -> None:
+    """Test parse_reminder_days raises ValueError for wrong days"""
+
+    with raises(ValueError):
+        parse_reminder_days(text)
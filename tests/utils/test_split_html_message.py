@@ -0,0 +1,45 @@
+"""Tests for split_html_message function"""
+
+from utils import split_html_message
+
+
+def test_split_html_message_short_text() -> None:
+    """Test short text is not split"""
+
+    assert split_html_message("<b>Текст</b>", 100) == ["<b>Текст</b>"]
+
+
+def test_split_html_message_by_lines() -> None:
+    """Test text is split by lines and is the same after joining"""
+
+    text = "".join(f"<b>Праздник {number}</b>\n" for number in range(100))
+    parts = split_html_message(text, 100)
+
+    assert "".join(parts) == text
+    assert all(len(part) <= 100 for part in parts)
+    assert all(part.startswith("<b>") for part in parts)
+
+
+def test_split_html_message_closes_and_reopens_tags() -> None:
+    """Test tags cut by the split are closed and opened again"""
+
+    text = '<a href="https://t.me">' + "слово " * 50 + "</a>"
+    parts = split_html_message(text, 100)
+
+    assert len(parts) > 1
+    assert all(len(part) <= 100 for part in parts)
+    assert all(
+        part.startswith('<a href="https://t.me">') and part.endswith("</a>")
+        for part in parts
+    )
+
+
+def test_split_html_message_keeps_entities() -> None:
+    """Test HTML entities are not cut in half"""
+
+    text = "a" * 48 + "&amp;" + "b" * 100
+    parts = split_html_message(text, 100)
+
+    assert all(len(part) <= 100 for part in parts)
+    assert "".join(parts) == text
+    assert all(part.count("&") == part.count("&amp;") for part in parts)
@@ -0,0 +1,157 @@
+"""Tests for webhook mode with fake Telegram API server"""
+
+from asyncio import sleep
+from typing import Optional
+
+from aiogram import Bot, Dispatcher
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.types import Message
+from aiohttp import ClientSession, web
+from pytest import mark
+
+from webhook import create_webhook_app
+
+TOKEN = "42:TEST"
+SECRET = "secret"
+UPDATE = {
+    "update_id": 1,
+    "message": {
+        "message_id": 1,
+        "date": 0,
+        "chat": {"id": 1, "type": "private"},
+        "text": "hello",
+    },
+}
+
+
+async def _start_server(app: web.Application) -> tuple:
+    """Start the application on a free port and return runner and URL"""
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+
+    host, port = runner.addresses[0][:2]
+
+    return runner, f"http://{host}:{port}"
+
+
+def _get_fake_telegram_app(
+    calls: list, webhooks: Optional[list] = None
+) -> web.Application:
+    """Return fake Telegram API server that saves called methods (and
+    params of set webhooks)"""
+
+    async def handle(request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        calls.append(method)
+
+        if method == "setWebhook" and webhooks is not None:
+            webhooks.append(dict(await request.post()))
+
+        result = True
+
+        if method == "sendMessage":
+            result = {**UPDATE["message"], "message_id": 2, "text": "ok"}
+
+        return web.json_response({"ok": True, "result": result})
+
+    app = web.Application()
+    app.router.add_post("/bot{token}/{method}", handle)
+
+    return app
+
+
+@mark.asyncio
+async def test_webhook_handles_updates_with_secret_token() -> None:
+    """Test webhook sets webhook, handles update and deletes webhook"""
+
+    calls = []
+    telegram_runner, telegram_url = await _start_server(
+        _get_fake_telegram_app(calls)
+    )
+
+    bot = Bot(
+        TOKEN,
+        session=AiohttpSession(api=TelegramAPIServer.from_base(telegram_url)),
+    )
+    dispatcher = Dispatcher()
+
+    @dispatcher.message()
+    async def echo_handler(message: Message) -> None:
+        await message.answer("ok")
+
+    webhook_runner, webhook_url = await _start_server(
+        create_webhook_app(
+            dispatcher, bot, "https://example.com", "/webhook", SECRET
+        )
+    )
+
+    try:
+        async with ClientSession() as session:
+            response = await session.post(
+                f"{webhook_url}/webhook",
+                json=UPDATE,
+                headers={"X-Telegram-Bot-Api-Secret-Token": SECRET},
+            )
+            assert response.status == 200
+
+            response = await session.post(
+                f"{webhook_url}/webhook",
+                json=UPDATE,
+                headers={"X-Telegram-Bot-Api-Secret-Token": "wrong"},
+            )
+            assert response.status == 401
+
+        for _ in range(100):
+            if "sendMessage" in calls:
+                break
+            await sleep(0.01)
+    finally:
+        await webhook_runner.cleanup()
+        await telegram_runner.cleanup()
+
+    assert calls == ["setWebhook", "sendMessage", "deleteWebhook"]
+
+
+@mark.asyncio
+async def test_webhook_generates_secret_token() -> None:
+    """Test webhook without configured secret token is set with a random
+    one and rejects requests without it"""
+
+    calls = []
+    webhooks = []
+    telegram_runner, telegram_url = await _start_server(
+        _get_fake_telegram_app(calls, webhooks)
+    )
+    bot = Bot(
+        TOKEN,
+        session=AiohttpSession(api=TelegramAPIServer.from_base(telegram_url)),
+    )
+    webhook_runner, webhook_url = await _start_server(
+        create_webhook_app(Dispatcher(), bot, "https://example.com")
+    )
+
+    try:
+        secret_token = webhooks[0]["secret_token"]
+
+        async with ClientSession() as session:
+            response = await session.post(
+                f"{webhook_url}/webhook", json=UPDATE
+            )
+            assert response.status == 401
+
+            response = await session.post(
+                f"{webhook_url}/webhook",
+                json=UPDATE,
+                headers={"X-Telegram-Bot-Api-Secret-Token": secret_token},
+            )
+            assert response.status == 200
+    finally:
+        await webhook_runner.cleanup()
+        await bot.session.close()
+        await telegram_runner.cleanup()
+
+    assert len(secret_token) >= 32
@@ -0,0 +1,119 @@
+"""Tests for notification workers"""
+
+from queue import Queue
+
+from pytest import mark
+
+import workers
+from utils import get_shard
+from workers import NotificationShards, get_process_rate_limit
+
+SHARDS_COUNT = 3
+CHAT_IDS = [str(chat_id) for chat_id in range(20)]
+
+
+def test_notification_shards_send_commands_to_chat_shard() -> None:
+    """Test commands of a chat are put only to the queue of its shard"""
+
+    shards = NotificationShards(SHARDS_COUNT)
+    shards._queues = [Queue() for _ in range(SHARDS_COUNT)]
+
+    for chat_id in CHAT_IDS:
+        shards.add_daily_job(chat_id, [9, 30])
+        shards.remove_daily_job(chat_id)
+
+    for shard, queue in enumerate(shards._queues):
+        commands = list(queue.queue)
+        shard_chat_ids = [
+            chat_id
+            for chat_id in CHAT_IDS
+            if get_shard(chat_id, SHARDS_COUNT) == shard
+        ]
+
+        assert commands == [
+            command
+            for chat_id in shard_chat_ids
+            for command in (
+                ("add", chat_id, (9, 30)),
+                ("remove", chat_id),
+            )
+        ]
+
+
+@mark.asyncio
+async def test_worker_handles_commands_until_stop(monkeypatch) -> None:
+    """Test the worker applies commands in order and stops on None"""
+
+    calls = []
+
+    async def add_daily_job(chat_id, time_) -> None:
+        calls.append(("add", chat_id, time_))
+
+    async def remove_daily_job(chat_id) -> None:
+        calls.append(("remove", chat_id))
+
+    def set_reminder_days(chat_id, days) -> None:
+        calls.append(("reminders", chat_id, days))
+
+    async def set_daily_job_time_zone(chat_id, time_zone) -> None:
+        calls.append(("time_zone", chat_id, time_zone))
+
+    monkeypatch.setattr(workers, "add_daily_job", add_daily_job)
+    monkeypatch.setattr(workers, "remove_daily_job", remove_daily_job)
+    monkeypatch.setattr(workers, "set_reminder_days", set_reminder_days)
+    monkeypatch.setattr(
+        workers, "set_daily_job_time_zone", set_daily_job_time_zone
+    )
+
+    commands = [
+        ("add", "1", (9, 30)),
+        ("reminders", "1", (7, 1)),
+        ("time_zone", "1", "Asia/Tokyo"),
+        ("remove", "1"),
+    ]
+    queue = Queue()
+
+    for command in commands + [None, ("add", "2", (10, 0))]:
+        queue.put(command)
+
+    await workers._handle_commands(queue)
+
+    assert calls == commands
+    assert queue.qsize() == 1
+
+
+def test_rate_limit_is_shared_with_bot_process() -> None:
+    """Test the bot's process and workers together keep the rate limit"""
+
+    assert get_process_rate_limit(30, 2) * (2 + 1) == 30
+
+
+@mark.asyncio
+async def test_worker_handles_commands_after_failed_one(monkeypatch) -> None:
+    """Test a failed command is logged and the next ones are applied"""
+
+    calls = []
+
+    async def add_daily_job(chat_id, time_) -> None:
+        calls.append(("add", chat_id))
+
+    async def set_daily_job_time_zone(chat_id, time_zone) -> None:
+        raise KeyError(time_zone)
+
+    monkeypatch.setattr(workers, "add_daily_job", add_daily_job)
+    monkeypatch.setattr(
+        workers, "set_daily_job_time_zone", set_daily_job_time_zone
+    )
+
+    queue = Queue()
+
+    for command in (
+        ("time_zone", "1", "Mars/Olympus"),
+        ("add", "2", (10, 0)),
+        None,
+    ):
+        queue.put(command)
+
+    await workers._handle_commands(queue)
+
+    assert calls == [("add", "2")]
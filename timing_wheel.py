@@ -0,0 +1,295 @@
+"""Timing wheel of daily notifications.
+
+The wheel has a slot for every minute of the day (UTC). Every chat is kept
+in the slot of its next notification in compact arrays, so adding, moving
+and removing a chat is O(1) and there are no scheduler's jobs per chat.
+Every minute the wheel is turned: due chats of the minute's slot are
+returned and put to the slot of their next notification.
+
+Notification time is local time in the chat's time zone (IANA name). The
+UTC minute is computed for every day separately, so it is correct across
+DST changes: skipped local time is notified right after the change (02:30
+becomes 03:30) and repeated local time is notified once.
+
+"""
+
+from array import array
+from datetime import date, datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+SLOTS_COUNT = 1_440
+
+_ONE_DAY = timedelta(days=1)
+
+
+class _Slot:
+    """Chats of one minute of the day (parallel arrays)"""
+
+    __slots__ = ("chat_ids", "due_minutes", "local_minutes", "zone_indexes")
+
+    def __init__(self) -> None:
+        self.chat_ids = array("q")
+        # UTC minute (since epoch) of the chat's next notification
+        self.due_minutes = array("q")
+        # Local notification time (minutes since midnight)
+        self.local_minutes = array("H")
+        self.zone_indexes = array("H")
+
+    def __len__(self) -> int:
+        return len(self.chat_ids)
+
+
+class TimingWheel:
+    """Chats by UTC minute of their next daily notification"""
+
+    def __init__(self) -> None:
+        self._slots = [_Slot() for _ in range(SLOTS_COUNT)]
+        # Chat id -> index in the slot * SLOTS_COUNT + slot
+        self._positions: Dict[int, int] = {}
+
+        self._zones: List[str] = []
+        self._zone_indexes: Dict[str, int] = {}
+
+        # Last turned UTC minute (since epoch)
+        self._last_minute: Optional[int] = None
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def __contains__(self, chat_id: object) -> bool:
+        return int(chat_id) in self._positions
+
+    @property
+    def last_minute(self) -> Optional[int]:
+        """Last turned UTC minute (since epoch)"""
+
+        return self._last_minute
+
+    def set_last_turn(self, moment: datetime) -> None:
+        """Set time of the last turn, the next turn turns all minutes
+        since it (to catch up chats added with «now» before the moment)"""
+
+        self._last_minute = _get_utc_minute(moment)
+
+    def add(
+        self,
+        chat_id: str,
+        time_: Tuple[int, int],
+        time_zone: str,
+        now: Optional[datetime] = None,
+    ) -> None:
+        """Add the chat with local notification time (move if it is added).
+
+        Raise ValueError or KeyError if the time zone doesn't exist.
+
+        """
+
+        hour, minute = time_
+        local_minute = hour * 60 + minute
+        now_minute = _get_utc_minute(now)
+
+        due_minute = _get_due_minute(
+            time_zone, _get_local_date(time_zone, now_minute), local_minute
+        )
+
+        if due_minute <= now_minute:
+            due_minute = _get_due_minute(
+                time_zone,
+                _get_local_date(time_zone, now_minute) + _ONE_DAY,
+                local_minute,
+            )
+
+        zone_index = self._zone_indexes.get(time_zone)
+
+        if zone_index is None:
+            zone_index = self._zone_indexes[time_zone] = len(self._zones)
+            self._zones.append(time_zone)
+
+        self._pop(int(chat_id))
+        self._push(int(chat_id), due_minute, local_minute, zone_index)
+
+    def get(self, chat_id: str) -> Optional[Tuple[Tuple[int, int], str]]:
+        """Return local notification time and time zone of the chat"""
+
+        position = self._positions.get(int(chat_id))
+
+        if position is None:
+            return None
+
+        index, slot_number = divmod(position, SLOTS_COUNT)
+        slot = self._slots[slot_number]
+
+        return (
+            divmod(slot.local_minutes[index], 60),
+            self._zones[slot.zone_indexes[index]],
+        )
+
+    def remove(self, chat_id: str) -> bool:
+        """Remove the chat, return False if there was no such chat"""
+
+        return self._pop(int(chat_id)) is not None
+
+    def turn(self, now: Optional[datetime] = None) -> Dict[date, List[str]]:
+        """Return chats with due notifications grouped by their local date"""
+
+        due_chats: Dict[date, List[str]] = {}
+
+        for chats_by_date in self.turn_slots(now).values():
+            for local_date, chat_ids in chats_by_date.items():
+                due_chats.setdefault(local_date, []).extend(chat_ids)
+
+        return due_chats
+
+    def turn_slots(
+        self, now: Optional[datetime] = None
+    ) -> Dict[int, Dict[date, List[str]]]:
+        """Return chats with due notifications grouped by their due UTC
+        minute (since epoch, in ascending order) and local date.
+
+        All minutes since the last turn are turned (at most a day), so
+        notifications aren't lost if the turn is late.
+
+        """
+
+        now_minute = _get_utc_minute(now)
+
+        if self._last_minute is None or self._last_minute >= now_minute:
+            first_minute = now_minute
+        else:
+            first_minute = max(
+                self._last_minute + 1, now_minute - SLOTS_COUNT + 1
+            )
+
+        due_slots: Dict[int, Dict[date, List[str]]] = {}
+
+        for minute in range(first_minute, now_minute + 1):
+            self._turn_slot(minute, due_slots)
+
+        self._last_minute = now_minute
+
+        return dict(sorted(due_slots.items()))
+
+    def _turn_slot(
+        self, minute: int, due_slots: Dict[int, Dict[date, list]]
+    ) -> None:
+        """Collect due chats of the minute's slot and move them to the slots
+        of their next notifications"""
+
+        slot_number = minute % SLOTS_COUNT
+        slot = self._slots[slot_number]
+        moved_chats = []
+
+        for index in range(len(slot)):
+            due_minute = slot.due_minutes[index]
+
+            # Chats of the next days stay in the slot
+            if due_minute > minute:
+                continue
+
+            chat_id = slot.chat_ids[index]
+            time_zone = self._zones[slot.zone_indexes[index]]
+            local_date = _get_local_date(time_zone, due_minute)
+
+            due_slots.setdefault(due_minute, {}).setdefault(
+                local_date, []
+            ).append(str(chat_id))
+
+            next_due_minute = _get_due_minute(
+                time_zone, local_date + _ONE_DAY, slot.local_minutes[index]
+            )
+
+            if next_due_minute % SLOTS_COUNT == slot_number:
+                slot.due_minutes[index] = next_due_minute
+            else:
+                moved_chats.append((chat_id, next_due_minute))
+
+        for chat_id, next_due_minute in moved_chats:
+            local_minute, zone_index = self._pop(chat_id)
+            self._push(chat_id, next_due_minute, local_minute, zone_index)
+
+    def _push(
+        self, chat_id: int, due_minute: int, local_minute: int, zone_index: int
+    ) -> None:
+        """Put the chat to the slot of the minute"""
+
+        slot_number = due_minute % SLOTS_COUNT
+        slot = self._slots[slot_number]
+
+        self._positions[chat_id] = len(slot) * SLOTS_COUNT + slot_number
+
+        slot.chat_ids.append(chat_id)
+        slot.due_minutes.append(due_minute)
+        slot.local_minutes.append(local_minute)
+        slot.zone_indexes.append(zone_index)
+
+    def _pop(self, chat_id: int) -> Optional[Tuple[int, int]]:
+        """Remove the chat from its slot (the last chat of the slot takes
+        its place), return its local minute and time zone's index"""
+
+        position = self._positions.pop(chat_id, None)
+
+        if position is None:
+            return None
+
+        index, slot_number = divmod(position, SLOTS_COUNT)
+        slot = self._slots[slot_number]
+        values = (
+            slot.chat_ids,
+            slot.due_minutes,
+            slot.local_minutes,
+            slot.zone_indexes,
+        )
+        popped = (slot.local_minutes[index], slot.zone_indexes[index])
+        last_index = len(slot) - 1
+
+        if index != last_index:
+            for items in values:
+                items[index] = items[last_index]
+
+            self._positions[slot.chat_ids[index]] = position
+
+        for items in values:
+            items.pop()
+
+        return popped
+
+
+def _get_utc_minute(now: Optional[datetime] = None) -> int:
+    """Return UTC minute since epoch (now by default)"""
+
+    now = now or datetime.now(timezone.utc)
+
+    return int(now.timestamp()) // 60
+
+
+@lru_cache(maxsize=4_096)
+def _get_due_minute(
+    time_zone: str, local_date: date, local_minute: int
+) -> int:
+    """Return UTC minute since epoch of the local time on the date.
+
+    Skipped local time (DST starts) is moved forward by the change, and
+    repeated local time (DST ends) is the first one.
+
+    """
+
+    hour, minute = divmod(local_minute, 60)
+    local_datetime = datetime(
+        local_date.year,
+        local_date.month,
+        local_date.day,
+        hour,
+        minute,
+        tzinfo=ZoneInfo(time_zone),
+    )
+
+    return int(local_datetime.timestamp()) // 60
+
+
+@lru_cache(maxsize=4_096)
+def _get_local_date(time_zone: str, utc_minute: int) -> date:
+    """Return local date of the UTC minute since epoch"""
+
+    return datetime.fromtimestamp(utc_minute * 60, ZoneInfo(time_zone)).date()
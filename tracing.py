@@ -0,0 +1,261 @@
+"""Tracing and profiling of updates.
+
+Every update gets a root span with child spans for DB queries, rendering
+and requests to Telegram. Finished traces are written to the JSON lines
+file, and traces slower than the threshold are logged with all spans.
+
+Admins can turn on cProfile for the next N updates with /profile command.
+
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from cProfile import Profile
+from datetime import datetime
+from json import dumps
+from logging import getLogger
+from os import makedirs, path
+from time import perf_counter, time
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+
+from constants.constants import (
+    PROFILES_DIR,
+    TRACES_PATH,
+    TRACES_SLOW_THRESHOLD,
+)
+
+logger = getLogger(__name__)
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar(
+    "current_span", default=None
+)
+
+
+class Span:
+    """Timed operation with attributes and child operations"""
+
+    __slots__ = (
+        "name",
+        "attributes",
+        "children",
+        "started_at",
+        "duration",
+        "_started_counter",
+    )
+
+    def __init__(self, name: str, attributes: Dict[str, Any]) -> None:
+        self.name = name
+        self.attributes = attributes
+        self.children: List[Span] = []
+        self.started_at = time()
+        self.duration = 0.0
+
+        self._started_counter = perf_counter()
+
+    def finish(self) -> None:
+        """Save duration of the span"""
+
+        self.duration = perf_counter() - self._started_counter
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the span with all children as dict"""
+
+        return {
+            "name": self.name,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration * 1_000, 3),
+            "attributes": self.attributes,
+            "children": [child.to_dict() for child in self.children],
+        }
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+    """Open child span of the current span.
+
+    Outside of traced updates does nothing and yields None.
+
+    """
+
+    parent = _current_span.get()
+
+    if parent is None:
+        yield None
+        return
+
+    child = Span(name, attributes)
+    parent.children.append(child)
+    token = _current_span.set(child)
+
+    try:
+        yield child
+    finally:
+        child.finish()
+        _current_span.reset(token)
+
+
+class TraceExporter:
+    """Writer of traces to JSON lines file"""
+
+    def __init__(self, file_path: Optional[str]) -> None:
+        self.file_path = file_path
+
+        self._file = None
+
+    def export(self, root: Span) -> None:
+        """Write the trace as one line"""
+
+        if self.file_path is None:
+            return
+
+        if self._file is None:
+            self._file = open(self.file_path, "a", encoding="utf-8")
+
+        self._file.write(dumps(root.to_dict(), ensure_ascii=False) + "\n")
+
+    def close(self) -> None:
+        """Close the file"""
+
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class UpdateProfiler:
+    """cProfile for the next N updates"""
+
+    def __init__(self, profiles_dir: str) -> None:
+        self.profiles_dir = profiles_dir
+
+        self._profile: Optional[Profile] = None
+        self._updates_left = 0
+        self._active_updates = 0
+
+    @property
+    def is_enabled(self) -> bool:
+        """Are the next updates profiled"""
+
+        return self._profile is not None
+
+    def start(self, updates_count: int) -> bool:
+        """Profile the next updates.
+
+        Return False if the previous profiling isn't finished yet (its
+        updates are still counted, so it isn't restarted).
+
+        """
+
+        if self.is_enabled:
+            return False
+
+        self._profile = Profile()
+        self._updates_left = updates_count
+        self._active_updates = 0
+
+        return True
+
+    def enable(self) -> None:
+        """Start profiling of the update"""
+
+        if self._active_updates == 0:
+            self._profile.enable()
+
+        self._active_updates += 1
+
+    def disable(self) -> Optional[str]:
+        """Stop profiling of the update.
+
+        Return path of the saved profile if it was the last update.
+
+        """
+
+        self._active_updates -= 1
+        self._updates_left -= 1
+
+        if self._active_updates == 0:
+            self._profile.disable()
+
+        if self._updates_left > 0 or self._active_updates > 0:
+            return None
+
+        makedirs(self.profiles_dir, exist_ok=True)
+        profile_path = path.join(
+            self.profiles_dir,
+            f"profile_{datetime.now().strftime('%Y%m%d_%H%M%S')}.prof",
+        )
+
+        self._profile.dump_stats(profile_path)
+        self._profile = None
+
+        return profile_path
+
+
+TRACE_EXPORTER = TraceExporter(TRACES_PATH)
+UPDATE_PROFILER = UpdateProfiler(PROFILES_DIR)
+
+
+class TracingMiddleware(BaseMiddleware):
+    """Open root span for every update and profile updates if asked"""
+
+    def __init__(
+        self,
+        on_profile_saved: Optional[Callable[[str], Awaitable[None]]] = None,
+    ) -> None:
+        self.on_profile_saved = on_profile_saved
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        root = Span(
+            "update",
+            {
+                "update_id": getattr(event, "update_id", None),
+                "type": (
+                    event.event_type if isinstance(event, Update) else None
+                ),
+            },
+        )
+        token = _current_span.set(root)
+        is_profiled = UPDATE_PROFILER.is_enabled
+
+        if is_profiled:
+            UPDATE_PROFILER.enable()
+
+        try:
+            return await handler(event, data)
+        finally:
+            root.finish()
+            _current_span.reset(token)
+
+            if is_profiled:
+                profile_path = UPDATE_PROFILER.disable()
+
+                if profile_path is not None:
+                    logger.info("Profile is saved to %s", profile_path)
+
+                    if self.on_profile_saved is not None:
+                        await self.on_profile_saved(profile_path)
+
+            self._export(root)
+
+    @staticmethod
+    def _export(root: Span) -> None:
+        """Export the trace and log it if it is slow"""
+
+        try:
+            TRACE_EXPORTER.export(root)
+        except OSError as error:
+            logger.error(error)
+
+        if root.duration >= TRACES_SLOW_THRESHOLD:
+            logger.warning(
+                "Slow update (%.3f s):\n%s",
+                root.duration,
+                dumps(root.to_dict(), ensure_ascii=False, indent=2),
+            )
@@ -1,25 +1,51 @@
-"""Utils of the project"""
+"""Utils of the project.
 
+The module doesn't import aiogram and does no I/O on import, so tests and
+CLI tools import it fast and without the bot's settings.
+
+"""
+
+from calendar import isleap
 from datetime import date, timedelta
 from logging import getLogger
-from math import ceil
+from re import compile as re_compile
 from re import match
-from typing import Dict, List, Tuple
-
-from aiogram.types import FSInputFile, Message
-
-from constants.constants import ERROR_MESSAGE
-from custom_types import TypeHoliday
+from typing import AbstractSet, Dict, List, Optional, Tuple
+from zlib import crc32
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from constants.constants import (
+    ERROR_MESSAGE,
+    MESSAGE_MAX_LENGTH,
+    REMINDER_MAX_DAYS,
+)
+from custom_types import HolidayRecord, TypeHoliday
+from templates import (
+    LIST_FORMAT,
+    NOTIFICATION_FORMAT,
+    get_date_text,
+    get_message_format,
+    render_holidays,
+)
 
 logger = getLogger(__name__)
 
+# Tags and line breaks are never split
+_HTML_TOKEN_PATTERN = re_compile(r"(<[^>]*>|\n)")
+_HTML_TAG_PATTERN = re_compile(r"<(/?)([a-zA-Z0-9-]+)[^>]*>")
+
 
 async def get_formatted_holidays(
-    holidays: List[TypeHoliday], is_notification=False
+    holidays: List[TypeHoliday],
+    is_notification=False,
+    format_name: Optional[str] = None,
+    today: Optional[date] = None,
 ) -> str:
-    """Return holidays in necessary format"""
+    """Return holidays in necessary format (see templates.py).
 
-    formatted_holidays = ""
+    Days left and ages are counted from today (server's date by default).
+
+    """
 
     if not isinstance(holidays, list):
         logger.error(
@@ -28,93 +54,95 @@ async def get_formatted_holidays(
         )
         return ERROR_MESSAGE
 
-    if is_notification:
-        formatted_holidays = "Привет! 👋"
+    if format_name is None:
+        format_name = NOTIFICATION_FORMAT if is_notification else LIST_FORMAT
 
-        for holiday in holidays:
-            formatted_holidays += "\n\n" + (
-                await _get_formatted_single_holiday_for_notification(holiday)
-            )
-    else:
-        for holiday in holidays:
-            formatted_holidays += await _get_formatted_single_holiday(holiday)
+    fields = get_message_format(format_name).fields
+    holidays_values = []
+    today = today or date.today()
+
+    for holiday in holidays:
+        values = await _get_holiday_values(holiday, fields, today)
+
+        if values is not None:
+            holidays_values.append(values)
 
-    return formatted_holidays
+    return render_holidays(holidays_values, format_name)
 
 
-async def _get_formatted_single_holiday(holiday: TypeHoliday) -> str:
-    """Format holiday text and return"""
+async def _get_holiday_values(
+    holiday: TypeHoliday, fields: AbstractSet[str], today: date
+) -> Optional[dict]:
+    """Return values of the templates' fields for the holiday (only
+    the fields that are used)"""
 
-    if not isinstance(holiday, tuple):
+    if not isinstance(holiday, (tuple, HolidayRecord)):
         logger.error(
-            "Wrong «holiday» type - %hd "
-            "(«_get_formatted_single_holiday» func)",
+            "Wrong «holiday» type - %hd («_get_holiday_values» func)",
             holiday,
         )
-        return ""
+        return None
 
     holiday_date, title, is_birthday, whom_to_congratulate = holiday
 
-    days_left = await _get_days_left(holiday_date)
+    values = {
+        "title": title,
+        "is_birthday": is_birthday,
+        "whom_to_congratulate": whom_to_congratulate,
+    }
+
+    if "date" in fields:
+        values["date"] = get_date_text(holiday_date.month, holiday_date.day)
 
-    text = f'<b>{title} - {holiday_date.strftime("%d %B")}</b>\n'
-    text += f"⏳ <u>Осталось дней:</u> {days_left}\n"
+    if "days_left" in fields:
+        values["days_left"] = await _get_days_left(holiday_date, today)
 
     if is_birthday:
-        # TODO: FIX
-        age = ceil((date.today() - holiday_date).days / 365)
-        age_suffix = await _get_age_suffix(age)
+        values["age"] = await _get_person_age(holiday_date, today)
+        values["age_suffix"] = await _get_age_suffix(values["age"])
 
-        text += f"🗓️ <u>Сколько исполнится:</u> {age} {age_suffix}"
-    else:
-        text += f"🎉 <u>Кого поздравляем:</u> {whom_to_congratulate}"
+    return values
 
-    return text + "\n\n"
 
+async def _get_days_left(
+    holiday_date: date, today: Optional[date] = None
+) -> int | str:
+    """Return how many days left until the holiday (0 - today)"""
 
-async def _get_formatted_single_holiday_for_notification(
-    holiday: TypeHoliday,
-) -> str:
-    """Format holiday text and return"""
-
-    if not isinstance(holiday, tuple):
+    if not isinstance(holiday_date, date):
         logger.error(
-            "Wrong «holiday» type - %hd "
-            "(«_get_formatted_single_holiday» func)",
-            holiday,
+            "Wrong «holiday_date» type - %hd («_get_days_left» func)",
+            holiday_date,
         )
-        return ""
+        return "Не удалось вычислить"
 
-    holiday_date, title, is_birthday, whom_to_congratulate = holiday
+    today = today or date.today()
 
-    if is_birthday:
-        age = _get_person_age(holiday_date)
-        age_suffix = await _get_age_suffix(age)
+    return (get_next_date(holiday_date, today) - today).days
 
-        text = f"Сегодня <b>{title}</b>.\n"
-        text += f"Исполнилось <b>{age} {age_suffix}</b>\n"
-        text += "Не забудь поздравить! 🎉"
-    else:
-        text = f"Сегодня праздник - <b>{title}</b>\n"
-        text += f"Не забудь поздравить причастных 🎉: {whom_to_congratulate}"
 
-    return text
+def get_next_date(holiday_date: date, today: date) -> date:
+    """Return the nearest date of the yearly holiday (today or later)"""
 
+    next_date = _get_date_in_year(holiday_date, today.year)
 
-async def _get_days_left(holiday_date: date) -> int | str:
-    """Return how many days left until the holiday"""
+    if next_date < today:
+        next_date = _get_date_in_year(holiday_date, today.year + 1)
 
-    if not isinstance(holiday_date, date):
-        logger.error(
-            "Wrong «holiday_date» type - %hd («_get_days_left» func)",
-            holiday_date,
-        )
-        return "Не удалось вычислить"
+    return next_date
+
+
+def _get_date_in_year(holiday_date: date, year: int) -> date:
+    """Return date of the holiday in the year.
 
-    # TODO: Учесть прошедшие даты
-    nearest_holiday_date = holiday_date.replace(year=date.today().year)
+    Holidays on February 29 are on February 28 in non-leap years.
 
-    return (nearest_holiday_date - date.today()).days
+    """
+
+    if holiday_date.month == 2 and holiday_date.day == 29 and not isleap(year):
+        return date(year, 2, 28)
+
+    return holiday_date.replace(year=year)
 
 
 async def _get_age_suffix(age: int | str) -> str:
@@ -161,21 +189,10 @@ def get_bot_commands_to_display(bot_commands: List[Dict[str, str]]) -> str:
     )
 
 
-async def send_month_choosing_instruction(message: Message) -> None:
-    """Send instruction about month choosing"""
-
-    await message.answer_photo(
-        FSInputFile("photos/month_choosing_button.png"),
-        "Также ты можешь получить <u>праздники в конкретном месяце</u>."
-        " Для этого нажми на эту кнопку 👆",
-    )
-
-
-async def _get_person_age(birthday: date) -> int:
-    """Return age for person by birthday"""
+async def _get_person_age(birthday: date, today: Optional[date] = None) -> int:
+    """Return age of the person on the nearest birthday (today or later)"""
 
-    # TODO: Fix
-    return ceil((date.today() - birthday).days / 365)
+    return get_next_date(birthday, today or date.today()).year - birthday.year
 
 
 async def is_daily_notification_time_correct(time_: str) -> bool:
@@ -206,3 +223,148 @@ async def get_hours_and_minutes_from_seconds_delta(
     minutes = (delta.seconds % 3_600) // 60
 
     return hours, minutes
+
+
+def is_time_zone_correct(time_zone: str) -> bool:
+    """Check that the time zone is an IANA time zone (e.g. Europe/Moscow)"""
+
+    if not isinstance(time_zone, str) or not time_zone.strip():
+        return False
+
+    try:
+        ZoneInfo(time_zone)
+    except (ValueError, ZoneInfoNotFoundError):
+        return False
+
+    return True
+
+
+def parse_reminder_days(text: str) -> Tuple[int, ...]:
+    """Return days of reminders from text like «7, 3 1» (sorted, the
+    farthest first).
+
+    Raise ValueError if the text has not only days from 1 to
+    REMINDER_MAX_DAYS.
+
+    """
+
+    days = {int(item) for item in text.replace(",", " ").split()}
+
+    if any(not 1 <= item <= REMINDER_MAX_DAYS for item in days):
+        raise ValueError(f"Days must be from 1 to {REMINDER_MAX_DAYS}")
+
+    return tuple(sorted(days, reverse=True))
+
+
+def get_shard(chat_id: int | str, shards_count: int) -> int:
+    """Return number of the shard that owns the chat.
+
+    >>> get_shard(123, 4) == get_shard("123", 4)
+
+    """
+
+    return crc32(str(chat_id).encode()) % shards_count
+
+
+def split_html_message(
+    text: str, limit: int = MESSAGE_MAX_LENGTH
+) -> List[str]:
+    """Split HTML text to parts not longer than the limit.
+
+    Text is split by lines (or by words in too long lines), never inside
+    tags. Tags opened in a part are closed at its end and opened again in
+    the next part.
+
+    """
+
+    if len(text) <= limit:
+        return [text]
+
+    parts = []
+    current_part = []
+    current_length = 0
+    # Names and opening tags of the tags that are not closed yet
+    open_tags: List[Tuple[str, str]] = []
+    closing_length = 0
+    # Number of tags opened again at the start of the current part
+    reopened_count = 0
+
+    for token in _get_html_tokens(text, limit // 2):
+        tag_match = _HTML_TAG_PATTERN.fullmatch(token)
+        token_closing_length = 0
+
+        if tag_match is not None and not tag_match.group(1):
+            token_closing_length = len(tag_match.group(2)) + 3
+
+        if (
+            current_length + len(token) + closing_length + token_closing_length
+            > limit
+            and len(current_part) > reopened_count
+        ):
+            # Tags opened right before the cut are moved to the next part
+            moved_count = 0
+
+            while (
+                moved_count < len(open_tags)
+                and moved_count < len(current_part) - reopened_count
+                and current_part[-1 - moved_count]
+                is open_tags[-1 - moved_count][1]
+            ):
+                moved_count += 1
+
+            parts.append(
+                "".join(current_part[: len(current_part) - moved_count])
+                + "".join(
+                    f"</{name}>"
+                    for name, _ in reversed(
+                        open_tags[: len(open_tags) - moved_count]
+                    )
+                )
+            )
+            current_part = [tag for _, tag in open_tags]
+            current_length = sum(len(tag) for tag in current_part)
+            reopened_count = len(current_part)
+
+        current_part.append(token)
+        current_length += len(token)
+
+        if tag_match is not None:
+            name = tag_match.group(2).lower()
+
+            if not tag_match.group(1):
+                open_tags.append((name, token))
+            elif open_tags and open_tags[-1][0] == name:
+                open_tags.pop()
+
+            closing_length = sum(len(name) + 3 for name, _ in open_tags)
+
+    if current_part:
+        parts.append("".join(current_part))
+
+    return parts
+
+
+def _get_html_tokens(text: str, max_length: int) -> List[str]:
+    """Return tags, line breaks and pieces of text not longer than max"""
+
+    tokens = []
+
+    for token in _HTML_TOKEN_PATTERN.split(text):
+        if not token:
+            continue
+
+        while len(token) > max_length:
+            # Cut by the last space, or by length if there are no spaces
+            # (but not inside an entity like «&amp;»)
+            cut_at = token.rfind(" ", 0, max_length) + 1 or max_length
+            entity_start = token.rfind("&", 0, cut_at)
+
+            if entity_start > 0 and ";" not in token[entity_start:cut_at]:
+                cut_at = entity_start
+
+            tokens.append(token[:cut_at])
+            token = token[cut_at:]
+
+        tokens.append(token)
+
+    return tokens
@@ -0,0 +1,95 @@
+"""Webhook mode.
+
+Updates are received by the embedded HTTP server instead of long polling.
+Every update is handled in background, so slow handlers don't delay the
+next updates.
+
+"""
+
+from asyncio import Event
+from logging import getLogger
+from secrets import token_urlsafe
+from typing import Optional
+
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import (
+    SimpleRequestHandler,
+    setup_application,
+)
+from aiohttp import web
+
+from constants.constants import (
+    WEBHOOK_BASE_URL,
+    WEBHOOK_HOST,
+    WEBHOOK_PATH,
+    WEBHOOK_PORT,
+    WEBHOOK_SECRET,
+)
+
+logger = getLogger(__name__)
+
+
+def create_webhook_app(
+    dispatcher: Dispatcher,
+    bot: Bot,
+    base_url: str,
+    path: str = "/webhook",
+    secret_token: Optional[str] = None,
+) -> web.Application:
+    """Return application that passes updates from Telegram to dispatcher.
+
+    The webhook is set on startup and deleted on shutdown. Requests without
+    the secret token are rejected (a random token is used if it isn't set,
+    so the webhook never accepts updates from anyone who knows its URL).
+
+    """
+
+    if not secret_token:
+        secret_token = token_urlsafe(32)
+        logger.info("Webhook secret token isn't set, a random one is used")
+
+    async def set_webhook(bot: Bot) -> None:
+        await bot.set_webhook(
+            f"{base_url}{path}",
+            secret_token=secret_token,
+            allowed_updates=dispatcher.resolve_used_update_types(),
+        )
+        logger.info("Webhook is set to %s%s", base_url, path)
+
+    async def delete_webhook(bot: Bot) -> None:
+        await bot.delete_webhook()
+        logger.info("Webhook is deleted")
+
+    dispatcher.startup.register(set_webhook)
+    dispatcher.shutdown.register(delete_webhook)
+
+    app = web.Application()
+
+    SimpleRequestHandler(
+        dispatcher=dispatcher,
+        bot=bot,
+        handle_in_background=True,
+        secret_token=secret_token,
+    ).register(app, path=path)
+    setup_application(app, dispatcher, bot=bot)
+
+    return app
+
+
+async def run_webhook(dispatcher: Dispatcher, bot: Bot) -> None:
+    """Run HTTP server for webhook until the task is cancelled"""
+
+    app = create_webhook_app(
+        dispatcher, bot, WEBHOOK_BASE_URL, WEBHOOK_PATH, WEBHOOK_SECRET
+    )
+    runner = web.AppRunner(app)
+
+    await runner.setup()
+
+    try:
+        await web.TCPSite(runner, WEBHOOK_HOST, WEBHOOK_PORT).start()
+        logger.info("Webhook server on %s:%s", WEBHOOK_HOST, WEBHOOK_PORT)
+
+        await Event().wait()
+    finally:
+        await runner.cleanup()
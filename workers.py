@@ -0,0 +1,195 @@
+"""Notification workers.
+
+Daily notifications can be sent by separate processes. Every worker owns
+the chats of its shard (by hash of chat id), runs its own scheduler and
+sends the notifications. The bot tells workers about added, changed and
+deleted notifications through a queue.
+
+"""
+
+import asyncio
+from logging import basicConfig, getLogger
+from multiprocessing import get_context
+from typing import Tuple
+
+from constants.constants import (
+    LOGGING_SETTINGS,
+    METRICS_HOST,
+    METRICS_PORT,
+    SEND_RATE_LIMIT,
+)
+from jobs import (
+    add_daily_job,
+    remove_daily_job,
+    run_scheduler,
+    set_daily_job_time_zone,
+    set_reminder_days,
+)
+from metrics import start_metrics_server
+from resources import RESOURCES
+from sender import SEND_QUEUE
+from utils import get_shard
+
+logger = getLogger(__name__)
+
+_ADD_COMMAND = "add"
+_REMOVE_COMMAND = "remove"
+_REMINDERS_COMMAND = "reminders"
+_TIME_ZONE_COMMAND = "time_zone"
+
+
+class NotificationShards:
+    """Processes that send daily notifications, one per shard"""
+
+    def __init__(self, shards_count: int) -> None:
+        self.shards_count = shards_count
+
+        self._context = get_context("spawn")
+        self._queues = []
+        self._processes = []
+
+    def start(self) -> None:
+        """Start worker processes.
+
+        The rate limit of Telegram is shared equally by the workers and
+        this process (it sends answers to users).
+
+        """
+
+        SEND_QUEUE.set_rate_limit(
+            get_process_rate_limit(SEND_RATE_LIMIT, self.shards_count)
+        )
+
+        for shard in range(self.shards_count):
+            queue = self._context.Queue()
+            process = self._context.Process(
+                target=run_worker,
+                args=(shard, self.shards_count, queue),
+                name=f"notifications-{shard}",
+                daemon=True,
+            )
+            process.start()
+
+            self._queues.append(queue)
+            self._processes.append(process)
+
+        logger.info("Notification workers started: %s", self.shards_count)
+
+    def stop(self, timeout: float = 10) -> None:
+        """Ask workers to stop and wait for them"""
+
+        for queue in self._queues:
+            queue.put(None)
+
+        for process in self._processes:
+            process.join(timeout)
+
+            if process.is_alive():
+                process.terminate()
+
+        self._queues = []
+        self._processes = []
+
+    def add_daily_job(self, chat_id: str, time_: Tuple[int, int]) -> None:
+        """Add (or move) daily job of the chat in its shard"""
+
+        self._send_command(_ADD_COMMAND, str(chat_id), tuple(time_))
+
+    def remove_daily_job(self, chat_id: str) -> None:
+        """Remove daily job of the chat in its shard"""
+
+        self._send_command(_REMOVE_COMMAND, str(chat_id))
+
+    def set_reminder_days(self, chat_id: str, days: Tuple[int, ...]) -> None:
+        """Set days of reminders of the chat in its shard"""
+
+        self._send_command(_REMINDERS_COMMAND, str(chat_id), tuple(days))
+
+    def set_time_zone(self, chat_id: str, time_zone: str) -> None:
+        """Move daily job of the chat to the time zone in its shard"""
+
+        self._send_command(_TIME_ZONE_COMMAND, str(chat_id), time_zone)
+
+    def _send_command(self, *command) -> None:
+        """Put the command to the queue of the chat's shard"""
+
+        chat_id = command[1]
+
+        self._queues[get_shard(chat_id, self.shards_count)].put(command)
+
+
+def get_process_rate_limit(rate_limit: float, shards_count: int) -> float:
+    """Return share of the rate limit of one process (the bot's process and
+    every worker have equal shares)"""
+
+    return rate_limit / (shards_count + 1)
+
+
+def run_worker(shard: int, shards_count: int, queue) -> None:
+    """Entry point of worker process"""
+
+    basicConfig(**LOGGING_SETTINGS)
+
+    asyncio.run(_run_worker(shard, shards_count, queue))
+
+
+async def _run_worker(shard: int, shards_count: int, queue) -> None:
+    """Run scheduler with the shard's daily jobs and handle commands"""
+
+    SEND_QUEUE.set_rate_limit(
+        get_process_rate_limit(SEND_RATE_LIMIT, shards_count)
+    )
+
+    await RESOURCES.startup()
+
+    metrics_runner = None
+
+    if METRICS_PORT:
+        metrics_runner = await start_metrics_server(
+            METRICS_HOST, METRICS_PORT + 1 + shard
+        )
+
+    scheduler_task = asyncio.create_task(
+        run_scheduler(RESOURCES.scheduler, shard=(shard, shards_count))
+    )
+
+    logger.info("Notification worker %s started", shard)
+
+    try:
+        await _handle_commands(queue)
+    finally:
+        scheduler_task.cancel()
+        await asyncio.gather(scheduler_task, return_exceptions=True)
+
+        if metrics_runner is not None:
+            await metrics_runner.cleanup()
+
+        await SEND_QUEUE.stop()
+        await RESOURCES.shutdown()
+
+        logger.info("Notification worker %s stopped", shard)
+
+
+async def _handle_commands(queue) -> None:
+    """Apply commands from the bot's process until None is received"""
+
+    loop = asyncio.get_running_loop()
+
+    while (command := await loop.run_in_executor(None, queue.get)) is not None:
+        name, chat_id, *args = command
+
+        # A failed command (e.g. a time zone unknown to the worker's tzdata)
+        # mustn't stop the next ones
+        try:
+            if name == _ADD_COMMAND:
+                await add_daily_job(chat_id, *args)
+            elif name == _REMOVE_COMMAND:
+                await remove_daily_job(chat_id)
+            elif name == _REMINDERS_COMMAND:
+                set_reminder_days(chat_id, *args)
+            elif name == _TIME_ZONE_COMMAND:
+                await set_daily_job_time_zone(chat_id, *args)
+        except Exception as error:
+            logger.error(
+                "Command %s of chat %s failed: %r", name, chat_id, error
+            )